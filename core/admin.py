@@ -1,7 +1,48 @@
 # core/admin.py
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import Professor, Aluno, Atividade, Submissao
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Count, Q
+from django.utils.functional import cached_property
+from .models import Professor, Aluno, Turma, Atividade, Submissao, Tarefa, UsoIADiario, EstatisticaConsulta
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator que usa a estimativa do PostgreSQL (pg_class.reltuples)
+    quando a listagem não tem filtros, evitando o COUNT(*) na tabela inteira
+    """
+
+    @cached_property
+    def count(self):
+        query = self.object_list.query
+        if connection.vendor == 'postgresql' and not query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [query.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            # reltuples é -1 em tabelas nunca analisadas
+            if row and row[0] > 0:
+                return row[0]
+        return super().count
+
+
+class ListagemEnxutaMixin:
+    """
+    Adia (defer) campos de texto longos apenas na listagem do admin;
+    a tela de edição continua carregando o registro completo
+    """
+    campos_adiados_listagem = []
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        match = request.resolver_match
+        if match and match.url_name == f'{self.opts.app_label}_{self.opts.model_name}_changelist':
+            queryset = queryset.defer(*self.campos_adiados_listagem)
+        return queryset
 
 
 @admin.register(Professor)
@@ -15,7 +56,7 @@ class ProfessorAdmin(UserAdmin):
 
     fieldsets = UserAdmin.fieldsets + (
         ('Informações Adicionais', {
-            'fields': ('nome',)
+            'fields': ('nome', 'orcamento_ia_diario')
         }),
     )
 
@@ -32,7 +73,7 @@ class AlunoAdmin(admin.ModelAdmin):
     Customização do admin para Aluno
     """
     list_display = ['nome', 'ra', 'is_active', 'created_at', 'total_submissoes']
-    list_filter = ['is_active', 'created_at']
+    list_filter = ['is_active', 'turmas', 'created_at']
     search_fields = ['nome', 'ra']
     readonly_fields = ['created_at']
 
@@ -49,11 +90,18 @@ class AlunoAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        """Anota o total de submissões para evitar um COUNT por linha"""
+        return super().get_queryset(request).annotate(
+            _total_submissoes=Count('submissoes')
+        )
+
     def total_submissoes(self, obj):
         """Mostra o total de submissões do aluno"""
-        return obj.submissoes.count()
+        return obj._total_submissoes
 
     total_submissoes.short_description = 'Total de Submissões'
+    total_submissoes.admin_order_field = '_total_submissoes'
 
     def save_model(self, request, obj, form, change):
         """
@@ -74,53 +122,90 @@ class AlunoAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
 
+@admin.register(Turma)
+class TurmaAdmin(admin.ModelAdmin):
+    """
+    Customização do admin para Turma
+    """
+    list_display = ['nome', 'professor', 'total_alunos', 'created_at']
+    list_filter = ['professor']
+    list_select_related = ['professor']
+    search_fields = ['nome']
+    # Busca por nome/RA em vez de carregar todos os alunos da instituição
+    autocomplete_fields = ['alunos']
+    readonly_fields = ['created_at']
+
+    def get_queryset(self, request):
+        """Anota o total de alunos para evitar um COUNT por linha"""
+        return super().get_queryset(request).annotate(_total_alunos=Count('alunos'))
+
+    def total_alunos(self, obj):
+        """Mostra o total de alunos da turma"""
+        return obj._total_alunos
+    total_alunos.short_description = 'Alunos'
+    total_alunos.admin_order_field = '_total_alunos'
+
+
 @admin.register(Atividade)
-class AtividadeAdmin(admin.ModelAdmin):
+class AtividadeAdmin(ListagemEnxutaMixin, admin.ModelAdmin):
     """
     Customização do admin para Atividade
     """
     list_display = [
         'titulo',
         'professor',
+        'turma',
         'prazo_entrega',
+        'status',
         'total_submissoes_display',
         'pendentes_correcao',
         'created_at'
     ]
-    list_filter = ['prazo_entrega', 'created_at', 'professor']
+    list_filter = ['status', 'prazo_entrega', 'created_at', 'professor', 'turma']
+    list_select_related = ['professor', 'turma']
+    campos_adiados_listagem = ['descricao']
     search_fields = ['titulo', 'descricao']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['status', 'encerrada_em', 'created_at', 'updated_at']
     date_hierarchy = 'prazo_entrega'
 
     fieldsets = (
         ('Informações da Atividade', {
-            'fields': ('professor', 'titulo', 'descricao', 'prazo_entrega')
+            'fields': ('professor', 'turma', 'titulo', 'descricao', 'prazo_entrega')
         }),
         ('Metadados', {
-            'fields': ('created_at', 'updated_at'),
+            'fields': ('status', 'encerrada_em', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
 
+    def get_queryset(self, request):
+        """Anota os totais de submissões em uma única query agregada"""
+        return super().get_queryset(request).annotate(
+            _total_submissoes=Count('submissoes'),
+            _pendentes_correcao=Count('submissoes', filter=Q(submissoes__nota__isnull=True)),
+        )
+
     def total_submissoes_display(self, obj):
         """Mostra total de submissões"""
-        total = obj.total_submissoes()
+        total = obj._total_submissoes
         return f"{total} submissão{'ões' if total != 1 else ''}"
 
     total_submissoes_display.short_description = 'Submissões'
+    total_submissoes_display.admin_order_field = '_total_submissoes'
 
     def pendentes_correcao(self, obj):
         """Mostra submissões pendentes"""
-        pendentes = obj.submissoes_pendentes()
+        pendentes = obj._pendentes_correcao
         if pendentes > 0:
             return f"⚠️ {pendentes} pendente{'s' if pendentes != 1 else ''}"
         return "✅ Todas corrigidas"
 
     pendentes_correcao.short_description = 'Status Correção'
+    pendentes_correcao.admin_order_field = '_pendentes_correcao'
 
 
 @admin.register(Submissao)
-class SubmissaoAdmin(admin.ModelAdmin):
+class SubmissaoAdmin(ListagemEnxutaMixin, admin.ModelAdmin):
     """
     Customização do admin para Submissão
     """
@@ -133,10 +218,16 @@ class SubmissaoAdmin(admin.ModelAdmin):
         'corrigido_em'
     ]
     list_filter = ['enviado_em', 'corrigido_em', 'atividade']
+    list_select_related = ['aluno', 'atividade']
+    campos_adiados_listagem = ['resposta', 'observacao', 'atividade__descricao']
     search_fields = ['aluno__nome', 'aluno__ra', 'atividade__titulo']
     readonly_fields = ['enviado_em', 'corrigido_em']
     date_hierarchy = 'enviado_em'
 
+    # Tabela grande: contagem estimada e sem o COUNT extra do "mostrar todos"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
     fieldsets = (
         ('Informações', {
             'fields': ('atividade', 'aluno')
@@ -163,6 +254,55 @@ class SubmissaoAdmin(admin.ModelAdmin):
     status_display.short_description = 'Status'
 
 
+@admin.register(Tarefa)
+class TarefaAdmin(admin.ModelAdmin):
+    """
+    Acompanhamento da fila de tarefas em segundo plano
+    """
+    list_display = ['id', 'tipo', 'status', 'tentativas', 'criada_em', 'concluida_em']
+    list_filter = ['status', 'tipo']
+    readonly_fields = [
+        'tipo', 'payload', 'status', 'tentativas', 'erro',
+        'executar_apos', 'criada_em', 'reservada_em', 'concluida_em'
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(UsoIADiario)
+class UsoIADiarioAdmin(admin.ModelAdmin):
+    """
+    Consolidado diário de uso de IA por professor
+    """
+    list_display = ['data', 'professor', 'chamadas', 'erros', 'cache_hits', 'tokens_entrada', 'tokens_saida']
+    list_filter = ['data', 'professor']
+    list_select_related = ['professor']
+    date_hierarchy = 'data'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(EstatisticaConsulta)
+class EstatisticaConsultaAdmin(admin.ModelAdmin):
+    """
+    Estatísticas de consultas SQL por formato (veja o comando consultas_lentas)
+    """
+    list_display = ['hora', 'impressao', 'view', 'execucoes', 'tempo_total_ms', 'tempo_max_ms']
+    list_filter = ['view']
+    search_fields = ['impressao', 'sql']
+    date_hierarchy = 'hora'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 # Customização do site admin
 admin.site.site_header = "SmartClass - Administração"
 admin.site.site_title = "SmartClass Admin"
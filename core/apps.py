@@ -1,8 +1,17 @@
 # core/apps.py
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
-    verbose_name = 'SmartClass Core'
\ No newline at end of file
+    verbose_name = 'SmartClass Core'
+
+    def ready(self):
+        from . import checks  # noqa: F401 (registra as verificações do deploy)
+
+        if settings.SQL_ESTATISTICAS_ATIVAS:
+            from .consultas import instalar
+            connection_created.connect(instalar, dispatch_uid='core.consultas.instalar')
@@ -0,0 +1,19 @@
+# core/checks.py
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+@register(deploy=True)
+def sessao_em_cache_compartilhado(app_configs, **kwargs):
+    """cached_db só é seguro com um cache compartilhado entre os workers"""
+    if settings.SESSION_ENGINE == 'django.contrib.sessions.backends.cached_db' and settings.CACHE_POR_PROCESSO:
+        return [Warning(
+            'SESSION_ENGINE=cached_db com um cache local de cada processo.',
+            hint=(
+                'Com vários workers, um logout em um processo não invalida a sessão '
+                'guardada no cache dos outros. Configure CACHE_BACKEND com Redis ou '
+                'memcached, ou use SESSION_ENGINE=django.contrib.sessions.backends.db.'
+            ),
+            id='core.W001',
+        )]
+    return []
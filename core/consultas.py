@@ -0,0 +1,255 @@
+# core/consultas.py
+"""
+Estatísticas das consultas SQL por formato
+
+Um execute_wrapper instalado em toda conexão (CoreConfig.ready) mede cada
+consulta e a agrupa pela impressão digital do SQL normalizado: literais e
+parâmetros viram ?, listas IN (...) e VALUES (...) de qualquer tamanho
+ficam iguais. Contagem, tempo total, máximo e um histograma por faixas
+(para o p95) ficam em memória, por impressão e origem (nome da URL,
+tarefa:<tipo> ou comando), e são descarregados a cada
+SQL_ESTATISTICAS_DESCARGA_SEGUNDOS somando na tabela core_estatisticaconsulta.
+
+Consultas acima de SQL_LENTA_MS são registradas no log com a origem e a
+pilha de chamadas do projeto.
+
+Veja os piores formatos com: python manage.py consultas_lentas
+"""
+import functools
+import hashlib
+import logging
+import re
+import threading
+import time
+import traceback
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import EstatisticaConsulta
+
+logger = logging.getLogger(__name__)
+
+# Limites superiores (ms) das faixas do histograma; a última faixa é o excedente
+FAIXAS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Origem das consultas: a requisição em andamento (a view só é conhecida
+# depois do roteamento) ou um texto como 'tarefa:enviar_email'
+origem_consultas = ContextVar('origem_consultas', default='comando')
+
+# Evita medir as próprias consultas da descarga
+_descarregando = ContextVar('descarregando', default=False)
+
+_NORMALIZACOES = [
+    (re.compile(r'/\*.*?\*/|--[^\n]*', re.S), ' '),
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    # Savepoints têm nomes únicos por thread ("s140213_x1")
+    (re.compile(r'SAVEPOINT\s+"[^"]*"', re.I), 'SAVEPOINT ?'),
+    (re.compile(r'%\(\w+\)s|%s|\$\d+'), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\s+'), ' '),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+'), '(...)'),
+]
+
+
+@functools.lru_cache(maxsize=4096)
+def impressao_digital(sql):
+    """
+    Normaliza o SQL e calcula sua impressão digital
+
+    O Django gera o mesmo texto (com %s) para consultas de mesmo formato,
+    então o cache evita refazer as expressões regulares a cada execução.
+
+    Args:
+        sql (str): SQL como enviado ao driver
+
+    Returns:
+        tuple: (impressão de 16 caracteres, SQL normalizado)
+    """
+    normalizado = sql
+    for padrao, troca in _NORMALIZACOES:
+        normalizado = padrao.sub(troca, normalizado)
+    normalizado = normalizado.strip()
+    return hashlib.blake2b(normalizado.encode(), digest_size=8).hexdigest(), normalizado
+
+
+def percentil(histograma, fracao, maximo=None):
+    """
+    Estimativa de um percentil a partir do histograma por faixas
+
+    Interpola linearmente dentro da faixa, como o histogram_quantile do
+    Prometheus.
+
+    Args:
+        histograma (list[int]): Execuções por faixa (len(FAIXAS_MS) + 1)
+        fracao (float): Ex.: 0.95
+        maximo (float): Tempo máximo observado, limita a estimativa
+
+    Returns:
+        float: Tempo estimado em ms (0 sem execuções)
+    """
+    total = sum(histograma)
+    if not total:
+        return 0
+    alvo = fracao * total
+    acumulado = 0
+    for indice, quantidade in enumerate(histograma):
+        if acumulado + quantidade >= alvo and quantidade:
+            if indice == len(FAIXAS_MS):
+                estimativa = FAIXAS_MS[-1] if maximo is None else maximo
+                break
+            inicio = FAIXAS_MS[indice - 1] if indice else 0
+            estimativa = inicio + (FAIXAS_MS[indice] - inicio) * (alvo - acumulado) / quantidade
+            break
+        acumulado += quantidade
+    return estimativa if maximo is None else min(estimativa, maximo)
+
+
+def _faixa(duracao_ms):
+    for indice, limite in enumerate(FAIXAS_MS):
+        if duracao_ms <= limite:
+            return indice
+    return len(FAIXAS_MS)
+
+
+class _Agregador:
+    """Estatísticas do processo desde a última descarga"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.dados = {}
+        self.proxima_descarga = time.monotonic() + settings.SQL_ESTATISTICAS_DESCARGA_SEGUNDOS
+
+    def registrar(self, impressao, sql, origem, duracao_ms):
+        with self.lock:
+            item = self.dados.get((impressao, origem))
+            if item is None:
+                item = self.dados[(impressao, origem)] = {
+                    'sql': sql, 'execucoes': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'histograma': [0] * (len(FAIXAS_MS) + 1),
+                }
+            item['execucoes'] += 1
+            item['total_ms'] += duracao_ms
+            item['max_ms'] = max(item['max_ms'], duracao_ms)
+            item['histograma'][_faixa(duracao_ms)] += 1
+
+    def retirar(self):
+        with self.lock:
+            dados, self.dados = self.dados, {}
+            self.proxima_descarga = time.monotonic() + settings.SQL_ESTATISTICAS_DESCARGA_SEGUNDOS
+        return dados
+
+
+_agregador = None
+
+
+def _nome_origem():
+    origem = origem_consultas.get()
+    if isinstance(origem, str):
+        return origem
+    match = getattr(origem, 'resolver_match', None)
+    return (match.url_name if match else None) or 'desconhecida'
+
+
+def _pilha_do_projeto():
+    """Chamadas do código do projeto até a consulta (sem Django e bibliotecas)"""
+    base = str(settings.BASE_DIR)
+    quadros = [
+        quadro for quadro in traceback.extract_stack()[:-2]
+        if quadro.filename.startswith(base)
+        and 'site-packages' not in quadro.filename
+        and quadro.filename != __file__
+    ]
+    return ''.join(traceback.format_list(quadros[-10:]))
+
+
+def medir_consulta(execute, sql, params, many, context):
+    """execute_wrapper que alimenta as estatísticas e o log de consultas lentas"""
+    if _descarregando.get():
+        return execute(sql, params, many, context)
+
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        impressao, normalizado = impressao_digital(sql)
+        origem = _nome_origem()
+        _agregador.registrar(impressao, normalizado, origem, duracao_ms)
+
+        if duracao_ms >= settings.SQL_LENTA_MS:
+            logger.warning(
+                "Consulta lenta (%.0f ms) em %s [%s]: %s\n%s",
+                duracao_ms, origem, impressao, sql[:2000], _pilha_do_projeto()
+            )
+
+
+def instalar(sender, connection, **kwargs):
+    """Receptor do connection_created: mede todas as consultas da conexão"""
+    global _agregador
+    if _agregador is None:
+        _agregador = _Agregador()
+    if medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(medir_consulta)
+
+
+def descarregar(forcar=False):
+    """
+    Soma as estatísticas em memória à tabela, se já passou o intervalo
+
+    Um único INSERT ... ON CONFLICT para todos os formatos. Chamado pelo
+    MetricasMiddleware depois de cada requisição e pelo worker de tarefas;
+    não roda dentro de transações (um rollback levaria os números junto).
+
+    Args:
+        forcar (bool): Descarrega mesmo antes do intervalo
+
+    Returns:
+        int: Formatos descarregados
+    """
+    if _agregador is None or connection.in_atomic_block:
+        return 0
+    if not forcar and time.monotonic() < _agregador.proxima_descarga:
+        return 0
+
+    dados = _agregador.retirar()
+    if not dados:
+        return 0
+
+    hora = timezone.now().replace(minute=0, second=0, microsecond=0)
+    linhas = [
+        [impressao, origem[:100], hora, item['sql'], item['execucoes'],
+         item['total_ms'], item['max_ms'], item['histograma']]
+        for (impressao, origem), item in dados.items()
+    ]
+    tabela = EstatisticaConsulta._meta.db_table
+
+    contexto = _descarregando.set(True)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {tabela} AS t
+                    (impressao, view, hora, sql, execucoes, tempo_total_ms, tempo_max_ms, histograma)
+                VALUES {', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s)'] * len(linhas))}
+                ON CONFLICT (impressao, view, hora) DO UPDATE SET
+                    execucoes = t.execucoes + EXCLUDED.execucoes,
+                    tempo_total_ms = t.tempo_total_ms + EXCLUDED.tempo_total_ms,
+                    tempo_max_ms = GREATEST(t.tempo_max_ms, EXCLUDED.tempo_max_ms),
+                    histograma = ARRAY(
+                        SELECT a + b FROM unnest(t.histograma, EXCLUDED.histograma) AS u(a, b)
+                    )
+                """,
+                [valor for linha in linhas for valor in linha]
+            )
+    except Exception:
+        # Estatística é diagnóstico: não derruba a requisição que descarregou
+        logger.exception('Não foi possível gravar as estatísticas de consultas SQL')
+        return 0
+    finally:
+        _descarregando.reset(contexto)
+
+    return len(linhas)
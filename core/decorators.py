@@ -1,7 +1,12 @@
 # core/decorators.py
+import hashlib
+from datetime import datetime, time
 from functools import wraps
 from django.shortcuts import redirect
 from django.contrib import messages
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 
 
 def professor_required(view_func):
@@ -50,4 +55,87 @@ def aluno_required(view_func):
 
         return view_func(request, *args, **kwargs)
 
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+
+def staff_required(view_func):
+    """
+    Decorator para views de diagnóstico, restritas a professores staff
+
+    Usage:
+        @staff_required
+        def minha_view(request):
+            # código da view
+    """
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            messages.warning(request, 'Você precisa estar logado como professor.')
+            return redirect('login')
+
+        if not request.user.is_staff:
+            messages.error(request, 'Acesso negado. Esta área é restrita à equipe.')
+            return redirect('professor_atividades')
+
+        return view_func(request, *args, **kwargs)
+
+    return wrapper
+
+
+def resposta_condicional(versao_func):
+    """
+    Decorator que responde 304 Not Modified quando a página não mudou
+
+    versao_func(request, *args, **kwargs) recebe os mesmos argumentos da view
+    e devolve (versao, ultima_alteracao): uma string que muda sempre que os
+    dados exibidos mudam (contagens e timestamps, em uma consulta barata) e o
+    datetime da última alteração. Se devolver None, a view roda normalmente
+    (ex.: 404). O ETag também inclui a sessão, o cookie CSRF e a data de hoje,
+    porque as páginas mostram o usuário, formulários e prazos relativos.
+
+    Deve vir depois de professor_required/aluno_required.
+
+    Usage:
+        @aluno_required
+        @resposta_condicional(versao_da_pagina)
+        def minha_view(request, pk):
+            # código da view
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            # Mensagens pendentes só aparecem numa renderização completa
+            versao = None
+            if request.method in ('GET', 'HEAD') and not len(messages.get_messages(request)):
+                versao = versao_func(request, *args, **kwargs)
+            if versao is None:
+                response = view_func(request, *args, **kwargs)
+                patch_cache_control(response, private=True, no_cache=True)
+                return response
+
+            chave, ultima_alteracao = versao
+            hoje = timezone.localdate()
+            meia_noite = timezone.make_aware(datetime.combine(hoje, time.min))
+            ultima_alteracao = max(ultima_alteracao or meia_noite, meia_noite)
+
+            partes = [chave, hoje, request.session.session_key, request.META.get('CSRF_COOKIE')]
+            etag = '"%s"' % hashlib.blake2b(
+                '|'.join(map(str, partes)).encode(), digest_size=16
+            ).hexdigest()
+            last_modified = int(ultima_alteracao.timestamp())
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response.headers.setdefault('ETag', etag)
+                response.headers.setdefault('Last-Modified', http_date(last_modified))
+            # Só o navegador guarda, e sempre revalida com If-None-Match
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
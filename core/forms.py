@@ -1,6 +1,6 @@
 # core/forms.py
 from django import forms
-from .models import Atividade, Aluno, Submissao
+from .models import Atividade, Aluno, Submissao, Turma
 
 
 class AtividadeForm(forms.ModelForm):
@@ -10,8 +10,11 @@ class AtividadeForm(forms.ModelForm):
 
     class Meta:
         model = Atividade
-        fields = ['titulo', 'descricao', 'prazo_entrega']
+        fields = ['turma', 'titulo', 'descricao', 'prazo_entrega']
         widgets = {
+            'turma': forms.Select(attrs={
+                'class': 'block w-full px-4 py-3 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent'
+            }),
             'titulo': forms.TextInput(attrs={
                 'class': 'block w-full px-4 py-3 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent',
                 'placeholder': 'Ex: Exercícios de Matemática - Frações'
@@ -27,11 +30,84 @@ class AtividadeForm(forms.ModelForm):
             }),
         }
         labels = {
+            'turma': 'Turma',
             'titulo': 'Título da Atividade',
             'descricao': 'Descrição da Atividade',
             'prazo_entrega': 'Prazo de Entrega'
         }
 
+    def __init__(self, *args, professor=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Só as turmas do próprio professor
+        if professor is not None:
+            self.fields['turma'].queryset = professor.turmas.all()
+
+
+class UnidadeForm(forms.Form):
+    """
+    Formulário para gerar uma unidade (várias atividades) com IA
+    """
+    MAX_TEMAS = 10
+
+    CLASSE_CAMPO = 'block w-full px-4 py-3 border border-gray-300 rounded-lg focus:ring-2 focus:ring-purple-500 focus:border-transparent'
+
+    DISCIPLINAS = [('', 'Selecione...')] + [(d, d) for d in [
+        'Matemática', 'Português', 'História', 'Geografia', 'Ciências', 'Física',
+        'Química', 'Biologia', 'Inglês', 'Artes', 'Educação Física',
+    ]]
+    NIVEIS = [('', 'Selecione...')] + [(n, n) for n in ['Fácil', 'Médio', 'Difícil', 'Avançado']]
+    TIPOS = [('', 'Selecione...')] + [(t, t) for t in [
+        'Dissertativa', 'Análise de Texto', 'Resolução de Problemas', 'Pesquisa', 'Estudo de Caso',
+    ]]
+
+    temas = forms.CharField(
+        label='Temas (um por linha)',
+        widget=forms.Textarea(attrs={
+            'class': CLASSE_CAMPO,
+            'rows': 8,
+            'placeholder': 'Frações\nNúmeros decimais\nPorcentagem',
+        }),
+    )
+    turma = forms.ModelChoiceField(
+        queryset=Turma.objects.none(),
+        label='Turma',
+        widget=forms.Select(attrs={'class': CLASSE_CAMPO}),
+    )
+    prazo_entrega = forms.DateField(
+        label='Prazo de Entrega',
+        widget=forms.DateInput(attrs={'type': 'date', 'class': CLASSE_CAMPO}),
+    )
+    disciplina = forms.ChoiceField(
+        choices=DISCIPLINAS, required=False, label='Disciplina',
+        widget=forms.Select(attrs={'class': CLASSE_CAMPO}),
+    )
+    nivel_dificuldade = forms.ChoiceField(
+        choices=NIVEIS, required=False, label='Nível de Dificuldade',
+        widget=forms.Select(attrs={'class': CLASSE_CAMPO}),
+    )
+    tipo_atividade = forms.ChoiceField(
+        choices=TIPOS, required=False, label='Tipo de Atividade',
+        widget=forms.Select(attrs={'class': CLASSE_CAMPO}),
+    )
+
+    def __init__(self, *args, professor=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if professor is not None:
+            self.fields['turma'].queryset = professor.turmas.all()
+
+    def clean_temas(self):
+        """Converte o texto em uma lista de temas válidos"""
+        temas = [linha.strip() for linha in self.cleaned_data['temas'].splitlines() if linha.strip()]
+
+        if not temas:
+            raise forms.ValidationError('Informe pelo menos um tema.')
+        if len(temas) > self.MAX_TEMAS:
+            raise forms.ValidationError(f'Informe no máximo {self.MAX_TEMAS} temas por unidade.')
+        curtos = [tema for tema in temas if len(tema) < 3]
+        if curtos:
+            raise forms.ValidationError(f'Temas muito curtos: {", ".join(curtos)}')
+        return temas
+
 
 class AlunoForm(forms.ModelForm):
     """
@@ -100,4 +176,32 @@ class CorrecaoForm(forms.ModelForm):
         labels = {
             'nota': 'Nota (0 a 10)',
             'observacao': 'Observação / Feedback'
-        }
\ No newline at end of file
+        }
+
+
+class ImportacaoNotasForm(forms.Form):
+    """
+    Formulário de importação de notas por planilha (CSV)
+    """
+    # Sobra para dezenas de milhares de linhas
+    MAX_BYTES = 5 * 1024 * 1024
+
+    arquivo = forms.FileField(
+        label='Planilha (CSV)',
+        widget=forms.ClearableFileInput(attrs={
+            'class': 'block w-full text-sm text-gray-700 border border-gray-300 rounded-lg p-2',
+            'accept': '.csv,text/csv',
+        })
+    )
+    somente_conferir = forms.BooleanField(
+        required=False,
+        label='Apenas conferir (não aplicar as notas)'
+    )
+
+    def clean_arquivo(self):
+        arquivo = self.cleaned_data['arquivo']
+        if not arquivo.name.lower().endswith('.csv'):
+            raise forms.ValidationError('Envie um arquivo .csv (no Excel: Salvar como > CSV).')
+        if arquivo.size > self.MAX_BYTES:
+            raise forms.ValidationError('Arquivo muito grande (máximo de 5 MB).')
+        return arquivo
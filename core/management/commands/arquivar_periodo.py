@@ -0,0 +1,270 @@
+# core/management/commands/arquivar_periodo.py
+import io
+import json
+import logging
+import os
+import tarfile
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import AssinaturaSubmissao, Atividade, Rascunho, Submissao, Turma
+
+logger = logging.getLogger(__name__)
+
+# Ordem importa: atividades antes das submissões na restauração
+TABELAS = [Atividade, Submissao]
+
+# Colunas criadas depois de arquivos antigos que não têm um valor padrão
+# fixo: expressão SQL sobre a linha restaurada (r)
+PREENCHIMENTO = {
+    # Atividades de antes das turmas vão para a primeira turma do professor
+    # (a "Turma padrão" criada na migração)
+    Atividade: {
+        'turma_id': (
+            f'(SELECT MIN(t.id) FROM {Turma._meta.db_table} t WHERE t.professor_id = r.professor_id)'
+        ),
+    },
+    Submissao: {'atualizado_em': 'COALESCE(r.corrigido_em, r.enviado_em)'},
+}
+
+
+class Command(BaseCommand):
+    """
+    Arquiva períodos letivos antigos em um arquivo .tar.gz e restaura sob demanda
+
+    Todas as atividades com prazo_entrega até a data de corte são exportadas
+    (junto com suas submissões) via COPY do PostgreSQL e removidas do banco,
+    deixando as tabelas e índices do período atual pequenos.
+
+    Usage:
+        python manage.py arquivar_periodo --ate 2025-06-30
+        python manage.py arquivar_periodo --ate 2025-06-30 --dry-run
+        python manage.py arquivar_periodo --restaurar media/arquivos/periodo_ate_2025-06-30.tar.gz
+    """
+
+    help = 'Arquiva (ou restaura) atividades e submissões de períodos antigos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ate', type=date.fromisoformat,
+            help='Data de corte (AAAA-MM-DD): arquiva atividades com prazo até essa data'
+        )
+        parser.add_argument(
+            '--restaurar', metavar='ARQUIVO',
+            help='Caminho de um arquivo gerado anteriormente para reimportar'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Apenas mostra quantas linhas seriam arquivadas'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('O arquivamento usa COPY e requer PostgreSQL.')
+
+        if options['restaurar']:
+            self.restaurar(options['restaurar'])
+        elif options['ate']:
+            self.arquivar(options['ate'], options['dry_run'])
+        else:
+            raise CommandError('Informe --ate AAAA-MM-DD ou --restaurar ARQUIVO.')
+
+    def _consultas(self, ids):
+        """Monta os SELECTs de exportação de cada tabela para as atividades arquivadas"""
+        return {
+            Atividade._meta.db_table: (
+                f"SELECT * FROM {Atividade._meta.db_table} WHERE id = ANY(%s)", [ids]
+            ),
+            Submissao._meta.db_table: (
+                f"SELECT * FROM {Submissao._meta.db_table} WHERE atividade_id = ANY(%s)", [ids]
+            ),
+        }
+
+    def arquivar(self, corte, dry_run):
+        """
+        Exporta e remove as atividades (e submissões) com prazo até a data de corte
+
+        Args:
+            corte (date): Data limite do período arquivado
+            dry_run (bool): Se True, não grava nem remove nada
+        """
+        atividades = Atividade.objects.filter(prazo_entrega__lte=corte)
+        submissoes = Submissao.objects.filter(atividade__in=atividades)
+
+        if dry_run:
+            self.stdout.write(
+                f'{atividades.count()} atividades e {submissoes.count()} submissões '
+                f'seriam arquivadas.'
+            )
+            return
+
+        pasta = os.path.join(settings.MEDIA_ROOT, 'arquivos')
+        os.makedirs(pasta, exist_ok=True)
+        caminho = os.path.join(pasta, f'periodo_ate_{corte.isoformat()}.tar.gz')
+        if os.path.exists(caminho):
+            raise CommandError(f'O arquivo {caminho} já existe.')
+
+        # Uma única transação: o FOR UPDATE nas atividades bloqueia novas
+        # submissões nelas enquanto exportamos, então nada se perde entre o
+        # COPY e o DELETE. O arquivo é gravado antes do commit.
+        try:
+            with transaction.atomic():
+                ids = list(atividades.select_for_update().values_list('id', flat=True))
+                if not ids:
+                    self.stdout.write('Nenhuma atividade encontrada até essa data.')
+                    return
+
+                manifesto = {
+                    'corte': corte.isoformat(),
+                    'gerado_em': timezone.now().isoformat(),
+                    'tabelas': {},
+                }
+
+                with connection.cursor() as cursor, tarfile.open(caminho, 'w:gz') as tar:
+                    for tabela, (sql, params) in self._consultas(ids).items():
+                        buffer = io.BytesIO()
+                        cursor.copy_expert(
+                            f"COPY ({cursor.mogrify(sql, params).decode()}) TO STDOUT WITH CSV HEADER",
+                            buffer
+                        )
+                        manifesto['tabelas'][tabela] = cursor.rowcount
+                        self._adicionar(tar, f'{tabela}.csv', buffer.getvalue())
+
+                    self._adicionar(
+                        tar, 'manifesto.json', json.dumps(manifesto, indent=2).encode()
+                    )
+
+                    # DELETE direto (sem o collector do ORM carregar as linhas).
+                    # As assinaturas de similaridade são derivadas: não vão
+                    # para o arquivo e são recalculadas após uma restauração
+                    cursor.execute(
+                        f"DELETE FROM {AssinaturaSubmissao._meta.db_table} WHERE submissao_id IN "
+                        f"(SELECT id FROM {Submissao._meta.db_table} WHERE atividade_id = ANY(%s))", [ids]
+                    )
+                    # Rascunhos também não são arquivados: a atividade já terminou
+                    cursor.execute(
+                        f"DELETE FROM {Rascunho._meta.db_table} WHERE atividade_id = ANY(%s)", [ids]
+                    )
+                    cursor.execute(
+                        f"DELETE FROM {Submissao._meta.db_table} WHERE atividade_id = ANY(%s)", [ids]
+                    )
+                    submissoes_removidas = cursor.rowcount
+                    cursor.execute(
+                        f"DELETE FROM {Atividade._meta.db_table} WHERE id = ANY(%s)", [ids]
+                    )
+                    atividades_removidas = cursor.rowcount
+        except Exception:
+            # Não deixa um arquivo parcial para trás se algo falhar antes do commit
+            if os.path.exists(caminho):
+                os.remove(caminho)
+            raise
+
+        logger.info(f"Período até {corte} arquivado em {caminho}")
+        self.stdout.write(self.style.SUCCESS(
+            f'{atividades_removidas} atividades e {submissoes_removidas} submissões '
+            f'arquivadas em {caminho}'
+        ))
+
+    def restaurar(self, caminho):
+        """
+        Reimporta um arquivo gerado por arquivar()
+
+        Cada tabela é restaurada na sua própria transação, curta: o COPY vai
+        para uma tabela temporária e só o INSERT final toca a tabela real.
+        Linhas que já existem são ignoradas, então uma restauração
+        interrompida pode ser repetida.
+
+        Args:
+            caminho (str): Caminho do .tar.gz
+        """
+        if not os.path.exists(caminho):
+            raise CommandError(f'Arquivo {caminho} não encontrado.')
+
+        with tarfile.open(caminho, 'r:gz') as tar:
+            for model in TABELAS:
+                conteudo = tar.extractfile(f'{model._meta.db_table}.csv').read()
+                total = self._restaurar_tabela(model, conteudo)
+                self.stdout.write(f'{model._meta.db_table}: {total} linhas restauradas.')
+
+        logger.info(f"Arquivo {caminho} restaurado")
+        self.stdout.write(self.style.SUCCESS('Restauração concluída.'))
+
+    def _preenchimento(self, model, field):
+        """
+        Valor de uma coluna que não existia quando o arquivo foi gerado
+
+        Returns:
+            tuple: (expressão SQL, parâmetros), ou None para deixar NULL
+        """
+        especial = PREENCHIMENTO.get(model, {}).get(field.column)
+        if especial:
+            return especial, []
+        if field.null:
+            return None
+        if field.has_default():
+            return '%s', [field.get_db_prep_save(field.get_default(), connection)]
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+            return 'now()', []
+        raise CommandError(
+            f'A coluna {model._meta.db_table}.{field.column} não existe no arquivo '
+            f'e não tem valor padrão para a restauração.'
+        )
+
+    def _restaurar_tabela(self, model, conteudo):
+        """
+        Restaura uma tabela a partir do CSV do arquivo
+
+        O CSV traz as colunas da época do arquivamento. As linhas passam
+        por uma tabela temporária, onde as colunas criadas depois recebem o
+        valor de _preenchimento() (o banco não tem defaults: NOT NULL sem
+        valor falharia no INSERT).
+
+        Returns:
+            int: Linhas restauradas
+        """
+        tabela = model._meta.db_table
+        temporaria = f'restauracao_{tabela}'
+        cabecalho = conteudo.split(b'\n', 1)[0].decode().strip()
+        colunas = set(cabecalho.split(','))
+
+        atuais = {field.column: field for field in model._meta.concrete_fields}
+        desconhecidas = colunas - set(atuais)
+        if desconhecidas:
+            raise CommandError(f'Colunas desconhecidas em {tabela}: {", ".join(sorted(desconhecidas))}')
+        faltando = [field for column, field in atuais.items() if column not in colunas]
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"CREATE TEMP TABLE {temporaria} (LIKE {tabela} INCLUDING DEFAULTS)")
+            for field in faltando:
+                cursor.execute(f"ALTER TABLE {temporaria} ALTER COLUMN {field.column} DROP NOT NULL")
+            cursor.copy_expert(
+                f"COPY {temporaria} ({cabecalho}) FROM STDIN WITH CSV HEADER",
+                io.BytesIO(conteudo)
+            )
+
+            atribuicoes, params = [], []
+            for field in faltando:
+                preenchimento = self._preenchimento(model, field)
+                if preenchimento:
+                    atribuicoes.append(f'{field.column} = {preenchimento[0]}')
+                    params += preenchimento[1]
+            if atribuicoes:
+                cursor.execute(f"UPDATE {temporaria} r SET {', '.join(atribuicoes)}", params)
+
+            cursor.execute(
+                f"INSERT INTO {tabela} SELECT * FROM {temporaria} ON CONFLICT (id) DO NOTHING"
+            )
+            total = cursor.rowcount
+            cursor.execute(f"DROP TABLE {temporaria}")
+        return total
+
+    def _adicionar(self, tar, nome, conteudo):
+        """Adiciona um arquivo em memória ao tar"""
+        info = tarfile.TarInfo(nome)
+        info.size = len(conteudo)
+        info.mtime = int(timezone.now().timestamp())
+        tar.addfile(info, io.BytesIO(conteudo))
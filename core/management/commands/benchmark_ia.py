@@ -0,0 +1,117 @@
+# core/management/commands/benchmark_ia.py
+import itertools
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.services.gemini_service import GeminiService
+from core.services.provedores_ia import ProvedorFalso, obter_provedor
+
+
+class Command(BaseCommand):
+    """
+    Mede a geração de atividades sob concorrência
+
+    Passa pelo mesmo caminho das views (orçamento, cache, contabilização e
+    parse), então mostra o custo da nossa camada além da latência do modelo.
+    Com --falso, usa o ProvedorFalso (IA_PROVEDOR_FALSO) e não acessa a rede.
+
+    Usage:
+        python manage.py benchmark_ia --falso --chamadas 200 --concorrencia 20
+        python manage.py benchmark_ia --falso --temas 10 --latencia-media 0.5 --taxa-erro 0.1
+    """
+
+    help = 'Mede latência, vazão e erros da geração com IA em chamadas concorrentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chamadas', type=int, default=100, help='Total de chamadas')
+        parser.add_argument('--concorrencia', type=int, default=10, help='Chamadas simultâneas')
+        parser.add_argument(
+            '--temas', type=int, default=0,
+            help='Quantidade de temas distintos (repetir temas exercita o cache); 0 = todos distintos'
+        )
+        parser.add_argument('--falso', action='store_true', help='Usa o ProvedorFalso')
+        parser.add_argument('--latencia', help='Distribuição do provedor falso')
+        parser.add_argument('--latencia-media', type=float, help='Latência média do provedor falso (s)')
+        parser.add_argument('--taxa-erro', type=float, help='Fração de erros do provedor falso')
+
+    def handle(self, *args, **options):
+        if options['chamadas'] < 1 or options['concorrencia'] < 1:
+            raise CommandError('--chamadas e --concorrencia devem ser positivos.')
+
+        if options['falso']:
+            ajustes = {
+                chave: options[opcao]
+                for chave, opcao in [
+                    ('latencia', 'latencia'),
+                    ('latencia_media', 'latencia_media'),
+                    ('taxa_erro', 'taxa_erro'),
+                ]
+                if options[opcao] is not None
+            }
+            provedor = ProvedorFalso(**ajustes)
+        else:
+            provedor = obter_provedor()
+
+        # Conta as chamadas que chegaram ao provedor (o resto veio do cache)
+        chamadas_provedor = itertools.count()
+        gerar_original = provedor.gerar
+
+        def gerar_contando(*args, **kwargs):
+            next(chamadas_provedor)
+            return gerar_original(*args, **kwargs)
+
+        provedor.gerar = gerar_contando
+        servico = GeminiService(provedor=provedor)
+
+        total_temas = options['temas'] or options['chamadas']
+        latencias = []
+        erros = Counter()
+        lock = threading.Lock()
+
+        def chamar(numero):
+            inicio = time.monotonic()
+            try:
+                servico.gerar_atividade(f'Tema de teste {numero % total_temas}')
+                resultado = None
+            except Exception as e:
+                resultado = type(e.__context__ or e).__name__
+            finally:
+                connection.close()
+            with lock:
+                latencias.append(time.monotonic() - inicio)
+                if resultado:
+                    erros[resultado] += 1
+
+        self.stdout.write(
+            f'{options["chamadas"]} chamadas, concorrência {options["concorrencia"]}, '
+            f'provedor {type(provedor).__name__}...'
+        )
+        inicio = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['concorrencia']) as pool:
+            list(pool.map(chamar, range(options['chamadas'])))
+        duracao = time.monotonic() - inicio
+
+        chegaram = next(chamadas_provedor)
+        self.stdout.write(f'Tempo total:       {duracao:.2f}s ({len(latencias) / duracao:.1f} chamadas/s)')
+        if len(latencias) > 1:
+            percentis = statistics.quantiles(latencias, n=100, method='inclusive')
+            self.stdout.write(
+                f'Latência:          p50 {percentis[49]:.3f}s | p95 {percentis[94]:.3f}s | '
+                f'p99 {percentis[98]:.3f}s | máx {max(latencias):.3f}s'
+            )
+        else:
+            # Uma amostra só não tem percentis
+            self.stdout.write(f'Latência:          {latencias[0]:.3f}s')
+        self.stdout.write(f'Chamadas ao modelo: {chegaram} ({len(latencias) - chegaram} do cache)')
+        if erros:
+            self.stdout.write(self.style.WARNING(
+                'Erros: ' + ', '.join(f'{nome} x{total}' for nome, total in erros.most_common())
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('Nenhum erro.'))
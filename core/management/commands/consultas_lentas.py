@@ -0,0 +1,100 @@
+# core/management/commands/consultas_lentas.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.consultas import FAIXAS_MS, percentil
+from core.models import EstatisticaConsulta
+
+ORDENACOES = {
+    'total': lambda item: item['total_ms'],
+    'p95': lambda item: item['p95_ms'],
+    'media': lambda item: item['media_ms'],
+    'max': lambda item: item['max_ms'],
+    'execucoes': lambda item: item['execucoes'],
+}
+
+
+class Command(BaseCommand):
+    """
+    Mostra os formatos de consulta SQL mais custosos
+
+    Soma as estatísticas gravadas pelos processos (core/consultas.py) no
+    período, por impressão digital, com as origens que mais pesaram.
+
+    Usage:
+        python manage.py consultas_lentas
+        python manage.py consultas_lentas --horas 2 --ordem p95 --top 10
+        python manage.py consultas_lentas --view atividade_submissoes
+        python manage.py consultas_lentas --apagar-dias 30
+    """
+
+    help = 'Lista os formatos de consulta SQL com maior custo no período'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=int, default=24, help='Período analisado')
+        parser.add_argument('--top', type=int, default=15, help='Quantidade de formatos')
+        parser.add_argument(
+            '--ordem', choices=sorted(ORDENACOES), default='total',
+            help='Critério: tempo total (padrão), p95, média, máximo ou execuções'
+        )
+        parser.add_argument('--view', help='Só as consultas desta origem (nome da URL ou tarefa:<tipo>)')
+        parser.add_argument(
+            '--apagar-dias', type=int,
+            help='Apaga as estatísticas com mais de N dias em vez de listar'
+        )
+
+    def handle(self, *args, **options):
+        if options['apagar_dias'] is not None:
+            if options['apagar_dias'] < 1:
+                raise CommandError('--apagar-dias deve ser positivo.')
+            limite = timezone.now() - timedelta(days=options['apagar_dias'])
+            apagadas, _ = EstatisticaConsulta.objects.filter(hora__lt=limite).delete()
+            self.stdout.write(f'{apagadas} estatísticas apagadas.')
+            return
+
+        desde = timezone.now() - timedelta(hours=options['horas'])
+        linhas = EstatisticaConsulta.objects.filter(hora__gte=desde)
+        if options['view']:
+            linhas = linhas.filter(view=options['view'])
+
+        formatos = {}
+        for linha in linhas.iterator():
+            item = formatos.setdefault(linha.impressao, {
+                'impressao': linha.impressao, 'sql': linha.sql, 'execucoes': 0,
+                'total_ms': 0.0, 'max_ms': 0.0, 'histograma': [0] * (len(FAIXAS_MS) + 1),
+                'origens': {},
+            })
+            item['execucoes'] += linha.execucoes
+            item['total_ms'] += linha.tempo_total_ms
+            item['max_ms'] = max(item['max_ms'], linha.tempo_max_ms)
+            item['histograma'] = [a + b for a, b in zip(item['histograma'], linha.histograma)]
+            item['origens'][linha.view] = item['origens'].get(linha.view, 0) + linha.tempo_total_ms
+
+        if not formatos:
+            self.stdout.write('Nenhuma consulta registrada no período.')
+            return
+
+        for item in formatos.values():
+            item['media_ms'] = item['total_ms'] / item['execucoes']
+            item['p95_ms'] = percentil(item['histograma'], 0.95, item['max_ms'])
+
+        total_geral = sum(item['total_ms'] for item in formatos.values()) or 1
+        piores = sorted(formatos.values(), key=ORDENACOES[options['ordem']], reverse=True)
+
+        self.stdout.write(
+            f'{len(formatos)} formatos nas últimas {options["horas"]}h, '
+            f'{total_geral / 1000:.1f}s no banco. Ordem: {options["ordem"]}.\n'
+        )
+        for posicao, item in enumerate(piores[:options['top']], start=1):
+            origens = sorted(item['origens'].items(), key=lambda origem: origem[1], reverse=True)
+            self.stdout.write(self.style.WARNING(
+                f'{posicao:>2}. [{item["impressao"]}] total {item["total_ms"] / 1000:.2f}s '
+                f'({item["total_ms"] / total_geral:.0%}) | {item["execucoes"]} execuções | '
+                f'média {item["media_ms"]:.1f}ms | p95 {item["p95_ms"]:.1f}ms | máx {item["max_ms"]:.1f}ms'
+            ))
+            self.stdout.write(
+                '    origens: ' + ', '.join(f'{nome} ({tempo / 1000:.2f}s)' for nome, tempo in origens[:5])
+            )
+            self.stdout.write(f'    {item["sql"][:500]}\n')
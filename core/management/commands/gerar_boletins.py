@@ -0,0 +1,73 @@
+# core/management/commands/gerar_boletins.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Professor, Turma
+from core.services.boletins import LOTE_VALIDO, gerar_boletins, novo_lote
+from core.tarefas import enfileirar
+
+
+class Command(BaseCommand):
+    """
+    Gera os boletins de fim de período (HTML e CSV por aluno, em um .zip)
+
+    Os dados saem de poucas consultas e a renderização roda em um pool de
+    processos. O .zip fica em MEDIA_ROOT/boletins/<professor>/<lote>.zip.
+    Se a geração for interrompida, rode de novo com o mesmo --lote para
+    continuar de onde parou.
+
+    Usage:
+        python manage.py gerar_boletins --professor prof1
+        python manage.py gerar_boletins --professor prof1 --turma 3 --processos 8
+        python manage.py gerar_boletins --professor prof1 --lote 3o-ano-a-20261215-183000
+        python manage.py gerar_boletins --professor prof1 --segundo-plano
+    """
+
+    help = 'Gera os boletins dos alunos em um pool de processos e compacta em .zip'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--professor', required=True, help='Usuário do professor')
+        parser.add_argument('--turma', type=int, help='Id da turma (padrão: todas as turmas do professor)')
+        parser.add_argument('--lote', help='Nome do lote; repetir o nome retoma uma geração interrompida')
+        parser.add_argument('--processos', type=int, help='Tamanho do pool (padrão: BOLETINS_PROCESSOS)')
+        parser.add_argument(
+            '--segundo-plano', action='store_true',
+            help='Enfileira a geração para o processar_tarefas em vez de rodar aqui'
+        )
+
+    def handle(self, *args, **options):
+        professor = Professor.objects.filter(username=options['professor']).first()
+        if professor is None:
+            raise CommandError(f'Professor "{options["professor"]}" não encontrado.')
+
+        turma = None
+        if options['turma']:
+            turma = Turma.objects.filter(pk=options['turma'], professor=professor).first()
+            if turma is None:
+                raise CommandError(f'Turma {options["turma"]} não encontrada para este professor.')
+
+        lote = options['lote'] or novo_lote(turma)
+        if not LOTE_VALIDO.match(lote):
+            raise CommandError('Use só letras, números, _ e - no nome do lote.')
+        if options['processos'] is not None and options['processos'] < 1:
+            raise CommandError('--processos deve ser positivo.')
+
+        if options['segundo_plano']:
+            tarefa = enfileirar(
+                'gerar_boletins', professor_id=professor.pk, lote=lote,
+                turma_id=turma.pk if turma else None,
+            )
+            self.stdout.write(f'Tarefa {tarefa.pk} enfileirada (lote {lote}).')
+            return
+
+        def progresso(percentual):
+            self.stdout.write(f'\r{percentual}%', ending='')
+            self.stdout.flush()
+
+        inicio = time.monotonic()
+        caminho = gerar_boletins(
+            professor, turma, lote=lote, processos=options['processos'], progresso=progresso
+        )
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f'Boletins prontos em {time.monotonic() - inicio:.1f}s: {caminho}'))
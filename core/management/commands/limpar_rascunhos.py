@@ -0,0 +1,91 @@
+# core/management/commands/limpar_rascunhos.py
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from core.models import Atividade, Rascunho, Submissao
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Remove rascunhos abandonados
+
+    Apaga em lotes os rascunhos sem alteração há mais de
+    RASCUNHO_RETENCAO_DIAS, os de atividades encerradas e os que sobraram
+    de respostas já enviadas.
+
+    Usage:
+        python manage.py limpar_rascunhos
+        python manage.py limpar_rascunhos --dias 7
+        # ou via cron: 30 3 * * * python manage.py limpar_rascunhos
+    """
+
+    help = 'Remove rascunhos abandonados em lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=settings.RASCUNHO_RETENCAO_DIAS,
+            help='Dias sem alteração até o rascunho ser considerado abandonado'
+        )
+        parser.add_argument(
+            '--lote', type=int, default=5000,
+            help='Quantidade máxima de rascunhos removidos por DELETE'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Executa continuamente, aguardando --intervalo segundos entre as limpezas'
+        )
+        parser.add_argument(
+            '--intervalo', type=int, default=3600,
+            help='Segundos entre execuções no modo --loop'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            removidos = self.limpar(options['dias'], options['lote'])
+            self.stdout.write(f'{removidos} rascunhos removidos.')
+
+            if not options['loop']:
+                break
+            time.sleep(options['intervalo'])
+
+    def limpar(self, dias, lote):
+        """
+        Apaga os rascunhos abandonados em lotes
+
+        Args:
+            dias (int): Dias sem alteração
+            lote (int): Tamanho máximo de cada DELETE
+
+        Returns:
+            int: Total de rascunhos removidos
+        """
+        limite = timezone.now() - timedelta(days=dias)
+        enviada = Submissao.objects.filter(
+            atividade_id=OuterRef('atividade_id'), aluno_id=OuterRef('aluno_id')
+        )
+        abandonados = Rascunho.objects.filter(
+            Q(atualizado_em__lt=limite)
+            | Q(atividade__status=Atividade.STATUS_ENCERRADA)
+            | Exists(enviada)
+        )
+        total = 0
+
+        while True:
+            ids = list(abandonados.values_list('id', flat=True)[:lote])
+            if not ids:
+                break
+
+            # Rascunho não tem dependentes: o ORM apaga com um único DELETE
+            removidos, _ = Rascunho.objects.filter(id__in=ids).delete()
+            total += removidos
+
+        logger.info(f"Limpeza de rascunhos concluída: {total} removidos")
+        return total
@@ -0,0 +1,75 @@
+# core/management/commands/limpar_sessoes.py
+import logging
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Remove sessões expiradas da tabela django_session
+
+    Diferente do clearsessions do Django, apaga em lotes pequenos para não
+    segurar locks na tabela durante os horários de pico.
+
+    Usage:
+        python manage.py limpar_sessoes
+        python manage.py limpar_sessoes --loop --intervalo 3600   # periódico
+        # ou via cron: 0 * * * * python manage.py limpar_sessoes
+    """
+
+    help = 'Remove sessões expiradas do banco em lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=5000,
+            help='Quantidade máxima de sessões removidas por DELETE'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Executa continuamente, aguardando --intervalo segundos entre as limpezas'
+        )
+        parser.add_argument(
+            '--intervalo', type=int, default=3600,
+            help='Segundos entre execuções no modo --loop'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            removidas = self.limpar(options['lote'])
+            self.stdout.write(f'{removidas} sessões expiradas removidas.')
+
+            if not options['loop']:
+                break
+            time.sleep(options['intervalo'])
+
+    def limpar(self, lote):
+        """
+        Apaga as sessões expiradas em lotes
+
+        Args:
+            lote (int): Tamanho máximo de cada DELETE
+
+        Returns:
+            int: Total de sessões removidas
+        """
+        agora = timezone.now()
+        total = 0
+
+        while True:
+            chaves = list(
+                Session.objects.filter(expire_date__lt=agora)
+                .values_list('session_key', flat=True)[:lote]
+            )
+            if not chaves:
+                break
+
+            removidas, _ = Session.objects.filter(session_key__in=chaves).delete()
+            total += removidas
+
+        logger.info(f"Limpeza de sessões concluída: {total} removidas")
+        return total
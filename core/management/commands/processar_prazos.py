@@ -0,0 +1,80 @@
+# core/management/commands/processar_prazos.py
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Atividade
+from core.tarefas import enfileirar_em_lote
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Encerra as atividades cujo prazo de entrega passou
+
+    Marca em lote (um UPDATE) as atividades abertas com prazo vencido como
+    encerradas e enfileira o resumo de pendências de cada uma para o professor.
+
+    Usage:
+        python manage.py processar_prazos
+        python manage.py processar_prazos --loop --intervalo 300
+        # ou via cron: 5 0 * * * python manage.py processar_prazos
+    """
+
+    help = 'Encerra atividades com prazo vencido e enfileira os resumos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Executa continuamente, aguardando --intervalo segundos entre as execuções'
+        )
+        parser.add_argument(
+            '--intervalo', type=int, default=300,
+            help='Segundos entre execuções no modo --loop'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            encerradas = self.processar()
+            if encerradas:
+                self.stdout.write(f'{encerradas} atividades encerradas.')
+
+            if not options['loop']:
+                break
+            time.sleep(options['intervalo'])
+
+    def processar(self):
+        """
+        Encerra as atividades vencidas
+
+        Returns:
+            int: Quantidade de atividades encerradas
+        """
+        hoje = timezone.localdate()
+
+        with transaction.atomic():
+            # SKIP LOCKED: duas instâncias do processador não encerram a mesma atividade
+            ids = list(
+                Atividade.objects.select_for_update(skip_locked=True)
+                .filter(status=Atividade.STATUS_ABERTA, prazo_entrega__lt=hoje)
+                .values_list('id', flat=True)
+            )
+            if not ids:
+                return 0
+
+            # update() não passa pelo auto_now: updated_at é atualizado aqui
+            # para invalidar o ETag das páginas da atividade
+            agora = timezone.now()
+            Atividade.objects.filter(id__in=ids).update(
+                status=Atividade.STATUS_ENCERRADA,
+                encerrada_em=agora,
+                updated_at=agora
+            )
+            enfileirar_em_lote('resumo_pendencias', [{'atividade_id': pk} for pk in ids])
+
+        logger.info(f"{len(ids)} atividades encerradas pelo processador de prazos")
+        return len(ids)
@@ -0,0 +1,43 @@
+# core/management/commands/processar_tarefas.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.tarefas import executar_pendentes
+
+
+class Command(BaseCommand):
+    """
+    Worker da fila de tarefas em segundo plano (core.tarefas)
+
+    Usage:
+        python manage.py processar_tarefas            # executa as pendentes e sai
+        python manage.py processar_tarefas --loop     # worker contínuo
+    """
+
+    help = 'Executa as tarefas em segundo plano pendentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=10,
+            help='Quantidade de tarefas reservadas por rodada'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Executa continuamente, aguardando --intervalo segundos quando a fila está vazia'
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=5,
+            help='Segundos de espera com a fila vazia no modo --loop'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            executadas = executar_pendentes(options['lote'])
+            if executadas:
+                self.stdout.write(f'{executadas} tarefas executadas.')
+                continue
+
+            if not options['loop']:
+                break
+            time.sleep(options['intervalo'])
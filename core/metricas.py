@@ -0,0 +1,115 @@
+# core/metricas.py
+"""
+Métricas no formato Prometheus
+
+Com vários workers do gunicorn, defina PROMETHEUS_MULTIPROC_DIR (diretório
+compartilhado e vazio a cada deploy): cada processo grava seus valores ali e
+o endpoint /metrics agrega todos. Veja gunicorn.conf.py.
+"""
+import os
+
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+# Requisições HTTP, por nome de URL (pim/urls.py)
+HTTP_REQUISICOES = Counter(
+    'smartclass_http_requisicoes_total',
+    'Requisições HTTP atendidas',
+    ['view', 'metodo', 'status'],
+)
+HTTP_LATENCIA = Histogram(
+    'smartclass_http_latencia_segundos',
+    'Tempo de resposta das views',
+    ['view'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+# Banco de dados
+DB_CONSULTA_LATENCIA = Histogram(
+    'smartclass_db_consulta_segundos',
+    'Tempo de cada consulta SQL',
+    ['view'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1),
+)
+DB_CONSULTAS_POR_REQUISICAO = Histogram(
+    'smartclass_db_consultas_por_requisicao',
+    'Quantidade de consultas SQL por requisição',
+    ['view'],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200),
+)
+
+# IA (Gemini)
+GEMINI_LATENCIA = Histogram(
+    'smartclass_gemini_latencia_segundos',
+    'Tempo das chamadas ao Gemini',
+    ['operacao'],
+    buckets=(0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+GEMINI_ERROS = Counter(
+    'smartclass_gemini_erros_total',
+    'Chamadas ao Gemini que falharam',
+    ['operacao'],
+)
+GEMINI_RESPOSTAS = Counter(
+    'smartclass_gemini_respostas_total',
+    'Resultado do parse das respostas estruturadas (json, reparada, falha)',
+    ['resultado'],
+)
+
+# Cache (hit ratio = hit / (hit + miss))
+CACHE_CONSULTAS = Counter(
+    'smartclass_cache_consultas_total',
+    'Consultas ao cache da aplicação',
+    ['cache', 'resultado'],
+)
+
+
+class FilaCollector:
+    """Profundidade da fila de tarefas, calculada no momento do scrape"""
+
+    def describe(self):
+        # Evita que o registro chame collect() (e consulte o banco) no import
+        return []
+
+    def collect(self):
+        from django.db.models import Count
+        from .models import Tarefa
+
+        gauge = GaugeMetricFamily(
+            'smartclass_fila_tarefas',
+            'Tarefas em segundo plano por tipo e status',
+            labels=['tipo', 'status'],
+        )
+        por_tipo = (
+            Tarefa.objects.filter(status__in=[Tarefa.STATUS_PENDENTE, Tarefa.STATUS_EXECUTANDO])
+            .values('tipo', 'status')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+        for item in por_tipo:
+            gauge.add_metric([item['tipo'], item['status']], item['total'])
+        yield gauge
+
+
+FILA = FilaCollector()
+REGISTRY.register(FILA)
+
+
+def gerar_metricas():
+    """
+    Serializa todas as métricas no formato texto do Prometheus
+
+    Returns:
+        bytes: Conteúdo para o endpoint /metrics
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        # Os valores de cada processo estão em arquivos no diretório
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(FILA)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry)
@@ -0,0 +1,207 @@
+# core/middleware.py
+import cProfile
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+from django.middleware.gzip import GZipMiddleware
+
+from .consultas import descarregar, origem_consultas
+from .metricas import (
+    DB_CONSULTA_LATENCIA, DB_CONSULTAS_POR_REQUISICAO, HTTP_LATENCIA, HTTP_REQUISICOES,
+)
+from .services.perfis import (
+    ORIGEM_AUTO, ORIGEM_MANUAL, duracoes_auto, manter_mais_lentos, salvar_perfil,
+)
+
+logger = logging.getLogger(__name__)
+
+# Métodos com rótulo próprio nas métricas; o cliente escolhe o método, então
+# qualquer outro vira 'outro' para não criar séries novas sem limite
+METODOS_HTTP = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+def _nome_view(request):
+    """Nome da URL resolvida (rótulo de baixa cardinalidade, sem ids)"""
+    match = getattr(request, 'resolver_match', None)
+    return (match.url_name if match else None) or 'desconhecida'
+
+
+def _metodo(request):
+    """Método HTTP como rótulo de métrica (conjunto fixo)"""
+    return request.method if request.method in METODOS_HTTP else 'outro'
+
+
+class MetricasMiddleware:
+    """
+    Mede latência, status e consultas SQL de cada requisição
+
+    As consultas são medidas com connection.execute_wrapper, então só as views
+    síncronas têm as métricas de banco (nas assíncronas o ORM roda em outra
+    thread, com outra conexão).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        duracoes = []
+
+        def medir_consulta(execute, sql, params, many, context):
+            inicio = time.monotonic()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                duracoes.append(time.monotonic() - inicio)
+
+        inicio = time.monotonic()
+        origem = origem_consultas.set(request)
+        try:
+            with connection.execute_wrapper(medir_consulta):
+                response = self.get_response(request)
+        finally:
+            origem_consultas.reset(origem)
+
+        view = _nome_view(request)
+        self._registrar(request, response, view, inicio)
+        if duracoes:
+            DB_CONSULTAS_POR_REQUISICAO.labels(view).observe(len(duracoes))
+            historico = DB_CONSULTA_LATENCIA.labels(view)
+            for duracao in duracoes:
+                historico.observe(duracao)
+        descarregar()
+        return response
+
+    async def __acall__(self, request):
+        inicio = time.monotonic()
+        origem = origem_consultas.set(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            origem_consultas.reset(origem)
+        self._registrar(request, response, _nome_view(request), inicio)
+        return response
+
+    def _registrar(self, request, response, view, inicio):
+        """Conta a requisição e observa o tempo até a resposta (sem o streaming)"""
+        HTTP_REQUISICOES.labels(view, _metodo(request), response.status_code).inc()
+        HTTP_LATENCIA.labels(view).observe(time.monotonic() - inicio)
+
+
+class CompressaoMiddleware(GZipMiddleware):
+    """
+    Compressão gzip das respostas dinâmicas (HTML e JSON)
+
+    O feed ao vivo (text/event-stream) fica de fora: o gzip acumula os eventos
+    no buffer e o navegador só os receberia em blocos. Os arquivos estáticos
+    já saem comprimidos pelo WhiteNoise e não passam por aqui.
+    """
+
+    def process_response(self, request, response):
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return response
+        return super().process_response(request, response)
+
+
+class PerfilMiddleware:
+    """
+    Perfil (cProfile + consultas SQL) de requisições individuais
+
+    Manual: um usuário staff acrescenta ?_perfil=1 à URL ou envia o
+    cabeçalho X-Perfil; o nome do perfil volta no cabeçalho X-Perfil da
+    resposta e ele aparece em /staff/perfis/.
+
+    Automático: uma fração PERFIL_AMOSTRA_TAXA das requisições é perfilada
+    e só ficam guardadas as PERFIL_AMOSTRA_POR_VIEW mais lentas de cada view.
+
+    Fica no fim do MIDDLEWARE (precisa do request.user), então mede a view
+    e não os middlewares. Views assíncronas e o conteúdo de respostas em
+    streaming ficam de fora.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.get_response(request)
+
+        # O parâmetro é conferido antes do request.user, que custa uma consulta
+        pedido = request.GET.get('_perfil') or request.headers.get('X-Perfil')
+        if pedido and request.user.is_staff:
+            origem = ORIGEM_MANUAL
+        elif settings.PERFIL_AMOSTRA_TAXA and random.random() < settings.PERFIL_AMOSTRA_TAXA:
+            origem = ORIGEM_AUTO
+        else:
+            return self.get_response(request)
+
+        consultas = []
+
+        def capturar_consulta(execute, sql, params, many, context):
+            inicio = time.monotonic()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                consultas.append({
+                    'sql': sql[:4000],
+                    'many': many,
+                    'duracao_ms': (time.monotonic() - inicio) * 1000,
+                })
+
+        perfil = cProfile.Profile()
+        inicio = time.monotonic()
+        with connection.execute_wrapper(capturar_consulta):
+            perfil.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                perfil.disable()
+        duracao_ms = (time.monotonic() - inicio) * 1000
+
+        view = _nome_view(request)
+        try:
+            if origem == ORIGEM_AUTO and not self._entre_mais_lentas(view, duracao_ms):
+                return response
+
+            nome = salvar_perfil(perfil, origem, view, {
+                'metodo': request.method,
+                'caminho': request.get_full_path(),
+                'status': response.status_code,
+                'duracao_ms': duracao_ms,
+                'usuario': request.user.get_username() if origem == ORIGEM_MANUAL else '',
+                'consultas': consultas,
+                'tempo_sql_ms': sum(consulta['duracao_ms'] for consulta in consultas),
+            })
+            if origem == ORIGEM_MANUAL:
+                response['X-Perfil'] = nome
+            else:
+                manter_mais_lentos(view, settings.PERFIL_AMOSTRA_POR_VIEW)
+        except OSError:
+            # Perfil é diagnóstico: falha ao gravar não derruba a requisição
+            logger.exception('Não foi possível gravar o perfil da requisição')
+
+        return response
+
+    def _entre_mais_lentas(self, view, duracao_ms):
+        """Se a requisição entra entre as PERFIL_AMOSTRA_POR_VIEW mais lentas da view"""
+        duracoes = duracoes_auto(view)
+        return (
+            len(duracoes) < settings.PERFIL_AMOSTRA_POR_VIEW
+            or bool(duracoes) and duracao_ms > min(duracoes.values())
+        )
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='submissao',
+            options={'ordering': ['-enviado_em'], 'verbose_name': 'Submissão', 'verbose_name_plural': 'Submissões'},
+        ),
+        migrations.RemoveIndex(
+            model_name='aluno',
+            name='core_aluno_ra_fc99f3_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='aluno',
+            name='core_aluno_is_acti_a8be64_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='submissao',
+            name='core_submis_ativida_5b633b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='submissao',
+            name='core_submis_nota_9f9fd1_idx',
+        ),
+        migrations.AddIndex(
+            model_name='aluno',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['nome'], name='aluno_ativo_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='atividade',
+            index=models.Index(fields=['-created_at'], name='core_ativid_created_71e583_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submissao',
+            index=models.Index(fields=['atividade', 'nota'], name='core_submis_ativida_db6098_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submissao',
+            index=models.Index(condition=models.Q(('nota__isnull', True)), fields=['atividade', 'enviado_em'], name='submissao_pendente_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submissao',
+            index=models.Index(fields=['aluno'], include=('nota',), name='submissao_aluno_nota_idx'),
+        ),
+    ]
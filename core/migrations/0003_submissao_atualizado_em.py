@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submissao',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, help_text='Última alteração (envio ou correção); usado pelo feed ao vivo', verbose_name='Atualizado em'),
+        ),
+        # Submissões existentes: última alteração conhecida
+        migrations.RunSQL(
+            "UPDATE core_submissao SET atualizado_em = COALESCE(corrigido_em, enviado_em)",
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='submissao',
+            index=models.Index(fields=['atividade', 'atualizado_em'], name='core_submis_ativida_bf0d34_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_submissao_atualizado_em'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarefa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(help_text='Nome do handler registrado em core.tarefas', max_length=50, verbose_name='Tipo')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Parâmetros')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('executando', 'Executando'), ('concluida', 'Concluída'), ('erro', 'Erro')], default='pendente', max_length=20, verbose_name='Status')),
+                ('tentativas', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('erro', models.TextField(blank=True, verbose_name='Último erro')),
+                ('executar_apos', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Executar após')),
+                ('criada_em', models.DateTimeField(auto_now_add=True, verbose_name='Criada em')),
+                ('concluida_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluída em')),
+            ],
+            options={
+                'verbose_name': 'Tarefa em segundo plano',
+                'verbose_name_plural': 'Tarefas em segundo plano',
+                'ordering': ['-criada_em'],
+            },
+        ),
+        migrations.AddField(
+            model_name='atividade',
+            name='encerrada_em',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Encerrada em'),
+        ),
+        migrations.AddField(
+            model_name='atividade',
+            name='status',
+            field=models.CharField(choices=[('aberta', 'Aberta'), ('encerrada', 'Encerrada')], default='aberta', help_text='Atualizado pelo processador de prazos (processar_prazos)', max_length=20, verbose_name='Status'),
+        ),
+        # Atividades já vencidas entram encerradas, sem gerar tarefas retroativas
+        migrations.RunSQL(
+            "UPDATE core_atividade SET status = 'encerrada', encerrada_em = NOW() "
+            "WHERE prazo_entrega < CURRENT_DATE",
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='atividade',
+            index=models.Index(fields=['status', 'prazo_entrega'], name='core_ativid_status_56b254_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarefa',
+            index=models.Index(condition=models.Q(('status', 'pendente')), fields=['executar_apos'], name='tarefa_pendente_idx'),
+        ),
+    ]
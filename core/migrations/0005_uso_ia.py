@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_status_atividade_tarefa'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='professor',
+            name='orcamento_ia_diario',
+            field=models.PositiveIntegerField(blank=True, help_text='Vazio usa o padrão IA_ORCAMENTO_DIARIO_TOKENS das configurações', null=True, verbose_name='Orçamento diário de IA (tokens)'),
+        ),
+        migrations.CreateModel(
+            name='UsoIA',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operacao', models.CharField(max_length=30, verbose_name='Operação')),
+                ('tokens_entrada', models.PositiveIntegerField(default=0, verbose_name='Tokens de entrada')),
+                ('tokens_saida', models.PositiveIntegerField(default=0, verbose_name='Tokens de saída')),
+                ('latencia_ms', models.PositiveIntegerField(default=0, verbose_name='Latência (ms)')),
+                ('cache_hit', models.BooleanField(default=False, verbose_name='Veio do cache')),
+                ('resultado', models.CharField(choices=[('sucesso', 'Sucesso'), ('erro', 'Erro')], max_length=10, verbose_name='Resultado')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('professor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='usos_ia', to=settings.AUTH_USER_MODEL, verbose_name='Professor')),
+            ],
+            options={
+                'verbose_name': 'Uso de IA',
+                'verbose_name_plural': 'Usos de IA',
+                'ordering': ['-criado_em'],
+                'indexes': [models.Index(fields=['professor', 'criado_em'], name='core_usoia_profess_c20b5c_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='UsoIADiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('chamadas', models.PositiveIntegerField(default=0, verbose_name='Chamadas')),
+                ('erros', models.PositiveIntegerField(default=0, verbose_name='Erros')),
+                ('cache_hits', models.PositiveIntegerField(default=0, verbose_name='Respostas do cache')),
+                ('tokens_entrada', models.PositiveBigIntegerField(default=0, verbose_name='Tokens de entrada')),
+                ('tokens_saida', models.PositiveBigIntegerField(default=0, verbose_name='Tokens de saída')),
+                ('latencia_total_ms', models.PositiveBigIntegerField(default=0, verbose_name='Latência total (ms)')),
+                ('professor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usos_ia_diarios', to=settings.AUTH_USER_MODEL, verbose_name='Professor')),
+            ],
+            options={
+                'verbose_name': 'Uso diário de IA',
+                'verbose_name_plural': 'Uso diário de IA',
+                'ordering': ['-data'],
+                'unique_together': {('professor', 'data')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_uso_ia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssinaturaSubmissao',
+            fields=[
+                ('submissao', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='assinatura', serialize=False, to='core.submissao', verbose_name='Submissão')),
+                ('minhash', models.BinaryField(help_text='Vetor uint32 com um valor mínimo por permutação', verbose_name='MinHash')),
+                ('palavras', models.PositiveIntegerField(default=0, help_text='Respostas muito curtas ficam fora da comparação', verbose_name='Palavras')),
+                ('calculada_em', models.DateTimeField(verbose_name='Calculada em')),
+            ],
+            options={
+                'verbose_name': 'Assinatura de submissão',
+                'verbose_name_plural': 'Assinaturas de submissões',
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_assinatura_submissao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Turma',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(help_text='Ex: 3º Ano A - 2025', max_length=100, verbose_name='Nome')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criada em')),
+                ('alunos', models.ManyToManyField(blank=True, related_name='turmas', to='core.aluno', verbose_name='Alunos')),
+                ('professor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='turmas', to=settings.AUTH_USER_MODEL, verbose_name='Professor')),
+            ],
+            options={
+                'verbose_name': 'Turma',
+                'verbose_name_plural': 'Turmas',
+                'ordering': ['nome'],
+            },
+        ),
+        migrations.AddField(
+            model_name='atividade',
+            name='turma',
+            field=models.ForeignKey(help_text='Só os alunos da turma veem a atividade', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='atividades', to='core.turma', verbose_name='Turma'),
+        ),
+        # Dados existentes: uma turma padrão por professor com todos os alunos,
+        # recebendo as atividades dele (todos continuam vendo o que já viam).
+        # SET CONSTRAINTS evita gatilhos de FK pendentes antes do ALTER TABLE
+        migrations.RunSQL(
+            [
+                "SET CONSTRAINTS ALL IMMEDIATE",
+                "INSERT INTO core_turma (nome, professor_id, created_at) "
+                "SELECT 'Turma padrão', id, NOW() FROM core_professor",
+                "INSERT INTO core_turma_alunos (turma_id, aluno_id) "
+                "SELECT t.id, a.id FROM core_turma t CROSS JOIN core_aluno a",
+                "UPDATE core_atividade SET turma_id = t.id "
+                "FROM core_turma t WHERE t.professor_id = core_atividade.professor_id",
+            ],
+            migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='atividade',
+            name='turma',
+            field=models.ForeignKey(help_text='Só os alunos da turma veem a atividade', on_delete=django.db.models.deletion.CASCADE, related_name='atividades', to='core.turma', verbose_name='Turma'),
+        ),
+        migrations.AddIndex(
+            model_name='atividade',
+            index=models.Index(fields=['turma', '-created_at'], name='core_ativid_turma_i_32b0c3_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='turma',
+            unique_together={('professor', 'nome')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_turma'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submissao',
+            name='token_envio',
+            field=models.UUIDField(blank=True, editable=False, help_text='Gerado no formulário; identifica reenvios do mesmo envio', null=True, verbose_name='Token de envio'),
+        ),
+    ]
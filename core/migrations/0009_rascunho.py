@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_submissao_token_envio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Rascunho',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('texto', models.TextField(blank=True, verbose_name='Texto')),
+                ('hash', models.CharField(help_text='BLAKE2b de 16 bytes; salvamentos sem alteração são ignorados', max_length=32, verbose_name='Hash do texto')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('aluno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rascunhos', to='core.aluno', verbose_name='Aluno')),
+                ('atividade', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rascunhos', to='core.atividade', verbose_name='Atividade')),
+            ],
+            options={
+                'verbose_name': 'Rascunho',
+                'verbose_name_plural': 'Rascunhos',
+                'indexes': [models.Index(fields=['atualizado_em'], name='core_rascun_atualiz_3792e6_idx')],
+                'unique_together': {('aluno', 'atividade')},
+            },
+        ),
+    ]
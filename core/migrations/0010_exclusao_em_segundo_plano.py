@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_rascunho'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='atividade',
+            name='excluida_em',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Some das telas na hora; a tarefa excluir_atividade apaga as submissões em lotes', null=True, verbose_name='Excluída em'),
+        ),
+        migrations.AddField(
+            model_name='tarefa',
+            name='progresso',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Atualizado pelo handler com core.tarefas.registrar_progresso', verbose_name='Progresso (%)'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:56
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_exclusao_em_segundo_plano'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstatisticaConsulta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('impressao', models.CharField(help_text='Hash do SQL normalizado (sem literais)', max_length=16, verbose_name='Impressão digital')),
+                ('view', models.CharField(help_text='Nome da URL, tarefa:<tipo> ou comando', max_length=100, verbose_name='Origem')),
+                ('hora', models.DateTimeField(verbose_name='Hora')),
+                ('sql', models.TextField(verbose_name='SQL normalizado')),
+                ('execucoes', models.PositiveBigIntegerField(default=0, verbose_name='Execuções')),
+                ('tempo_total_ms', models.FloatField(default=0, verbose_name='Tempo total (ms)')),
+                ('tempo_max_ms', models.FloatField(default=0, verbose_name='Tempo máximo (ms)')),
+                ('histograma', django.contrib.postgres.fields.ArrayField(base_field=models.PositiveBigIntegerField(), help_text='Execuções por faixa de duração (FAIXAS_MS em core/consultas.py)', size=None, verbose_name='Histograma')),
+            ],
+            options={
+                'verbose_name': 'Estatística de consulta SQL',
+                'verbose_name_plural': 'Estatísticas de consultas SQL',
+                'ordering': ['-hora', '-tempo_total_ms'],
+                'indexes': [models.Index(fields=['hora'], name='core_estati_hora_a1be3d_idx')],
+                'unique_together': {('impressao', 'view', 'hora')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_estatistica_consulta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tarefa',
+            name='reservada_em',
+            field=models.DateTimeField(blank=True, help_text='Início (ou última renovação) da reserva pelo worker; reservas vencidas voltam para a fila', null=True, verbose_name='Reservada em'),
+        ),
+        # Tarefas já presas em execução passam a ter uma reserva, que vence
+        # e as devolve à fila
+        migrations.RunSQL(
+            "UPDATE core_tarefa SET reservada_em = now() WHERE status = 'executando'",
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='tarefa',
+            index=models.Index(condition=models.Q(('status', 'executando')), fields=['reservada_em'], name='tarefa_executando_idx'),
+        ),
+    ]
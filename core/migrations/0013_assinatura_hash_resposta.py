@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_tarefa_reservada_em'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assinaturasubmissao',
+            name='hash_resposta',
+            field=models.CharField(blank=True, default='', help_text='MD5 da resposta usada no cálculo (igual ao md5() do PostgreSQL)', max_length=32, verbose_name='Hash da resposta'),
+        ),
+        # Assinaturas em dia com a resposta: o hash é o da resposta atual
+        migrations.RunSQL(
+            """
+            UPDATE core_assinaturasubmissao a SET hash_resposta = md5(s.resposta)
+            FROM core_submissao s
+            WHERE s.id = a.submissao_id AND a.calculada_em >= s.atualizado_em
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
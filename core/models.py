@@ -1,5 +1,6 @@
 # backend/core/models.py
-from django.db import models
+from django.db import connections, models
+from django.contrib.postgres.fields import ArrayField
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
@@ -15,6 +16,12 @@ class Professor(AbstractUser):
         verbose_name='Nome Completo',
         help_text='Nome completo do professor'
     )
+    orcamento_ia_diario = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Orçamento diário de IA (tokens)',
+        help_text='Vazio usa o padrão IA_ORCAMENTO_DIARIO_TOKENS das configurações'
+    )
 
     class Meta:
         verbose_name = 'Professor'
@@ -60,8 +67,12 @@ class Aluno(models.Model):
         verbose_name_plural = 'Alunos'
         ordering = ['nome']
         indexes = [
-            models.Index(fields=['ra']),
-            models.Index(fields=['is_active']),
+            # ra já é indexado pelo unique; o roster lista só alunos ativos por nome
+            models.Index(
+                fields=['nome'],
+                condition=models.Q(is_active=True),
+                name='aluno_ativo_nome_idx'
+            ),
         ]
 
     def __str__(self):
@@ -111,11 +122,62 @@ class Aluno(models.Model):
         return 0
 
 
+class Turma(models.Model):
+    """
+    Turma de um professor
+    As atividades são publicadas para uma turma e só os alunos dela as veem
+    """
+    nome = models.CharField(
+        max_length=100,
+        verbose_name='Nome',
+        help_text='Ex: 3º Ano A - 2025'
+    )
+    professor = models.ForeignKey(
+        Professor,
+        on_delete=models.CASCADE,
+        related_name='turmas',
+        verbose_name='Professor'
+    )
+    alunos = models.ManyToManyField(
+        Aluno,
+        blank=True,
+        related_name='turmas',
+        verbose_name='Alunos'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Criada em'
+    )
+
+    class Meta:
+        verbose_name = 'Turma'
+        verbose_name_plural = 'Turmas'
+        unique_together = ['professor', 'nome']
+        ordering = ['nome']
+
+    def __str__(self):
+        return self.nome
+
+
+class AtividadeManager(models.Manager):
+    """Esconde as atividades excluídas cujas submissões ainda estão sendo apagadas"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(excluida_em__isnull=True)
+
+
 class Atividade(models.Model):
     """
     Atividade postada pelo professor
     Pode ser gerada com auxílio da IA ou manualmente
     """
+    STATUS_ABERTA = 'aberta'
+    STATUS_ENCERRADA = 'encerrada'
+    STATUS_CHOICES = [
+        (STATUS_ABERTA, 'Aberta'),
+        (STATUS_ENCERRADA, 'Encerrada'),
+    ]
+
     professor = models.ForeignKey(
         Professor,
         on_delete=models.CASCADE,
@@ -123,6 +185,13 @@ class Atividade(models.Model):
         verbose_name='Professor',
         help_text='Professor que criou a atividade'
     )
+    turma = models.ForeignKey(
+        Turma,
+        on_delete=models.CASCADE,
+        related_name='atividades',
+        verbose_name='Turma',
+        help_text='Só os alunos da turma veem a atividade'
+    )
     titulo = models.CharField(
         max_length=200,
         verbose_name='Título',
@@ -136,6 +205,25 @@ class Atividade(models.Model):
         verbose_name='Prazo de Entrega',
         help_text='Data limite para entrega'
     )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_ABERTA,
+        verbose_name='Status',
+        help_text='Atualizado pelo processador de prazos (processar_prazos)'
+    )
+    encerrada_em = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Encerrada em'
+    )
+    excluida_em = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Excluída em',
+        help_text='Some das telas na hora; a tarefa excluir_atividade apaga as submissões em lotes'
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Criada em'
@@ -145,13 +233,22 @@ class Atividade(models.Model):
         verbose_name='Atualizada em'
     )
 
+    # objects não inclui as excluídas; todas é usado pela exclusão em segundo plano
+    objects = AtividadeManager()
+    todas = models.Manager()
+
     class Meta:
         verbose_name = 'Atividade'
         verbose_name_plural = 'Atividades'
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['professor', '-created_at']),
+            # Atividades da turma do aluno, mais recentes primeiro
+            models.Index(fields=['turma', '-created_at']),
+            models.Index(fields=['-created_at']),
             models.Index(fields=['prazo_entrega']),
+            # Processador de prazos: atividades abertas com prazo vencido
+            models.Index(fields=['status', 'prazo_entrega']),
         ]
 
     def __str__(self):
@@ -198,9 +295,14 @@ class Atividade(models.Model):
         """
         Verifica se o prazo de entrega já passou
 
+        Usa o status gravado pelo processador de prazos; a comparação de
+        datas cobre o intervalo até a próxima execução do processador.
+
         Returns:
             bool: True se vencido
         """
+        if self.status == self.STATUS_ENCERRADA:
+            return True
         return timezone.now().date() > self.prazo_entrega
 
     def get_status_badge_class(self):
@@ -224,6 +326,68 @@ class Atividade(models.Model):
         delta = self.prazo_entrega - timezone.now().date()
         return delta.days
 
+    def save(self, *args, **kwargs):
+        """
+        Override do save para reabrir a atividade quando o prazo é estendido
+        """
+        if self.status == self.STATUS_ENCERRADA and self.prazo_entrega >= timezone.now().date():
+            self.status = self.STATUS_ABERTA
+            self.encerrada_em = None
+        super().save(*args, **kwargs)
+
+
+class SubmissaoQuerySet(models.QuerySet):
+    """QuerySet de Submissao com atalhos para as listagens"""
+
+    # Campos de texto sem limite: só as telas de detalhe/correção precisam deles
+    CAMPOS_TEXTO = ['resposta', 'observacao']
+
+    def para_listagem(self):
+        """
+        Exclui resposta e observacao do SELECT
+
+        Returns:
+            QuerySet: Submissões com os campos de texto adiados (defer)
+        """
+        return self.defer(*self.CAMPOS_TEXTO)
+
+    def enviar(self, atividade, aluno, resposta, token=None):
+        """
+        Registra o envio sem corrida entre cliques duplos e reenvios
+
+        Um único INSERT ... ON CONFLICT DO NOTHING sobre (atividade, aluno):
+        envios simultâneos não esbarram no unique_together, e quem perde a
+        corrida recebe a submissão que já estava gravada. O RETURNING diz se
+        a linha foi inserida por esta chamada; o token só serve para
+        reconhecer o reenvio de um envio que já tinha sido gravado.
+
+        Args:
+            atividade (Atividade): Atividade respondida
+            aluno (Aluno): Aluno que envia
+            resposta (str): Texto da resposta
+            token (uuid.UUID, optional): Token de idempotência do formulário
+
+        Returns:
+            tuple: (Submissao, bool) — a submissão gravada e se ela veio deste
+            envio (inserida agora, ou reenvio com o mesmo token)
+        """
+        agora = timezone.now()
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {self.model._meta.db_table}
+                    (atividade_id, aluno_id, resposta, token_envio, enviado_em, atualizado_em)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (atividade_id, aluno_id) DO NOTHING
+                RETURNING id
+                """,
+                [atividade.pk, aluno.pk, resposta, token, agora, agora]
+            )
+            inserida = cursor.fetchone() is not None
+
+        submissao = self.get(atividade=atividade, aluno=aluno)
+        return submissao, inserida or (token is not None and submissao.token_envio == token)
+
 
 class Submissao(models.Model):
     """
@@ -272,15 +436,45 @@ class Submissao(models.Model):
         blank=True,
         verbose_name='Corrigido em'
     )
+    atualizado_em = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Atualizado em',
+        help_text='Última alteração (envio ou correção); usado pelo feed ao vivo'
+    )
+    token_envio = models.UUIDField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Token de envio',
+        help_text='Gerado no formulário; identifica reenvios do mesmo envio'
+    )
+
+    objects = SubmissaoQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Submissão'
         verbose_name_plural = 'Submissões'
         unique_together = ['atividade', 'aluno']
-        ordering = ['aluno__nome']
+        # Ordenar por aluno__nome exigia JOIN em toda query padrão;
+        # listagens por nome fazem order_by('aluno__nome') explicitamente
+        ordering = ['-enviado_em']
         indexes = [
-            models.Index(fields=['atividade', 'aluno']),
-            models.Index(fields=['nota']),
+            # (atividade, aluno) já é coberto pelo índice do unique_together
+            models.Index(fields=['atividade', 'nota']),
+            # Fila de correção: submissões sem nota por atividade
+            models.Index(
+                fields=['atividade', 'enviado_em'],
+                condition=models.Q(nota__isnull=True),
+                name='submissao_pendente_idx'
+            ),
+            # Feed ao vivo: alterações de uma atividade desde a última marca
+            models.Index(fields=['atividade', 'atualizado_em']),
+            # Média por aluno resolvida só com o índice (index-only scan)
+            models.Index(
+                fields=['aluno'],
+                include=['nota'],
+                name='submissao_aluno_nota_idx'
+            ),
         ]
 
     def __str__(self):
@@ -356,4 +550,333 @@ class Submissao(models.Model):
         """
         if self.nota is not None and not self.corrigido_em:
             self.corrigido_em = timezone.now()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+
+class AssinaturaSubmissao(models.Model):
+    """
+    Assinatura MinHash da resposta de uma submissão
+
+    Usada pelo relatório de respostas semelhantes (core/services/similaridade.py).
+    É recalculada quando a resposta muda (hash_resposta); correções e outras
+    alterações da submissão só atualizam calculada_em.
+    """
+    submissao = models.OneToOneField(
+        Submissao,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='assinatura',
+        verbose_name='Submissão'
+    )
+    minhash = models.BinaryField(
+        verbose_name='MinHash',
+        help_text='Vetor uint32 com um valor mínimo por permutação'
+    )
+    palavras = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Palavras',
+        help_text='Respostas muito curtas ficam fora da comparação'
+    )
+    calculada_em = models.DateTimeField(
+        verbose_name='Calculada em'
+    )
+    hash_resposta = models.CharField(
+        max_length=32,
+        blank=True,
+        default='',
+        verbose_name='Hash da resposta',
+        help_text='MD5 da resposta usada no cálculo (igual ao md5() do PostgreSQL)'
+    )
+
+    class Meta:
+        verbose_name = 'Assinatura de submissão'
+        verbose_name_plural = 'Assinaturas de submissões'
+
+    def __str__(self):
+        return f"Assinatura da submissão {self.submissao_id}"
+
+
+class Rascunho(models.Model):
+    """
+    Rascunho da resposta de um aluno, salvo automaticamente enquanto ele escreve
+
+    Uma linha por (aluno, atividade), regravada por upsert. O envio final
+    remove o rascunho; os abandonados são apagados pelo comando limpar_rascunhos.
+    """
+    aluno = models.ForeignKey(
+        Aluno,
+        on_delete=models.CASCADE,
+        related_name='rascunhos',
+        verbose_name='Aluno'
+    )
+    atividade = models.ForeignKey(
+        Atividade,
+        on_delete=models.CASCADE,
+        related_name='rascunhos',
+        verbose_name='Atividade'
+    )
+    texto = models.TextField(
+        blank=True,
+        verbose_name='Texto'
+    )
+    hash = models.CharField(
+        max_length=32,
+        verbose_name='Hash do texto',
+        help_text='BLAKE2b de 16 bytes; salvamentos sem alteração são ignorados'
+    )
+    atualizado_em = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Atualizado em'
+    )
+
+    class Meta:
+        verbose_name = 'Rascunho'
+        verbose_name_plural = 'Rascunhos'
+        unique_together = ['aluno', 'atividade']
+        indexes = [
+            # Limpeza dos rascunhos abandonados
+            models.Index(fields=['atualizado_em']),
+        ]
+
+    def __str__(self):
+        return f"Rascunho de {self.aluno_id} na atividade {self.atividade_id}"
+
+
+class Tarefa(models.Model):
+    """
+    Tarefa em segundo plano (fila simples no banco)
+    Enfileirada com core.tarefas.enfileirar e executada pelo comando processar_tarefas
+    """
+    STATUS_PENDENTE = 'pendente'
+    STATUS_EXECUTANDO = 'executando'
+    STATUS_CONCLUIDA = 'concluida'
+    STATUS_ERRO = 'erro'
+    STATUS_CHOICES = [
+        (STATUS_PENDENTE, 'Pendente'),
+        (STATUS_EXECUTANDO, 'Executando'),
+        (STATUS_CONCLUIDA, 'Concluída'),
+        (STATUS_ERRO, 'Erro'),
+    ]
+
+    tipo = models.CharField(
+        max_length=50,
+        verbose_name='Tipo',
+        help_text='Nome do handler registrado em core.tarefas'
+    )
+    payload = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Parâmetros'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDENTE,
+        verbose_name='Status'
+    )
+    tentativas = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Tentativas'
+    )
+    progresso = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Progresso (%)',
+        help_text='Atualizado pelo handler com core.tarefas.registrar_progresso'
+    )
+    erro = models.TextField(
+        blank=True,
+        verbose_name='Último erro'
+    )
+    executar_apos = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Executar após'
+    )
+    criada_em = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Criada em'
+    )
+    concluida_em = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Concluída em'
+    )
+    reservada_em = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Reservada em',
+        help_text='Início (ou última renovação) da reserva pelo worker; reservas '
+                  'vencidas voltam para a fila'
+    )
+
+    class Meta:
+        verbose_name = 'Tarefa em segundo plano'
+        verbose_name_plural = 'Tarefas em segundo plano'
+        ordering = ['-criada_em']
+        indexes = [
+            # Fila: só as pendentes, na ordem de execução
+            models.Index(
+                fields=['executar_apos'],
+                condition=models.Q(status='pendente'),
+                name='tarefa_pendente_idx'
+            ),
+            # Reservas vencidas (workers interrompidos)
+            models.Index(
+                fields=['reservada_em'],
+                condition=models.Q(status='executando'),
+                name='tarefa_executando_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.get_status_display()})"
+
+
+class UsoIA(models.Model):
+    """
+    Registro de cada chamada ao serviço de IA
+    Tokens e latência vêm do usage_metadata da resposta do Gemini
+    """
+    RESULTADO_SUCESSO = 'sucesso'
+    RESULTADO_ERRO = 'erro'
+    RESULTADO_CHOICES = [
+        (RESULTADO_SUCESSO, 'Sucesso'),
+        (RESULTADO_ERRO, 'Erro'),
+    ]
+
+    professor = models.ForeignKey(
+        Professor,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='usos_ia',
+        verbose_name='Professor'
+    )
+    operacao = models.CharField(
+        max_length=30,
+        verbose_name='Operação'
+    )
+    tokens_entrada = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Tokens de entrada'
+    )
+    tokens_saida = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Tokens de saída'
+    )
+    latencia_ms = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Latência (ms)'
+    )
+    cache_hit = models.BooleanField(
+        default=False,
+        verbose_name='Veio do cache'
+    )
+    resultado = models.CharField(
+        max_length=10,
+        choices=RESULTADO_CHOICES,
+        verbose_name='Resultado'
+    )
+    criado_em = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Criado em'
+    )
+
+    class Meta:
+        verbose_name = 'Uso de IA'
+        verbose_name_plural = 'Usos de IA'
+        ordering = ['-criado_em']
+        indexes = [
+            models.Index(fields=['professor', 'criado_em']),
+        ]
+
+    def __str__(self):
+        return f"{self.operacao} - {self.criado_em:%d/%m/%Y %H:%M}"
+
+
+class UsoIADiario(models.Model):
+    """
+    Consolidado diário de uso de IA por professor
+    Atualizado a cada chamada; é a base do orçamento e do relatório
+    """
+    professor = models.ForeignKey(
+        Professor,
+        on_delete=models.CASCADE,
+        related_name='usos_ia_diarios',
+        verbose_name='Professor'
+    )
+    data = models.DateField(
+        verbose_name='Data'
+    )
+    chamadas = models.PositiveIntegerField(default=0, verbose_name='Chamadas')
+    erros = models.PositiveIntegerField(default=0, verbose_name='Erros')
+    cache_hits = models.PositiveIntegerField(default=0, verbose_name='Respostas do cache')
+    tokens_entrada = models.PositiveBigIntegerField(default=0, verbose_name='Tokens de entrada')
+    tokens_saida = models.PositiveBigIntegerField(default=0, verbose_name='Tokens de saída')
+    latencia_total_ms = models.PositiveBigIntegerField(default=0, verbose_name='Latência total (ms)')
+
+    class Meta:
+        verbose_name = 'Uso diário de IA'
+        verbose_name_plural = 'Uso diário de IA'
+        unique_together = ['professor', 'data']
+        ordering = ['-data']
+
+    def __str__(self):
+        return f"{self.professor} - {self.data:%d/%m/%Y}"
+
+    @property
+    def total_tokens(self):
+        """Tokens de entrada + saída do dia"""
+        return self.tokens_entrada + self.tokens_saida
+
+    @property
+    def latencia_media_ms(self):
+        """Latência média das chamadas ao serviço (sem as respostas do cache)"""
+        chamadas_reais = self.chamadas - self.cache_hits
+        if chamadas_reais <= 0:
+            return 0
+        return self.latencia_total_ms / chamadas_reais
+
+
+class EstatisticaConsulta(models.Model):
+    """
+    Estatísticas de um formato de consulta SQL, por view e por hora
+
+    Cada processo agrega as consultas em memória (core/consultas.py) e
+    descarrega periodicamente somando aos valores da hora atual.
+    """
+    impressao = models.CharField(
+        max_length=16,
+        verbose_name='Impressão digital',
+        help_text='Hash do SQL normalizado (sem literais)'
+    )
+    view = models.CharField(
+        max_length=100,
+        verbose_name='Origem',
+        help_text='Nome da URL, tarefa:<tipo> ou comando'
+    )
+    hora = models.DateTimeField(
+        verbose_name='Hora'
+    )
+    sql = models.TextField(
+        verbose_name='SQL normalizado'
+    )
+    execucoes = models.PositiveBigIntegerField(default=0, verbose_name='Execuções')
+    tempo_total_ms = models.FloatField(default=0, verbose_name='Tempo total (ms)')
+    tempo_max_ms = models.FloatField(default=0, verbose_name='Tempo máximo (ms)')
+    histograma = ArrayField(
+        models.PositiveBigIntegerField(),
+        verbose_name='Histograma',
+        help_text='Execuções por faixa de duração (FAIXAS_MS em core/consultas.py)'
+    )
+
+    class Meta:
+        verbose_name = 'Estatística de consulta SQL'
+        verbose_name_plural = 'Estatísticas de consultas SQL'
+        ordering = ['-hora', '-tempo_total_ms']
+        unique_together = ['impressao', 'view', 'hora']
+        indexes = [
+            models.Index(fields=['hora']),
+        ]
+
+    def __str__(self):
+        return f"{self.impressao} - {self.view} - {self.hora:%d/%m/%Y %H:00}"
@@ -0,0 +1,313 @@
+# core/services/boletins.py
+"""
+Boletins de fim de período
+
+Os dados de todos os alunos saem de três consultas (matrículas, atividades
+e submissões). Os boletins (HTML e CSV por aluno) são renderizados em um
+pool de processos, gravados em MEDIA_ROOT/boletins/<professor>/<lote>/ e,
+no fim, compactados em <lote>.zip junto com um CSV consolidado.
+
+Retomada: cada boletim é gravado por inteiro (arquivo temporário +
+rename), e quem já tem o CSV é pulado. Rodar de novo o mesmo lote (nova
+tentativa da tarefa ou --lote no comando) continua de onde parou.
+"""
+import csv
+import io
+import logging
+import os
+import re
+import shutil
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.template.loader import render_to_string
+from django.utils import formats, timezone
+from django.utils.text import slugify
+
+from core.models import Atividade, Submissao, Turma
+
+logger = logging.getLogger(__name__)
+
+# Boletins renderizados por chamada ao pool (menos idas e vindas entre processos)
+BOLETINS_POR_LOTE = 50
+
+LOTE_VALIDO = re.compile(r'^[\w-]+$')
+
+CABECALHO_CSV = ['Turma', 'Atividade', 'Prazo', 'Situação', 'Nota', 'Observação', 'Enviado em', 'Corrigido em']
+
+
+def pasta_boletins(professor_id):
+    """Pasta com os lotes de boletins do professor"""
+    return os.path.join(settings.MEDIA_ROOT, 'boletins', str(professor_id))
+
+
+def novo_lote(turma=None):
+    """
+    Nome de um novo lote de boletins
+
+    Args:
+        turma (Turma): Turma do lote (None = todas)
+
+    Returns:
+        str: Ex.: '3o-ano-a-20261215-183000'
+    """
+    prefixo = slugify(turma.nome) if turma else 'todas-as-turmas'
+    return f'{prefixo or "turma"}-{timezone.localtime():%Y%m%d-%H%M%S}'
+
+
+def caminho_zip(professor_id, lote):
+    """
+    Caminho do .zip de um lote do professor
+
+    Returns:
+        str | None: Caminho, ou None se o nome for inválido ou o lote não estiver pronto
+    """
+    if not LOTE_VALIDO.match(lote):
+        return None
+    caminho = os.path.join(pasta_boletins(professor_id), f'{lote}.zip')
+    return caminho if os.path.exists(caminho) else None
+
+
+def listar_lotes(professor_id):
+    """
+    Lotes prontos do professor, do mais recente para o mais antigo
+
+    Returns:
+        list[dict]: 'lote', 'tamanho' (bytes) e 'gerado_em'
+    """
+    pasta = pasta_boletins(professor_id)
+    if not os.path.isdir(pasta):
+        return []
+
+    lotes = []
+    for entrada in os.scandir(pasta):
+        if entrada.is_file() and entrada.name.endswith('.zip'):
+            info = entrada.stat()
+            lotes.append({
+                'lote': entrada.name[:-len('.zip')],
+                'tamanho': info.st_size,
+                'gerado_em': datetime.fromtimestamp(info.st_mtime, tz=timezone.get_current_timezone()),
+            })
+    return sorted(lotes, key=lambda item: item['gerado_em'], reverse=True)
+
+
+def coletar_dados(professor_id, turma_id=None):
+    """
+    Monta os dados de todos os boletins com três consultas
+
+    Cada aluno ativo das turmas do escopo recebe uma linha por atividade da
+    sua turma, entregue ou não.
+
+    Args:
+        professor_id (int): Professor
+        turma_id (int): Só esta turma (None = todas as turmas do professor)
+
+    Returns:
+        list[dict]: Um item por aluno, com 'id', 'nome', 'ra', 'turmas',
+        'linhas', 'entregues', 'total' e 'media' (só tipos simples, para
+        atravessar o pool de processos)
+    """
+    turmas = Turma.objects.filter(professor_id=professor_id)
+    if turma_id is not None:
+        turmas = turmas.filter(pk=turma_id)
+
+    matriculas = (
+        Turma.alunos.through.objects.filter(turma__in=turmas, aluno__is_active=True)
+        .order_by('aluno__nome', 'turma__nome')
+        .values_list('aluno_id', 'aluno__nome', 'aluno__ra', 'turma_id', 'turma__nome')
+    )
+
+    atividades_por_turma = {}
+    for atividade in (
+        Atividade.objects.filter(turma__in=turmas)
+        .order_by('prazo_entrega', 'id')
+        .values('id', 'turma_id', 'titulo', 'prazo_entrega')
+    ):
+        atividades_por_turma.setdefault(atividade['turma_id'], []).append(atividade)
+
+    # Atividades excluídas (ainda sendo apagadas) ficam de fora
+    submissoes = {
+        (submissao['aluno_id'], submissao['atividade_id']): submissao
+        for submissao in Submissao.objects.filter(
+            atividade__turma__in=turmas, atividade__excluida_em__isnull=True
+        ).order_by().values(
+            'aluno_id', 'atividade_id', 'nota', 'observacao', 'enviado_em', 'corrigido_em'
+        ).iterator(chunk_size=5000)
+    }
+
+    alunos = {}
+    for aluno_id, nome, ra, turma_id_aluno, turma_nome in matriculas:
+        aluno = alunos.setdefault(aluno_id, {
+            'id': aluno_id, 'nome': nome, 'ra': ra, 'turmas': [], 'linhas': [],
+        })
+        aluno['turmas'].append(turma_nome)
+        for atividade in atividades_por_turma.get(turma_id_aluno, []):
+            submissao = submissoes.get((aluno_id, atividade['id']))
+            if submissao is None:
+                situacao = 'Não entregue'
+            elif submissao['nota'] is None:
+                situacao = 'Aguardando correção'
+            else:
+                situacao = 'Corrigida'
+            aluno['linhas'].append({
+                'turma': turma_nome,
+                'titulo': atividade['titulo'],
+                'prazo': atividade['prazo_entrega'],
+                'situacao': situacao,
+                'nota': submissao['nota'] if submissao else None,
+                'observacao': (submissao['observacao'] or '') if submissao else '',
+                'enviado_em': submissao['enviado_em'] if submissao else None,
+                'corrigido_em': submissao['corrigido_em'] if submissao else None,
+            })
+
+    for aluno in alunos.values():
+        notas = [linha['nota'] for linha in aluno['linhas'] if linha['nota'] is not None]
+        aluno['total'] = len(aluno['linhas'])
+        aluno['entregues'] = sum(1 for linha in aluno['linhas'] if linha['situacao'] != 'Não entregue')
+        aluno['media'] = sum(notas) / len(notas) if notas else None
+
+    return list(alunos.values())
+
+
+def _nome_arquivo(aluno):
+    return f'{slugify(aluno["ra"]) or "sem-ra"}-{aluno["id"]}'
+
+
+def _data(valor):
+    if valor is None:
+        return ''
+    if hasattr(valor, 'hour'):
+        return f'{timezone.localtime(valor):%d/%m/%Y %H:%M}'
+    return f'{valor:%d/%m/%Y}'
+
+
+def _linha_csv(linha):
+    return [
+        linha['turma'], linha['titulo'], _data(linha['prazo']), linha['situacao'],
+        formats.localize(linha['nota']) if linha['nota'] is not None else '',
+        linha['observacao'], _data(linha['enviado_em']), _data(linha['corrigido_em']),
+    ]
+
+
+def _gravar(caminho, conteudo):
+    """Grava o arquivo inteiro ou nada (um boletim pela metade não é pulado na retomada)"""
+    temporario = f'{caminho}.tmp'
+    with open(temporario, 'w', encoding='utf-8-sig' if caminho.endswith('.csv') else 'utf-8', newline='') as arquivo:
+        arquivo.write(conteudo)
+    os.replace(temporario, caminho)
+
+
+def _inicializar_processo():
+    # Com spawn/forkserver o processo filho começa sem o Django configurado
+    if not apps.ready:
+        django.setup()
+
+
+def _renderizar(pasta, alunos, comum):
+    """
+    Renderiza e grava os boletins de um grupo de alunos (roda no pool)
+
+    Args:
+        pasta (str): Pasta do lote
+        alunos (list[dict]): Itens de coletar_dados()
+        comum (dict): Contexto igual para todos (professor, data de emissão)
+
+    Returns:
+        int: Boletins gravados
+    """
+    for aluno in alunos:
+        base = os.path.join(pasta, _nome_arquivo(aluno))
+        _gravar(f'{base}.html', render_to_string('boletins/boletim.html', {**comum, 'aluno': aluno}))
+
+        # O CSV é gravado por último: é ele que marca o boletim como pronto
+        saida = io.StringIO()
+        escritor = csv.writer(saida, delimiter=';')
+        escritor.writerow(CABECALHO_CSV)
+        escritor.writerows(_linha_csv(linha) for linha in aluno['linhas'])
+        _gravar(f'{base}.csv', saida.getvalue())
+    return len(alunos)
+
+
+def gerar_boletins(professor, turma=None, lote=None, processos=None, progresso=None):
+    """
+    Gera (ou retoma) um lote de boletins e devolve o .zip
+
+    Args:
+        professor (Professor): Dono das turmas
+        turma (Turma): Só esta turma (None = todas)
+        lote (str): Nome do lote; repetir o nome retoma um lote interrompido
+        processos (int): Tamanho do pool (padrão BOLETINS_PROCESSOS)
+        progresso (callable): Recebe o percentual concluído (0 a 99)
+
+    Returns:
+        str: Caminho do .zip
+    """
+    lote = lote or novo_lote(turma)
+    if not LOTE_VALIDO.match(lote):
+        raise ValueError(f'Nome de lote inválido: {lote}')
+    progresso = progresso or (lambda percentual: None)
+
+    pasta = os.path.join(pasta_boletins(professor.pk), lote)
+    destino = f'{pasta}.zip'
+    if os.path.exists(destino):
+        return destino
+    os.makedirs(pasta, exist_ok=True)
+
+    alunos = coletar_dados(professor.pk, turma.pk if turma else None)
+    pendentes = [
+        aluno for aluno in alunos
+        if not os.path.exists(os.path.join(pasta, f'{_nome_arquivo(aluno)}.csv'))
+    ]
+    prontos = len(alunos) - len(pendentes)
+    logger.info(f"Boletins {lote}: {len(alunos)} alunos, {prontos} já gerados")
+
+    if pendentes:
+        comum = {
+            'professor': professor.nome or professor.get_username(),
+            'escopo': turma.nome if turma else 'Todas as turmas',
+            'emitido_em': timezone.localtime(),
+        }
+        grupos = [
+            pendentes[inicio:inicio + BOLETINS_POR_LOTE]
+            for inicio in range(0, len(pendentes), BOLETINS_POR_LOTE)
+        ]
+        # Os processos filhos não usam o banco: nada de herdar a conexão aberta
+        connections.close_all()
+        pool = ProcessPoolExecutor(
+            max_workers=processos or settings.BOLETINS_PROCESSOS,
+            initializer=_inicializar_processo,
+        )
+        try:
+            futuros = [pool.submit(_renderizar, pasta, grupo, comum) for grupo in grupos]
+            for futuro in as_completed(futuros):
+                prontos += futuro.result()
+                progresso(prontos * 95 // max(len(alunos), 1))
+        finally:
+            # Em caso de erro, os grupos que não começaram ficam para a retomada
+            pool.shutdown(cancel_futures=True)
+
+    # Consolidado de todos os alunos (a partir dos dados, sem reler os arquivos)
+    consolidado = io.StringIO()
+    escritor = csv.writer(consolidado, delimiter=';')
+    escritor.writerow(['Aluno', 'RA'] + CABECALHO_CSV)
+    for aluno in alunos:
+        escritor.writerows([aluno['nome'], aluno['ra']] + _linha_csv(linha) for linha in aluno['linhas'])
+
+    temporario = f'{destino}.tmp'
+    with zipfile.ZipFile(temporario, 'w', zipfile.ZIP_DEFLATED) as arquivo_zip:
+        arquivo_zip.writestr('boletins.csv', '\ufeff' + consolidado.getvalue())
+        for aluno in alunos:
+            base = _nome_arquivo(aluno)
+            for extensao in ('html', 'csv'):
+                arquivo_zip.write(os.path.join(pasta, f'{base}.{extensao}'), f'{extensao}/{base}.{extensao}')
+    os.replace(temporario, destino)
+    shutil.rmtree(pasta)
+
+    progresso(99)
+    logger.info(f"Boletins {lote} prontos: {destino}")
+    return destino
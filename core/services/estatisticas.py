@@ -0,0 +1,201 @@
+# core/services/estatisticas.py
+"""
+Estatísticas de notas com NumPy
+
+As notas de uma atividade, de uma turma ou de todas as atividades de um
+professor são carregadas em uma única consulta e processadas como vetores:
+distribuição, percentis, desvio padrão, tempo de correção e alunos fora da
+curva.
+
+O resultado fica no cache com uma chave que inclui a última alteração e a
+quantidade de submissões do escopo. Qualquer correção atualiza
+Submissao.atualizado_em, então a chave muda sozinha e o cálculo é refeito
+na próxima visita.
+"""
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, F, FloatField, Func, Max, Value
+from django.db.models.functions import Cast, Coalesce
+
+from core.models import Submissao
+
+# O cálculo só é refeito quando as notas mudam; isto apenas limita o tempo de vida
+ESTATISTICAS_CACHE_SEGUNDOS = 24 * 3600
+
+PERCENTIS = [10, 25, 50, 75, 90]
+
+# Faixas do histograma: 0-1, 1-2, ..., 9-10 (a última inclui o 10)
+FAIXAS_NOTA = np.arange(0, 11)
+
+
+class Epoch(Func):
+    """Segundos de um intervalo (EXTRACT(EPOCH FROM ...)) como float"""
+    template = 'EXTRACT(EPOCH FROM %(expressions)s)'
+    output_field = FloatField()
+
+
+def estatisticas_atividade(atividade):
+    """
+    Estatísticas das notas de uma atividade
+
+    Args:
+        atividade (Atividade): Atividade
+
+    Returns:
+        dict: Veja _calcular()
+    """
+    return _em_cache(
+        f'estatisticas:atividade:{atividade.pk}',
+        Submissao.objects.filter(atividade=atividade),
+    )
+
+
+def estatisticas_turma(turma):
+    """
+    Estatísticas das notas de todas as atividades de uma turma
+
+    Args:
+        turma (Turma): Turma
+
+    Returns:
+        dict: Veja _calcular()
+    """
+    return _em_cache(
+        f'estatisticas:turma:{turma.pk}',
+        Submissao.objects.filter(atividade__turma=turma, atividade__excluida_em__isnull=True),
+    )
+
+
+def estatisticas_professor(professor):
+    """
+    Estatísticas das notas de todas as atividades de um professor
+
+    Args:
+        professor (Professor): Professor
+
+    Returns:
+        dict: Veja _calcular()
+    """
+    return _em_cache(
+        f'estatisticas:professor:{professor.pk}',
+        Submissao.objects.filter(atividade__professor=professor, atividade__excluida_em__isnull=True),
+    )
+
+
+def _em_cache(prefixo, submissoes):
+    """Busca no cache pela versão atual das notas ou calcula e guarda"""
+    versao = submissoes.aggregate(
+        total=Count('id'),
+        ultima=Max('atualizado_em'),
+    )
+    ultima = versao['ultima'].timestamp() if versao['ultima'] else 0
+    chave = f"{prefixo}:{versao['total']}:{ultima}"
+
+    resultado = cache.get(chave)
+    if resultado is None:
+        resultado = _calcular(submissoes)
+        cache.set(chave, resultado, ESTATISTICAS_CACHE_SEGUNDOS)
+    return resultado
+
+
+def _calcular(submissoes):
+    """
+    Calcula as estatísticas de um conjunto de submissões
+
+    Args:
+        submissoes (QuerySet): Submissões do escopo
+
+    Returns:
+        dict: 'total', 'corrigidas', 'media', 'mediana', 'desvio_padrao',
+        'minima', 'maxima', 'percentis', 'distribuicao', 'tempo_correcao'
+        e 'fora_da_curva' (lista de dicts com 'aluno_id', 'media' e 'situacao')
+    """
+    # NULL vira NaN já no banco: a lista de tuplas vira um array float direto
+    nan = Value(float('nan'), output_field=FloatField())
+    linhas = list(
+        submissoes.order_by().values_list(
+            'aluno_id',
+            Coalesce(Cast('nota', FloatField()), nan),
+            Coalesce(Epoch(F('corrigido_em') - F('enviado_em')), nan),
+        )
+    )
+    dados = np.array(linhas, dtype=np.float64).reshape(-1, 3)
+    alunos, notas, segundos = dados[:, 0].astype(np.int64), dados[:, 1], dados[:, 2]
+
+    corrigidas = ~np.isnan(notas)
+    notas = notas[corrigidas]
+    horas = segundos[~np.isnan(segundos)] / 3600
+
+    resultado = {
+        'total': len(dados),
+        'corrigidas': int(corrigidas.sum()),
+        'distribuicao': _distribuicao(notas),
+        'tempo_correcao': None,
+        'fora_da_curva': [],
+    }
+
+    if notas.size:
+        percentis = np.percentile(notas, PERCENTIS)
+        resultado.update({
+            'media': float(notas.mean()),
+            'mediana': float(np.median(notas)),
+            'desvio_padrao': float(notas.std()),
+            'minima': float(notas.min()),
+            'maxima': float(notas.max()),
+            'percentis': dict(zip(PERCENTIS, percentis.tolist())),
+        })
+        resultado['fora_da_curva'] = _fora_da_curva(alunos[corrigidas], notas)
+
+    if horas.size:
+        resultado['tempo_correcao'] = {
+            'media': float(horas.mean()),
+            'mediana': float(np.median(horas)),
+            'p90': float(np.percentile(horas, 90)),
+            'maximo': float(horas.max()),
+        }
+
+    return resultado
+
+
+def _distribuicao(notas):
+    """Histograma das notas por faixa de 1 ponto, com a largura relativa da barra"""
+    contagens, _ = np.histogram(notas, bins=FAIXAS_NOTA)
+    larguras = contagens * 100 // max(int(contagens.max(initial=0)), 1)
+    return [
+        {'faixa': f'{inicio}-{inicio + 1}', 'quantidade': quantidade, 'largura': largura}
+        for inicio, quantidade, largura in zip(
+            FAIXAS_NOTA[:-1].tolist(), contagens.tolist(), larguras.tolist()
+        )
+    ]
+
+
+def _fora_da_curva(alunos, notas):
+    """
+    Alunos cuja média está fora de 1,5 intervalo interquartil (regra de Tukey)
+
+    Args:
+        alunos (np.ndarray): Id do aluno de cada nota
+        notas (np.ndarray): Notas corrigidas
+
+    Returns:
+        list[dict]: 'aluno_id', 'media' e 'situacao' ('acima' ou 'abaixo')
+    """
+    # Média por aluno sem loop: índice de cada aluno + bincount
+    ids, posicoes = np.unique(alunos, return_inverse=True)
+    medias = np.bincount(posicoes, weights=notas) / np.bincount(posicoes)
+    if medias.size < 4:
+        return []
+
+    q1, q3 = np.percentile(medias, [25, 75])
+    margem = 1.5 * (q3 - q1)
+    abaixo = medias < q1 - margem
+    acima = medias > q3 + margem
+
+    fora = np.flatnonzero(abaixo | acima)
+    fora = fora[np.argsort(medias[fora])]
+    return [
+        {'aluno_id': aluno_id, 'media': media, 'situacao': 'acima' if alto else 'abaixo'}
+        for aluno_id, media, alto in zip(
+            ids[fora].tolist(), medias[fora].tolist(), acima[fora].tolist()
+        )
+    ]
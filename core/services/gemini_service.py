@@ -1,23 +1,125 @@
 # backend/core/services/gemini_service.py
-import google.generativeai as genai
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from core.metricas import CACHE_CONSULTAS, GEMINI_ERROS, GEMINI_LATENCIA, GEMINI_RESPOSTAS
+from core.models import UsoIA
+from core.services.provedores_ia import obter_provedor
+from core.services.uso_ia import OrcamentoIAExcedido, registrar_uso, verificar_orcamento
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import hashlib
+import json
 import logging
+import re
+import time
 
 logger = logging.getLogger(__name__)
 
+# Schema da resposta estruturada (subconjunto OpenAPI aceito pelo Gemini)
+SCHEMA_ATIVIDADE = {
+    'type': 'object',
+    'properties': {
+        'titulo': {'type': 'string'},
+        'descricao': {'type': 'string'},
+        'questoes': {'type': 'array', 'items': {'type': 'string'}},
+        'rubrica': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'criterio': {'type': 'string'},
+                    'pontos': {'type': 'number'},
+                },
+                'required': ['criterio'],
+            },
+        },
+    },
+    'required': ['titulo', 'descricao'],
+}
+
+# Limite de tokens da resposta (o raciocínio tem orçamento próprio,
+# GEMINI_RACIOCINIO_TOKENS); folga para descrição, questões e rubrica longas
+MAX_TOKENS_ATIVIDADE = 8192
+
 
 class GeminiService:
-    """Serviço para interagir com a API do Google Gemini"""
+    """
+    Serviço de geração com IA
+
+    Usa o provedor de IA_PROVEDOR (Gemini por padrão; veja provedores_ia)
+    """
+
+    def __init__(self, provedor=None):
+        """
+        Args:
+            provedor (ProvedorIA, optional): Provedor a usar; padrão = settings.IA_PROVEDOR
+        """
+        self.provedor = provedor or obter_provedor()
+
+    def _gerar(self, operacao, prompt, professor=None, esquema=None, max_tokens=None, validar=None):
+        """
+        Chama o modelo contabilizando o uso
 
-    def __init__(self):
-        """Inicializa o serviço com a chave da API"""
-        if not settings.GEMINI_API_KEY:
-            raise ValueError("GEMINI_API_KEY não configurada. Configure no arquivo .env")
+        Verifica o orçamento diário do professor antes da chamada, usa o cache
+        (se GEMINI_CACHE_SEGUNDOS > 0) e registra tokens, latência e resultado.
+
+        Args:
+            operacao (str): Nome da operação para a contabilização
+            prompt (str): Prompt completo
+            professor (Professor, optional): Professor que fez a chamada
+            esquema (dict, optional): Schema da resposta estruturada (JSON)
+            max_tokens (int, optional): Limite de tokens de saída
+            validar (callable, optional): Converte o texto; se levantar
+                exceção, a resposta não vai para o cache
 
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('models/gemini-2.5-flash')
+        Returns:
+            str: Texto da resposta (ou o retorno de validar)
 
-    def gerar_atividade(self, tema, disciplina=None, nivel_dificuldade=None, tipo_atividade=None):
+        Raises:
+            OrcamentoIAExcedido: Se o professor atingiu o limite do dia
+        """
+        verificar_orcamento(professor)
+        validar = validar or (lambda texto: texto)
+
+        chave_cache = None
+        if settings.GEMINI_CACHE_SEGUNDOS:
+            chave_cache = 'gemini:' + hashlib.sha256(f'{operacao}:{prompt}'.encode()).hexdigest()
+            texto = cache.get(chave_cache)
+            CACHE_CONSULTAS.labels('gemini', 'miss' if texto is None else 'hit').inc()
+            if texto is not None:
+                registrar_uso(professor, operacao, UsoIA.RESULTADO_SUCESSO, cache_hit=True)
+                return validar(texto)
+
+        inicio = time.monotonic()
+        try:
+            resposta = self.provedor.gerar(prompt, esquema=esquema, max_tokens=max_tokens)
+        except Exception:
+            GEMINI_ERROS.labels(operacao).inc()
+            self._registrar(professor, operacao, UsoIA.RESULTADO_ERRO, None, inicio)
+            raise
+
+        self._registrar(professor, operacao, UsoIA.RESULTADO_SUCESSO, resposta, inicio)
+        resultado = validar(resposta.texto)
+        if chave_cache:
+            cache.set(chave_cache, resposta.texto, settings.GEMINI_CACHE_SEGUNDOS)
+        return resultado
+
+    def _registrar(self, professor, operacao, resultado, resposta, inicio):
+        """Registra a chamada com os tokens informados pelo provedor e a latência"""
+        duracao = time.monotonic() - inicio
+        GEMINI_LATENCIA.labels(operacao).observe(duracao)
+        registrar_uso(
+            professor,
+            operacao,
+            resultado,
+            tokens_entrada=resposta.tokens_entrada if resposta else 0,
+            tokens_saida=resposta.tokens_saida if resposta else 0,
+            latencia_ms=int(duracao * 1000),
+        )
+
+    def gerar_atividade(self, tema, disciplina=None, nivel_dificuldade=None, tipo_atividade=None,
+                        professor=None):
         """
         Gera uma atividade baseada nos parâmetros fornecidos
 
@@ -26,27 +128,69 @@ class GeminiService:
             disciplina (str, optional): Disciplina (ex: Matemática, História)
             nivel_dificuldade (str, optional): Nível (ex: Fácil, Médio, Difícil)
             tipo_atividade (str, optional): Tipo (ex: Dissertativa, Múltipla Escolha)
+            professor (Professor, optional): Professor que está gerando (orçamento e contabilização)
 
         Returns:
-            dict: Contém 'titulo' e 'descricao' da atividade gerada
+            dict: Contém 'titulo', 'descricao', 'questoes' e 'rubrica' da atividade gerada
         """
         try:
             prompt = self._construir_prompt(tema, disciplina, nivel_dificuldade, tipo_atividade)
 
             logger.info(f"Gerando atividade com tema: {tema}")
-            response = self.model.generate_content(prompt)
-
-            # Processar a resposta
-            texto_gerado = response.text.strip()
-            resultado = self._processar_resposta(texto_gerado)
+            resultado = self._gerar(
+                'gerar_atividade', prompt, professor,
+                esquema=SCHEMA_ATIVIDADE, max_tokens=MAX_TOKENS_ATIVIDADE,
+                validar=self._processar_json,
+            )
 
             logger.info("Atividade gerada com sucesso")
             return resultado
 
+        except OrcamentoIAExcedido:
+            raise
         except Exception as e:
             logger.error(f"Erro ao gerar atividade: {str(e)}")
             raise Exception(f"Erro ao gerar atividade: {str(e)}")
 
+    def gerar_unidade(self, temas, disciplina=None, nivel_dificuldade=None, tipo_atividade=None,
+                      professor=None):
+        """
+        Gera várias atividades (uma por tema) em paralelo
+
+        As chamadas rodam em um pool limitado a GEMINI_MAX_PARALELO, então a
+        unidade leva aproximadamente o tempo da geração mais lenta.
+
+        Args:
+            temas (list[str]): Tema de cada atividade, na ordem da unidade
+            disciplina (str, optional): Disciplina comum a todas
+            nivel_dificuldade (str, optional): Nível comum a todas
+            tipo_atividade (str, optional): Tipo comum a todas
+            professor (Professor, optional): Professor que está gerando
+
+        Returns:
+            list[dict]: Na ordem dos temas; 'tema' e o resultado de
+            gerar_atividade() ou 'erro' com a mensagem da falha
+
+        Raises:
+            OrcamentoIAExcedido: Se o orçamento do dia já acabou antes de começar
+        """
+        verificar_orcamento(professor)
+
+        def gerar(tema):
+            try:
+                return {'tema': tema, **self.gerar_atividade(
+                    tema, disciplina, nivel_dificuldade, tipo_atividade, professor
+                )}
+            except Exception as e:
+                return {'tema': tema, 'erro': str(e)}
+            finally:
+                # Cada thread abre a própria conexão para registrar o uso
+                connection.close()
+
+        trabalhadores = max(1, min(settings.GEMINI_MAX_PARALELO, len(temas)))
+        with ThreadPoolExecutor(max_workers=trabalhadores) as pool:
+            return list(pool.map(gerar, temas))
+
     def _construir_prompt(self, tema, disciplina, nivel_dificuldade, tipo_atividade):
         """Constrói o prompt para a IA baseado nos parâmetros"""
 
@@ -66,82 +210,110 @@ TAREFA: Crie uma atividade educacional completa sobre o tema: "{tema}"
             prompt += f"TIPO DE ATIVIDADE: {tipo_atividade}\n"
 
         prompt += """
-FORMATO DA RESPOSTA:
-- Primeiro, forneça um TÍTULO curto e atrativo para a atividade (máximo 100 caracteres)
-- Depois, forneça a DESCRIÇÃO completa da atividade
-
 INSTRUÇÕES:
-1. O título deve ser claro, objetivo e despertar interesse
-2. A descrição deve conter:
-   - Contexto ou introdução ao tema
-   - Enunciado claro da atividade/questão
-   - Instruções específicas sobre o que o aluno deve fazer
-   - Se aplicável, critérios de avaliação
-3. Use linguagem clara e adequada ao nível educacional
-4. Seja específico e detalhado na descrição
-5. A atividade deve ser desafiadora mas realizável
-
-FORMATO DE SAÍDA:
-TÍTULO: [título da atividade aqui]
-
-DESCRIÇÃO:
-[descrição completa da atividade aqui]
+1. "titulo": curto, claro e atrativo (máximo 100 caracteres)
+2. "descricao": contexto do tema, enunciado claro e instruções do que o aluno deve fazer
+3. "questoes": perguntas da atividade, se houver (não repita na descrição)
+4. "rubrica": critérios de avaliação com a pontuação de cada um, se aplicável
+5. Linguagem adequada ao nível educacional; desafiadora mas realizável
+
+Responda apenas com o JSON no formato definido.
 """
 
         return prompt
 
-    def _processar_resposta(self, texto):
-        """Processa a resposta da IA e extrai título e descrição"""
-
-        linhas = texto.split('\n')
-        titulo = ""
-        descricao = []
-        capturando_descricao = False
-
-        for linha in linhas:
-            linha_limpa = linha.strip()
-
-            # Extrair título
-            if linha_limpa.startswith('TÍTULO:') or linha_limpa.startswith('Título:'):
-                titulo = linha_limpa.split(':', 1)[1].strip()
-
-            # Começar a capturar descrição
-            elif linha_limpa.startswith('DESCRIÇÃO:') or linha_limpa.startswith('Descrição:'):
-                capturando_descricao = True
-                # Verificar se já tem conteúdo na mesma linha
-                resto = linha_limpa.split(':', 1)[1].strip()
-                if resto:
-                    descricao.append(resto)
+    def _processar_json(self, texto):
+        """
+        Valida a resposta estruturada da IA
 
-            # Capturar linhas da descrição
-            elif capturando_descricao and linha_limpa:
-                descricao.append(linha_limpa)
+        Se o JSON vier malformado, tenta repará-lo localmente (sem nova
+        chamada à API). Texto que não é o JSON do schema é rejeitado: virar
+        título e descrição de uma atividade seria pior que o erro.
 
-        # Se não encontrou no formato esperado, usar heurística
-        if not titulo or not descricao:
-            # Tentar primeira linha como título
-            if linhas:
-                titulo = linhas[0].strip().replace('TÍTULO:', '').replace('Título:', '').strip()
-                descricao = [l.strip() for l in linhas[1:] if l.strip()]
+        Args:
+            texto (str): Resposta bruta do modelo
 
-        # Limitar título a 200 caracteres
-        titulo = titulo[:200] if titulo else "Atividade Gerada"
+        Returns:
+            dict: 'titulo', 'descricao', 'questoes' e 'rubrica'
 
-        # Juntar descrição
-        descricao_final = '\n\n'.join(descricao) if descricao else texto
+        Raises:
+            ValueError: Se a resposta não for um JSON válido para o schema
+        """
+        dados = self._carregar_json(texto)
+        if dados is not None:
+            GEMINI_RESPOSTAS.labels('json').inc()
+        else:
+            dados = self._carregar_json(self._reparar_json(texto))
+            if dados is not None:
+                GEMINI_RESPOSTAS.labels('reparada').inc()
+                logger.warning("Resposta JSON da IA reparada localmente")
+
+        if dados is None or not str(dados.get('titulo', '')).strip() or not str(dados.get('descricao', '')).strip():
+            GEMINI_RESPOSTAS.labels('falha').inc()
+            logger.warning(f"Resposta da IA fora do schema: {texto[:200]!r}")
+            raise ValueError('a IA devolveu uma resposta fora do formato esperado')
+
+        questoes = [str(q).strip() for q in dados.get('questoes') or [] if str(q).strip()]
+        rubrica = [
+            {
+                'criterio': str(item['criterio']).strip(),
+                'pontos': item.get('pontos') if isinstance(item.get('pontos'), (int, float)) else None,
+            }
+            for item in dados.get('rubrica') or []
+            if isinstance(item, dict) and str(item.get('criterio', '')).strip()
+        ]
 
         return {
-            'titulo': titulo,
-            'descricao': descricao_final
+            'titulo': str(dados['titulo']).strip()[:200],
+            'descricao': self._montar_descricao(str(dados['descricao']).strip(), questoes, rubrica),
+            'questoes': questoes,
+            'rubrica': rubrica,
         }
 
-    def gerar_feedback(self, resposta_aluno, atividade_descricao):
+    def _carregar_json(self, texto):
+        """Faz o parse do JSON; retorna None se inválido ou se não for um objeto"""
+        try:
+            dados = json.loads(texto)
+        except (TypeError, ValueError):
+            return None
+        return dados if isinstance(dados, dict) else None
+
+    def _reparar_json(self, texto):
+        """
+        Correções comuns em JSON gerado por LLM: cercas de código markdown,
+        texto antes/depois do objeto e vírgulas sobrando antes de } ou ]
+        """
+        texto = re.sub(r'^```(?:json)?\s*|\s*```$', '', texto.strip())
+        inicio, fim = texto.find('{'), texto.rfind('}')
+        if inicio != -1 and fim > inicio:
+            texto = texto[inicio:fim + 1]
+        return re.sub(r',\s*([}\]])', r'\1', texto)
+
+    def _montar_descricao(self, descricao, questoes, rubrica):
+        """Junta questões e rubrica ao texto da descrição exibido no formulário"""
+        partes = [descricao]
+
+        if questoes:
+            partes.append('Questões:\n' + '\n'.join(
+                f'{i}. {questao}' for i, questao in enumerate(questoes, 1)
+            ))
+
+        if rubrica:
+            partes.append('Critérios de avaliação:\n' + '\n'.join(
+                f"- {item['criterio']}" + (f" ({item['pontos']:g} pts)" if item['pontos'] is not None else '')
+                for item in rubrica
+            ))
+
+        return '\n\n'.join(partes)
+
+    def gerar_feedback(self, resposta_aluno, atividade_descricao, professor=None):
         """
         Gera um feedback personalizado para a resposta do aluno
 
         Args:
             resposta_aluno (str): Resposta enviada pelo aluno
             atividade_descricao (str): Descrição original da atividade
+            professor (Professor, optional): Professor que está gerando (orçamento e contabilização)
 
         Returns:
             str: Feedback gerado
@@ -166,16 +338,28 @@ Forneça um feedback construtivo e educacional sobre a resposta do aluno. O feed
 Forneça apenas o feedback, sem prefixos ou títulos.
 """
 
-            response = self.model.generate_content(prompt)
-            feedback = response.text.strip()
+            feedback = self._gerar('gerar_feedback', prompt, professor)
 
             logger.info("Feedback gerado com sucesso")
             return feedback
 
+        except OrcamentoIAExcedido:
+            raise
         except Exception as e:
             logger.error(f"Erro ao gerar feedback: {str(e)}")
             raise Exception(f"Erro ao gerar feedback: {str(e)}")
 
 
-# Instância global do serviço
-gemini_service = GeminiService()
\ No newline at end of file
+@functools.lru_cache(maxsize=None)
+def obter_gemini_service():
+    """
+    Instância compartilhada do serviço, criada na primeira chamada
+
+    O provedor padrão exige GEMINI_API_KEY ao ser criado; adiar a criação
+    deixa importar este módulo (views, benchmark_ia --falso, --help) sem a
+    chave configurada.
+
+    Returns:
+        GeminiService: Serviço com o provedor de IA_PROVEDOR
+    """
+    return GeminiService()
\ No newline at end of file
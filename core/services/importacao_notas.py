@@ -0,0 +1,260 @@
+# core/services/importacao_notas.py
+"""
+Importação de notas a partir de planilhas (CSV)
+
+O arquivo é normalizado em Python (codificação, separador e número da
+linha) e copiado com COPY para uma tabela temporária. A validação, o
+cruzamento com alunos/atividades/submissões e a atualização são feitos
+no banco em poucas instruções, qualquer que seja o número de linhas.
+
+Colunas esperadas (cabeçalho na primeira linha, separador , ou ;):
+    ra, atividade (id), nota, observacao (opcional)
+"""
+import csv
+import io
+import unicodedata
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import Aluno, Atividade, Submissao
+
+# Situação de cada linha no relatório
+STATUS_ATUALIZADA = 'atualizada'
+STATUS_INALTERADA = 'inalterada'
+STATUS_EM_BRANCO = 'em_branco'
+STATUS_NOTA_INVALIDA = 'nota_invalida'
+STATUS_ALUNO_NAO_ENCONTRADO = 'aluno_nao_encontrado'
+STATUS_ATIVIDADE_NAO_ENCONTRADA = 'atividade_nao_encontrada'
+STATUS_SEM_SUBMISSAO = 'sem_submissao'
+STATUS_DUPLICADA = 'duplicada'
+
+STATUS_DISPLAY = {
+    STATUS_ATUALIZADA: 'Atualizada',
+    STATUS_INALTERADA: 'Sem alteração',
+    STATUS_EM_BRANCO: 'Nota em branco',
+    STATUS_NOTA_INVALIDA: 'Nota inválida (use 0 a 10)',
+    STATUS_ALUNO_NAO_ENCONTRADO: 'RA não encontrado',
+    STATUS_ATIVIDADE_NAO_ENCONTRADA: 'Atividade não encontrada',
+    STATUS_SEM_SUBMISSAO: 'Aluno não enviou a atividade',
+    STATUS_DUPLICADA: 'Repetida (vale a última linha com nota válida)',
+}
+
+# Nomes aceitos no cabeçalho para cada coluna
+COLUNAS = {
+    'ra': ['ra'],
+    'atividade': ['atividade', 'atividade_id', 'id_atividade'],
+    'nota': ['nota'],
+    'observacao': ['observacao', 'obs', 'feedback'],
+}
+
+
+class ErroImportacao(Exception):
+    """Arquivo que não pode ser importado (formato, cabeçalho ou tamanho)"""
+
+
+def _normalizar(nome):
+    """Cabeçalho sem acentos, espaços e maiúsculas ('Observação' -> 'observacao')"""
+    nome = unicodedata.normalize('NFKD', nome).encode('ascii', 'ignore').decode()
+    return nome.strip().lower().replace(' ', '_')
+
+
+def _ler(arquivo):
+    """
+    Lê o CSV enviado e devolve as linhas no formato da tabela temporária
+
+    Args:
+        arquivo (UploadedFile): Arquivo enviado
+
+    Returns:
+        tuple: (io.StringIO em CSV com linha, ra, atividade, nota, observacao;
+        quantidade de linhas)
+
+    Raises:
+        ErroImportacao: Codificação, cabeçalho ou tamanho inválidos
+    """
+    conteudo = arquivo.read()
+    # Excel no Windows costuma salvar em cp1252; o BOM vem do "CSV UTF-8"
+    for codificacao in ('utf-8-sig', 'cp1252'):
+        try:
+            texto = conteudo.decode(codificacao)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise ErroImportacao('Não foi possível ler o arquivo. Salve a planilha como CSV.')
+
+    primeira_linha = texto.split('\n', 1)[0]
+    separador = ';' if primeira_linha.count(';') > primeira_linha.count(',') else ','
+    leitor = csv.reader(io.StringIO(texto), delimiter=separador)
+
+    cabecalho = [_normalizar(nome) for nome in next(leitor, [])]
+    posicoes = {}
+    for coluna, nomes in COLUNAS.items():
+        posicoes[coluna] = next((cabecalho.index(nome) for nome in nomes if nome in cabecalho), None)
+    faltando = [coluna for coluna in ('ra', 'atividade', 'nota') if posicoes[coluna] is None]
+    if faltando:
+        raise ErroImportacao(f'Coluna(s) obrigatória(s) ausente(s) no cabeçalho: {", ".join(faltando)}.')
+
+    saida = io.StringIO()
+    escritor = csv.writer(saida)
+    total = 0
+    # A linha 1 é o cabeçalho: o número é o mesmo que o professor vê na planilha
+    for numero, linha in enumerate(leitor, start=2):
+        if not any(celula.strip() for celula in linha):
+            continue
+        total += 1
+        if total > settings.IMPORTACAO_NOTAS_MAX_LINHAS:
+            raise ErroImportacao(
+                f'O arquivo passou de {settings.IMPORTACAO_NOTAS_MAX_LINHAS} linhas. Divida a planilha.'
+            )
+        escritor.writerow([numero] + [
+            linha[posicao] if posicao is not None and posicao < len(linha) else ''
+            for posicao in (posicoes[coluna] for coluna in COLUNAS)
+        ])
+
+    saida.seek(0)
+    return saida, total
+
+
+def importar_notas(professor, arquivo, aplicar=True):
+    """
+    Importa as notas de um CSV para as submissões das atividades do professor
+
+    Linhas casam por RA e id da atividade. Notas fora de 0 a 10, alunos ou
+    atividades desconhecidos e alunos sem submissão são apenas relatados.
+    As linhas válidas são aplicadas com um único UPDATE que repete o que o
+    Submissao.save() da correção manual grava: corrigido_em na primeira
+    nota e atualizado_em com o instante da escrita, tomado só depois da
+    validação. Assim o cache das estatísticas, o feed ao vivo, o 304 das
+    páginas do aluno e a indexação de similaridade (que vê a resposta
+    inalterada pelo hash) tratam a importação como uma correção comum.
+
+    Args:
+        professor (Professor): Dono das atividades
+        arquivo (UploadedFile): CSV enviado
+        aplicar (bool): Se False, só monta o relatório (conferência)
+
+    Returns:
+        dict: 'linhas' (uma por linha do arquivo, com 'linha', 'ra', 'aluno',
+        'atividade', 'titulo', 'nota_anterior', 'nota', 'status' e
+        'status_display'), 'resumo' (Counter por status) e 'contagem' (a mesma
+        contagem em lista, na ordem de STATUS_DISPLAY, para o template)
+
+    Raises:
+        ErroImportacao: Arquivo inválido ou banco sem suporte a COPY
+    """
+    if connection.vendor != 'postgresql':
+        raise ErroImportacao('A importação de notas usa COPY e requer PostgreSQL.')
+
+    dados, total = _ler(arquivo)
+    if not total:
+        raise ErroImportacao('O arquivo não tem linhas de notas.')
+
+    submissao = Submissao._meta.db_table
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMP TABLE importacao_nota "
+            "(linha integer, ra text, atividade text, nota text, observacao text) ON COMMIT DROP"
+        )
+        # Em FORMAT csv, campo vazio sem aspas chega como NULL
+        cursor.copy_expert("COPY importacao_nota FROM STDIN WITH (FORMAT csv)", dados)
+
+        # Validação e cruzamento em uma consulta; a última linha válida repetida vale
+        cursor.execute(
+            f"""
+            CREATE TEMP TABLE importacao_resultado ON COMMIT DROP AS
+            WITH linhas AS (
+                SELECT
+                    linha,
+                    btrim(ra) AS ra,
+                    btrim(atividade) AS atividade,
+                    COALESCE(btrim(nota), '') AS nota_texto,
+                    NULLIF(btrim(observacao), '') AS observacao,
+                    CASE WHEN btrim(atividade) ~ '^[0-9]{{1,9}}$' THEN btrim(atividade)::integer END AS atividade_id,
+                    CASE WHEN btrim(nota) ~ '^[0-9]{{1,2}}([.,][0-9]+)?$'
+                         THEN round(replace(btrim(nota), ',', '.')::numeric, 2) END AS nota
+                FROM importacao_nota
+            ),
+            cruzadas AS (
+                SELECT
+                    l.*,
+                    al.nome AS aluno,
+                    at.titulo,
+                    s.id AS submissao_id,
+                    s.nota AS nota_anterior,
+                    s.observacao AS observacao_anterior,
+                    -- Só as linhas com nota utilizável disputam a última
+                    -- posição: uma linha em branco ou inválida depois da
+                    -- nota não a derruba
+                    row_number() OVER (
+                        PARTITION BY al.id, at.id, (l.nota IS NOT NULL AND l.nota <= 10)
+                        ORDER BY l.linha DESC
+                    ) AS ordem
+                FROM linhas l
+                LEFT JOIN {Aluno._meta.db_table} al ON al.ra = l.ra
+                LEFT JOIN {Atividade._meta.db_table} at
+                    ON at.id = l.atividade_id AND at.professor_id = %s AND at.excluida_em IS NULL
+                LEFT JOIN {submissao} s ON s.atividade_id = at.id AND s.aluno_id = al.id
+            )
+            SELECT *, CASE
+                WHEN nota_texto = '' THEN %s
+                WHEN nota IS NULL OR nota > 10 THEN %s
+                WHEN aluno IS NULL THEN %s
+                WHEN titulo IS NULL THEN %s
+                WHEN submissao_id IS NULL THEN %s
+                WHEN ordem > 1 THEN %s
+                WHEN nota = nota_anterior
+                     AND (observacao IS NULL OR observacao = observacao_anterior) THEN %s
+                ELSE %s
+            END AS status
+            FROM cruzadas
+            """,
+            [
+                professor.pk,
+                STATUS_EM_BRANCO, STATUS_NOTA_INVALIDA, STATUS_ALUNO_NAO_ENCONTRADO,
+                STATUS_ATIVIDADE_NAO_ENCONTRADA, STATUS_SEM_SUBMISSAO, STATUS_DUPLICADA,
+                STATUS_INALTERADA, STATUS_ATUALIZADA,
+            ]
+        )
+
+        if aplicar:
+            # Como o auto_now do save(): o instante da escrita, não o do início
+            # da importação, para não ficar atrás de correções feitas durante
+            # a leitura do arquivo e passar despercebido pelas chaves de cache
+            agora = timezone.now()
+            cursor.execute(
+                f"""
+                UPDATE {submissao} s SET
+                    nota = r.nota,
+                    observacao = COALESCE(r.observacao, s.observacao),
+                    corrigido_em = COALESCE(s.corrigido_em, %s),
+                    atualizado_em = %s
+                FROM importacao_resultado r
+                WHERE r.status = %s AND s.id = r.submissao_id
+                """,
+                [agora, agora, STATUS_ATUALIZADA]
+            )
+
+        cursor.execute(
+            "SELECT linha, ra, aluno, atividade, titulo, nota_anterior, nota, nota_texto, status "
+            "FROM importacao_resultado ORDER BY linha"
+        )
+        colunas = [coluna[0] for coluna in cursor.description]
+        linhas = [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+
+    for linha in linhas:
+        linha['status_display'] = STATUS_DISPLAY[linha['status']]
+
+    resumo = Counter(linha['status'] for linha in linhas)
+    return {
+        'linhas': linhas,
+        'resumo': resumo,
+        'contagem': [
+            {'status': status, 'status_display': display, 'total': resumo[status]}
+            for status, display in STATUS_DISPLAY.items() if resumo[status]
+        ],
+    }
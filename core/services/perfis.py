@@ -0,0 +1,198 @@
+# core/services/perfis.py
+"""
+Perfis de requisições (cProfile + SQL)
+
+Cada perfil é gravado em PERFIL_DIR como dois arquivos com o mesmo nome:
+<nome>.prof (formato do pstats, abre no snakeviz) e <nome>.json (dados da
+requisição e consultas SQL). O nome começa com a origem e a view, para que
+a captura automática encontre os perfis de uma view sem ler o diretório
+inteiro:
+
+    manual__atividade_submissoes__20261019-153012-1a2b3c4d
+    auto__professor_atividades__20261019-153544-9f8e7d6c
+
+O diretório guarda no máximo PERFIL_MAX_ARQUIVOS perfis; os mais antigos
+são apagados a cada gravação.
+"""
+import json
+import os
+import pstats
+import re
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+ORIGEM_MANUAL = 'manual'
+ORIGEM_AUTO = 'auto'
+
+ORDENACOES = {
+    'cumulative': 'Tempo acumulado',
+    'tottime': 'Tempo próprio',
+    'ncalls': 'Chamadas',
+}
+
+NOME_VALIDO = re.compile(r'^(manual|auto)__[\w]+__[\d-]+-[0-9a-f]{8}$')
+
+
+def _diretorio():
+    diretorio = Path(settings.PERFIL_DIR)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    return diretorio
+
+
+def _apagar(diretorio, nome):
+    for extensao in ('.prof', '.json'):
+        try:
+            (diretorio / f'{nome}{extensao}').unlink()
+        except FileNotFoundError:
+            pass
+
+
+def salvar_perfil(perfil, origem, view, dados):
+    """
+    Grava o perfil e os dados da requisição e faz a rotação do diretório
+
+    Args:
+        perfil (cProfile.Profile): Perfil já desligado
+        origem (str): ORIGEM_MANUAL ou ORIGEM_AUTO
+        view (str): Nome da URL resolvida
+        dados (dict): Método, caminho, status, duração, usuário e consultas
+
+    Returns:
+        str: Nome do perfil
+    """
+    diretorio = _diretorio()
+    agora = timezone.now()
+    nome = f'{origem}__{view}__{agora:%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}'
+
+    perfil.dump_stats(diretorio / f'{nome}.prof')
+    dados = {**dados, 'nome': nome, 'origem': origem, 'view': view, 'criado_em': agora.isoformat()}
+    (diretorio / f'{nome}.json').write_text(json.dumps(dados, ensure_ascii=False))
+
+    # Rotação: o .json é gravado por último, então é ele que marca o perfil
+    arquivos = sorted(diretorio.glob('*.json'), key=os.path.getmtime, reverse=True)
+    for arquivo in arquivos[settings.PERFIL_MAX_ARQUIVOS:]:
+        _apagar(diretorio, arquivo.stem)
+
+    return nome
+
+
+def _ler_dados(arquivo):
+    try:
+        dados = json.loads(arquivo.read_text())
+    except (OSError, ValueError):
+        # Apagado pela rotação de outro processo ou ainda sendo gravado
+        return None
+    dados['criado_em'] = datetime.fromisoformat(dados['criado_em'])
+    return dados
+
+
+def duracoes_auto(view):
+    """
+    Duração (ms) dos perfis automáticos guardados de uma view
+
+    Args:
+        view (str): Nome da URL resolvida
+
+    Returns:
+        dict: {nome: duracao_ms}
+    """
+    duracoes = {}
+    for arquivo in _diretorio().glob(f'{ORIGEM_AUTO}__{view}__*.json'):
+        dados = _ler_dados(arquivo)
+        if dados:
+            duracoes[arquivo.stem] = dados['duracao_ms']
+    return duracoes
+
+
+def manter_mais_lentos(view, quantidade):
+    """
+    Apaga os perfis automáticos da view que não estão entre os mais lentos
+
+    Args:
+        view (str): Nome da URL resolvida
+        quantidade (int): Perfis a manter
+    """
+    duracoes = duracoes_auto(view)
+    diretorio = _diretorio()
+    for nome in sorted(duracoes, key=duracoes.get, reverse=True)[quantidade:]:
+        _apagar(diretorio, nome)
+
+
+def listar_perfis():
+    """
+    Perfis guardados, do mais recente para o mais antigo
+
+    Returns:
+        list: Dados de cada perfil (sem as consultas SQL)
+    """
+    perfis = []
+    for arquivo in _diretorio().glob('*.json'):
+        dados = _ler_dados(arquivo)
+        if dados:
+            dados['total_consultas'] = len(dados.pop('consultas', []))
+            perfis.append(dados)
+    return sorted(perfis, key=lambda dados: dados['criado_em'], reverse=True)
+
+
+def caminho_perfil(nome):
+    """
+    Caminho do arquivo .prof de um perfil
+
+    Args:
+        nome (str): Nome do perfil
+
+    Returns:
+        Path | None: Caminho, ou None se o nome for inválido ou o perfil não existir
+    """
+    if not NOME_VALIDO.match(nome):
+        return None
+    caminho = _diretorio() / f'{nome}.prof'
+    return caminho if caminho.exists() else None
+
+
+def _local(arquivo):
+    """Caminho curto para exibição (relativo ao projeto ou ao site-packages)"""
+    for base in (str(settings.BASE_DIR), 'site-packages'):
+        if base in arquivo:
+            return arquivo.split(base, 1)[1].lstrip(os.sep)
+    return arquivo
+
+
+def carregar_perfil(nome, ordenacao='cumulative', limite=80):
+    """
+    Dados da requisição e as funções mais custosas do perfil
+
+    Args:
+        nome (str): Nome do perfil
+        ordenacao (str): Chave de ORDENACOES
+        limite (int): Quantidade de funções
+
+    Returns:
+        dict | None: Dados do .json mais 'funcoes' e 'tempo_total_ms', ou None
+        se o perfil não existir
+    """
+    caminho = caminho_perfil(nome)
+    dados = _ler_dados(caminho.with_suffix('.json')) if caminho else None
+    if not dados:
+        return None
+
+    estatisticas = pstats.Stats(str(caminho))
+    indice = {'cumulative': 3, 'tottime': 2, 'ncalls': 1}[ordenacao]
+    linhas = sorted(estatisticas.stats.items(), key=lambda item: item[1][indice], reverse=True)
+
+    dados['funcoes'] = [
+        {
+            'funcao': funcao,
+            'local': f'{_local(arquivo)}:{linha}' if linha else _local(arquivo),
+            'chamadas': chamadas if primitivas == chamadas else f'{chamadas}/{primitivas}',
+            'proprio_ms': proprio * 1000,
+            'acumulado_ms': acumulado * 1000,
+        }
+        for (arquivo, linha, funcao), (primitivas, chamadas, proprio, acumulado, _) in linhas[:limite]
+    ]
+    dados['tempo_total_ms'] = estatisticas.total_tt * 1000
+    return dados
@@ -0,0 +1,260 @@
+# core/services/provedores_ia.py
+"""
+Provedores de modelos de linguagem
+
+O GeminiService não conversa direto com uma biblioteca: ele recebe um
+provedor, escolhido por IA_PROVEDOR nas settings (caminho da classe, como
+EMAIL_BACKEND). Para testes de carga e desenvolvimento sem rede, use o
+ProvedorFalso, que simula latência, erros e respostas.
+
+Usage:
+    # .env
+    IA_PROVEDOR=core.services.provedores_ia.ProvedorFalso
+    IA_FALSO_LATENCIA=lognormal
+    IA_FALSO_TAXA_ERRO=0.05
+"""
+import itertools
+import json
+import math
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class RespostaIA:
+    """Texto gerado e tokens consumidos em uma chamada"""
+
+    def __init__(self, texto, tokens_entrada=0, tokens_saida=0):
+        self.texto = texto
+        self.tokens_entrada = tokens_entrada
+        self.tokens_saida = tokens_saida
+
+
+class ErroProvedorIA(Exception):
+    """Falha na chamada ao provedor (rede, cota, erro do serviço)"""
+
+
+class ProvedorIA:
+    """
+    Interface dos provedores
+
+    Subclasses implementam gerar(); o restante (orçamento, cache, métricas
+    e parse) fica no GeminiService.
+    """
+
+    def gerar(self, prompt, esquema=None, max_tokens=None):
+        """
+        Gera uma resposta para o prompt
+
+        Args:
+            prompt (str): Prompt completo
+            esquema (dict, optional): Schema JSON; se informado, a resposta deve ser JSON
+            max_tokens (int, optional): Limite de tokens de saída
+
+        Returns:
+            RespostaIA: Texto e uso de tokens
+
+        Raises:
+            TimeoutError: Se a chamada passar de IA_TIMEOUT_SEGUNDOS
+            ErroProvedorIA: Em qualquer outra falha do provedor
+        """
+        raise NotImplementedError
+
+
+class ProvedorGemini(ProvedorIA):
+    """
+    Google Gemini pela API REST (generateContent)
+
+    No gemini-2.5-flash os tokens de raciocínio ("thinking") contam dentro do
+    maxOutputTokens: sem um orçamento próprio, a resposta JSON sai truncada
+    ou vazia. A biblioteca google-generativeai fixa uma versão da API sem o
+    thinkingConfig, então a chamada é feita direto com requests.
+    """
+
+    MODELO = 'gemini-2.5-flash'
+    URL = 'https://generativelanguage.googleapis.com/v1beta/models/{modelo}:generateContent'
+
+    def __init__(self):
+        if not settings.GEMINI_API_KEY:
+            raise ValueError("GEMINI_API_KEY não configurada. Configure no arquivo .env")
+
+        # Uma sessão (pool de conexões) por thread: gerar_unidade chama em paralelo
+        self._local = threading.local()
+
+    def _sessao(self):
+        sessao = getattr(self._local, 'sessao', None)
+        if sessao is None:
+            sessao = self._local.sessao = requests.Session()
+            sessao.headers['x-goog-api-key'] = settings.GEMINI_API_KEY
+        return sessao
+
+    def gerar(self, prompt, esquema=None, max_tokens=None):
+        raciocinio = settings.GEMINI_RACIOCINIO_TOKENS
+        config = {'thinkingConfig': {'thinkingBudget': raciocinio}}
+        if esquema is not None:
+            config['responseMimeType'] = 'application/json'
+            config['responseSchema'] = _esquema_rest(esquema)
+        if max_tokens is not None:
+            # max_tokens vale para a resposta; o raciocínio tem o seu orçamento
+            config['maxOutputTokens'] = max_tokens + raciocinio
+
+        try:
+            response = self._sessao().post(
+                self.URL.format(modelo=self.MODELO),
+                json={
+                    'contents': [{'role': 'user', 'parts': [{'text': prompt}]}],
+                    'generationConfig': config,
+                },
+                timeout=settings.IA_TIMEOUT_SEGUNDOS,
+            )
+        except requests.Timeout as e:
+            raise TimeoutError(f"Gemini: tempo limite de {settings.IA_TIMEOUT_SEGUNDOS}s excedido") from e
+        except requests.RequestException as e:
+            raise ErroProvedorIA(f"Gemini: {e}") from e
+
+        if response.status_code != 200:
+            try:
+                mensagem = response.json()['error']['message']
+            except (ValueError, KeyError, TypeError):
+                mensagem = response.text[:200]
+            raise ErroProvedorIA(f"Gemini respondeu {response.status_code}: {mensagem}")
+
+        dados = response.json()
+        candidatos = dados.get('candidates') or []
+        if not candidatos:
+            bloqueio = (dados.get('promptFeedback') or {}).get('blockReason', 'desconhecido')
+            raise ErroProvedorIA(f"Gemini não gerou resposta (bloqueio: {bloqueio})")
+
+        candidato = candidatos[0]
+        texto = ''.join(
+            parte.get('text', '')
+            for parte in (candidato.get('content') or {}).get('parts', [])
+            if not parte.get('thought')
+        ).strip()
+        motivo = candidato.get('finishReason')
+        if motivo == 'MAX_TOKENS':
+            raise ErroProvedorIA("Gemini: resposta truncada no limite de tokens de saída")
+        if not texto:
+            raise ErroProvedorIA(f"Gemini devolveu uma resposta vazia ({motivo})")
+
+        # Os tokens de raciocínio são cobrados como saída
+        uso = dados.get('usageMetadata') or {}
+        return RespostaIA(
+            texto,
+            tokens_entrada=uso.get('promptTokenCount', 0),
+            tokens_saida=uso.get('candidatesTokenCount', 0) + uso.get('thoughtsTokenCount', 0),
+        )
+
+
+def _esquema_rest(no):
+    """Schema no formato da API REST (tipos em maiúsculas, como o enum Type)"""
+    if isinstance(no, dict):
+        return {
+            chave: valor.upper() if chave == 'type' and isinstance(valor, str) else _esquema_rest(valor)
+            for chave, valor in no.items()
+        }
+    if isinstance(no, list):
+        return [_esquema_rest(item) for item in no]
+    return no
+
+
+class ProvedorFalso(ProvedorIA):
+    """
+    Provedor local para testes de carga e desenvolvimento offline
+
+    Configurado por IA_PROVEDOR_FALSO:
+        latencia: 'fixa', 'uniforme', 'normal' ou 'lognormal'
+        latencia_media / latencia_desvio: em segundos
+        taxa_erro: fração das chamadas que falham (0 a 1)
+        respostas: textos (ou objetos, serializados em JSON) devolvidos em
+            sequência; vazio = resposta mínima válida para o schema
+        semente: semente do sorteio, para execuções reproduzíveis
+    """
+
+    def __init__(self, **opcoes):
+        config = {**settings.IA_PROVEDOR_FALSO, **opcoes}
+        self.latencia = config['latencia']
+        self.media = config['latencia_media']
+        self.desvio = config['latencia_desvio']
+        self.taxa_erro = config['taxa_erro']
+        self.respostas = itertools.cycle(config['respostas']) if config['respostas'] else None
+
+        # random.Random não é thread-safe: o sorteio fica sob o lock
+        self._random = random.Random(config['semente'])
+        self._lock = threading.Lock()
+        self._chamadas = itertools.count(1)
+
+    def _sortear(self):
+        """Sorteia a latência (segundos) e se a chamada vai falhar"""
+        with self._lock:
+            if self.latencia == 'fixa':
+                segundos = self.media
+            elif self.latencia == 'uniforme':
+                segundos = self._random.uniform(self.media - self.desvio, self.media + self.desvio)
+            elif self.latencia == 'normal':
+                segundos = self._random.gauss(self.media, self.desvio)
+            elif self.latencia == 'lognormal':
+                # Parâmetros da normal subjacente para obter a média e o desvio pedidos
+                sigma2 = math.log(1 + (self.desvio / self.media) ** 2)
+                segundos = self._random.lognormvariate(math.log(self.media) - sigma2 / 2, math.sqrt(sigma2))
+            else:
+                raise ValueError(f"Distribuição de latência desconhecida: {self.latencia}")
+            falhar = self._random.random() < self.taxa_erro
+            texto = next(self.respostas) if self.respostas else None
+        return max(segundos, 0), falhar, texto
+
+    def gerar(self, prompt, esquema=None, max_tokens=None):
+        segundos, falhar, texto = self._sortear()
+
+        if segundos > settings.IA_TIMEOUT_SEGUNDOS:
+            time.sleep(settings.IA_TIMEOUT_SEGUNDOS)
+            raise TimeoutError(f"Provedor falso: tempo limite de {settings.IA_TIMEOUT_SEGUNDOS}s excedido")
+
+        time.sleep(segundos)
+        if falhar:
+            raise ErroProvedorIA("Provedor falso: erro injetado")
+
+        if texto is None:
+            numero = next(self._chamadas)
+            texto = _exemplo(esquema, numero) if esquema is not None else f'Resposta gerada localmente ({numero}).'
+        if not isinstance(texto, str):
+            texto = json.dumps(texto, ensure_ascii=False)
+
+        # Estimativa grosseira: ~4 caracteres por token
+        return RespostaIA(texto, tokens_entrada=len(prompt) // 4, tokens_saida=len(texto) // 4)
+
+
+def _exemplo(esquema, numero):
+    """Monta um JSON mínimo que satisfaz o schema (campos obrigatórios preenchidos)"""
+
+    def valor(no, nome):
+        tipo = no.get('type')
+        if tipo == 'object':
+            return {
+                campo: valor(filho, campo)
+                for campo, filho in no.get('properties', {}).items()
+                if campo in no.get('required', [])
+            }
+        if tipo == 'array':
+            return []
+        if tipo in ('number', 'integer'):
+            return 0
+        if tipo == 'boolean':
+            return False
+        return f'{nome} gerado localmente ({numero})'
+
+    return json.dumps(valor(esquema, 'resposta'), ensure_ascii=False)
+
+
+def obter_provedor():
+    """
+    Instancia o provedor configurado em IA_PROVEDOR
+
+    Returns:
+        ProvedorIA: Provedor pronto para uso
+    """
+    return import_string(settings.IA_PROVEDOR)()
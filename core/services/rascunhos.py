@@ -0,0 +1,113 @@
+# core/services/rascunhos.py
+"""
+Rascunhos das respostas dos alunos
+
+O navegador envia o texto alguns segundos depois que o aluno para de
+digitar. Cada salvamento é um upsert em (aluno, atividade) que só regrava
+a linha quando o hash do texto mudou, então salvamentos repetidos não
+escrevem no banco mesmo vindo de processos diferentes. O hash do último
+texto gravado também fica no cache, como atalho que evita até o upsert.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from core.metricas import CACHE_CONSULTAS
+from core.models import Rascunho
+
+# Só limita o tempo de vida da chave; sem ela o upsert é refeito e o banco
+# descarta o texto igual
+RASCUNHO_CACHE_SEGUNDOS = 6 * 3600
+
+
+def hash_texto(texto):
+    """
+    Hash curto do texto do rascunho
+
+    Args:
+        texto (str): Texto
+
+    Returns:
+        str: BLAKE2b de 16 bytes em hexadecimal
+    """
+    return hashlib.blake2b(texto.encode(), digest_size=16).hexdigest()
+
+
+def _chave(aluno_id, atividade_id):
+    return f'rascunho:{aluno_id}:{atividade_id}'
+
+
+def salvar_rascunho(aluno_id, atividade_id, texto):
+    """
+    Grava o rascunho se o texto mudou desde o último salvamento
+
+    Args:
+        aluno_id (int): Aluno
+        atividade_id (int): Atividade
+        texto (str): Texto atual da resposta
+
+    Returns:
+        bool: True se o rascunho foi gravado, False se era igual ao último
+    """
+    hash_atual = hash_texto(texto)
+    chave = _chave(aluno_id, atividade_id)
+
+    inalterado = cache.get(chave) == hash_atual
+    CACHE_CONSULTAS.labels('rascunho', 'hit' if inalterado else 'miss').inc()
+    if inalterado:
+        return False
+
+    # A coalescência vale no próprio upsert: o cache pode ser por processo
+    # ou ter perdido a chave, e o banco ainda descarta o texto repetido
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {Rascunho._meta.db_table} AS r
+                (aluno_id, atividade_id, texto, hash, atualizado_em)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (aluno_id, atividade_id) DO UPDATE SET
+                texto = EXCLUDED.texto,
+                hash = EXCLUDED.hash,
+                atualizado_em = EXCLUDED.atualizado_em
+            WHERE r.hash IS DISTINCT FROM EXCLUDED.hash
+            RETURNING id
+            """,
+            [aluno_id, atividade_id, texto, hash_atual, timezone.now()]
+        )
+        gravado = cursor.fetchone() is not None
+
+    cache.set(chave, hash_atual, RASCUNHO_CACHE_SEGUNDOS)
+    return gravado
+
+
+def carregar_rascunho(aluno_id, atividade_id):
+    """
+    Texto do rascunho salvo, para preencher o formulário
+
+    Args:
+        aluno_id (int): Aluno
+        atividade_id (int): Atividade
+
+    Returns:
+        str: Texto do rascunho ('' se não houver)
+    """
+    return Rascunho.objects.filter(
+        aluno_id=aluno_id, atividade_id=atividade_id
+    ).values_list('texto', flat=True).first() or ''
+
+
+def promover_rascunho(aluno_id, atividade_id):
+    """
+    Descarta o rascunho depois do envio final
+
+    A submissão passa a ser a versão oficial da resposta; o rascunho e a
+    chave de coalescência deixam de ser necessários.
+
+    Args:
+        aluno_id (int): Aluno
+        atividade_id (int): Atividade
+    """
+    Rascunho.objects.filter(aluno_id=aluno_id, atividade_id=atividade_id).delete()
+    cache.delete(_chave(aluno_id, atividade_id))
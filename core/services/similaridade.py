@@ -0,0 +1,246 @@
+# core/services/similaridade.py
+"""
+Relatório de respostas semelhantes (possível plágio)
+
+Comparar todas as respostas duas a duas é O(n²). Aqui cada resposta vira uma
+assinatura MinHash (calculada uma vez e guardada em AssinaturaSubmissao) e o
+LSH agrupa as assinaturas por faixas: só respostas que coincidem em pelo
+menos uma faixa são comparadas, o que deixa o relatório quase linear.
+
+Com NUM_FAIXAS x LINHAS_POR_FAIXA = 16 x 8, pares com similaridade de
+Jaccard a partir de ~0,7 quase sempre viram candidatos.
+"""
+import hashlib
+import re
+import unicodedata
+import zlib
+
+import numpy as np
+from django.db.models import F, Q
+from django.db.models.functions import MD5
+from django.utils import timezone
+
+from core.models import AssinaturaSubmissao, Submissao, Tarefa
+
+# Palavras por shingle e tamanho mínimo da resposta para entrar na comparação
+TAMANHO_SHINGLE = 5
+MIN_PALAVRAS = 10
+
+NUM_PERMUTACOES = 128
+NUM_FAIXAS = 16
+LINHAS_POR_FAIXA = NUM_PERMUTACOES // NUM_FAIXAS
+
+# Similaridade estimada mínima para considerar duas respostas suspeitas
+LIMIAR_SIMILARIDADE = 0.7
+
+# Respostas novas calculadas durante a requisição do relatório; acima disso
+# o cálculo vai para a tarefa indexar_similaridade
+INDEXACAO_NA_REQUISICAO = 50
+
+# Hash universal h(x) = (a*x + b) mod P, com P primo < 2^32: o resultado
+# cabe em uint32 e a*x + b não estoura uint64
+_PRIMO = np.uint64(4294967291)
+_gerador = np.random.default_rng(20240917)
+_A = _gerador.integers(1, int(_PRIMO), NUM_PERMUTACOES, dtype=np.uint64)
+_B = _gerador.integers(0, int(_PRIMO), NUM_PERMUTACOES, dtype=np.uint64)
+
+
+def normalizar(texto):
+    """
+    Normaliza a resposta para comparação
+
+    Remove acentos, pontuação e diferenças de caixa e espaçamento.
+
+    Args:
+        texto (str): Resposta original
+
+    Returns:
+        list[str]: Palavras normalizadas
+    """
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return re.findall(r'\w+', texto)
+
+
+def assinatura(texto):
+    """
+    Calcula a assinatura MinHash de uma resposta
+
+    Args:
+        texto (str): Resposta original
+
+    Returns:
+        tuple[np.ndarray, int]: Vetor uint32 (NUM_PERMUTACOES) e número de palavras
+    """
+    palavras = normalizar(texto)
+    tamanho = min(TAMANHO_SHINGLE, len(palavras)) or 1
+    shingles = {
+        ' '.join(palavras[i:i + tamanho])
+        for i in range(max(len(palavras) - tamanho + 1, 1))
+    }
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles)
+    )
+
+    # Todas as permutações de uma vez: matriz (permutações x shingles)
+    valores = (_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIMO
+    return valores.min(axis=1).astype(np.uint32), len(palavras)
+
+
+def _desatualizadas(atividade):
+    """Submissões sem assinatura ou alteradas depois do cálculo"""
+    return Submissao.objects.filter(atividade=atividade).filter(
+        Q(assinatura__isnull=True) | Q(assinatura__calculada_em__lt=F('atualizado_em'))
+    )
+
+
+def indexar_submissoes(atividade, limite=None):
+    """
+    Calcula as assinaturas que faltam ou cuja resposta mudou
+
+    Uma submissão corrigida muda atualizado_em, mas não a resposta: essas
+    são resolvidas com um UPDATE comparando o hash guardado com o md5() da
+    resposta no banco, sem trazer o texto nem refazer o MinHash. Só as
+    respostas novas ou editadas são lidas e calculadas.
+
+    Args:
+        atividade (Atividade): Atividade
+        limite (int): Se houver mais que isso para calcular, não calcula
+            nada e devolve None (fica para a tarefa indexar_similaridade)
+
+    Returns:
+        int | None: Quantidade de assinaturas (re)calculadas
+    """
+    agora = timezone.now()
+    AssinaturaSubmissao.objects.filter(
+        submissao__atividade=atividade,
+        calculada_em__lt=F('submissao__atualizado_em'),
+        hash_resposta=MD5('submissao__resposta'),
+    ).update(calculada_em=agora)
+
+    pendentes = _desatualizadas(atividade).values_list('id', 'resposta')
+    if limite is not None:
+        pendentes = list(pendentes[:limite + 1])
+        if len(pendentes) > limite:
+            return None
+
+    novas = []
+    for submissao_id, resposta in pendentes:
+        minhash, palavras = assinatura(resposta)
+        novas.append(AssinaturaSubmissao(
+            submissao_id=submissao_id,
+            minhash=minhash.tobytes(),
+            palavras=palavras,
+            calculada_em=agora,
+            hash_resposta=hashlib.md5(resposta.encode()).hexdigest(),
+        ))
+
+    if novas:
+        AssinaturaSubmissao.objects.bulk_create(
+            novas,
+            update_conflicts=True,
+            unique_fields=['submissao'],
+            update_fields=['minhash', 'palavras', 'calculada_em', 'hash_resposta'],
+        )
+    return len(novas)
+
+
+def _enfileirar_indexacao(atividade):
+    """Enfileira a indexação da atividade, se já não houver uma na fila"""
+    from core.tarefas import enfileirar
+
+    na_fila = Tarefa.objects.filter(
+        tipo='indexar_similaridade',
+        payload__atividade_id=atividade.pk,
+        status__in=[Tarefa.STATUS_PENDENTE, Tarefa.STATUS_EXECUTANDO],
+    ).exists()
+    if not na_fila:
+        enfileirar('indexar_similaridade', atividade_id=atividade.pk)
+
+
+def grupos_semelhantes(atividade):
+    """
+    Agrupa as respostas muito parecidas de uma atividade
+
+    Até INDEXACAO_NA_REQUISICAO respostas novas são calculadas na hora; com
+    mais que isso (turma inteira entregando, atividade restaurada) o cálculo
+    vai para a fila de tarefas e o relatório usa as assinaturas que já
+    existem até a tarefa terminar.
+
+    Args:
+        atividade (Atividade): Atividade
+
+    Returns:
+        list[dict]: Grupos com 'aluno_ids' e 'similaridade' (maior par do grupo, 0-1),
+        do mais parecido para o menos
+    """
+    if indexar_submissoes(atividade, limite=INDEXACAO_NA_REQUISICAO) is None:
+        _enfileirar_indexacao(atividade)
+
+    linhas = list(
+        AssinaturaSubmissao.objects.filter(
+            submissao__atividade=atividade,
+            palavras__gte=MIN_PALAVRAS
+        ).values_list('submissao__aluno_id', 'minhash')
+    )
+    if len(linhas) < 2:
+        return []
+
+    aluno_ids = [aluno_id for aluno_id, _ in linhas]
+    assinaturas = np.frombuffer(
+        b''.join(bytes(minhash) for _, minhash in linhas), dtype=np.uint32
+    ).reshape(len(linhas), NUM_PERMUTACOES)
+
+    # LSH: em cada faixa, respostas com a faixa idêntica caem no mesmo balde.
+    # Cada membro do balde é comparado só com o primeiro (custo linear).
+    faixas = np.ascontiguousarray(
+        assinaturas.reshape(len(linhas), NUM_FAIXAS, LINHAS_POR_FAIXA)
+    ).view(np.dtype((np.void, 4 * LINHAS_POR_FAIXA)))[:, :, 0]
+
+    indices = np.arange(len(linhas))
+    pares = []
+    for faixa in range(NUM_FAIXAS):
+        _, primeiros, baldes = np.unique(faixas[:, faixa], return_index=True, return_inverse=True)
+        representante = primeiros[baldes]
+        candidatos = representante != indices
+        pares.append(np.stack([representante[candidatos], indices[candidatos]], axis=1))
+
+    pares = np.unique(np.concatenate(pares), axis=0)
+    if not len(pares):
+        return []
+
+    # Similaridade estimada = fração de permutações com o mesmo mínimo
+    similaridades = (assinaturas[pares[:, 0]] == assinaturas[pares[:, 1]]).mean(axis=1)
+    suspeitos = similaridades >= LIMIAR_SIMILARIDADE
+
+    # Union-find sobre os pares suspeitos
+    pai = list(range(len(linhas)))
+
+    def raiz(i):
+        while pai[i] != i:
+            pai[i] = pai[pai[i]]
+            i = pai[i]
+        return i
+
+    pares_suspeitos = pares[suspeitos].tolist()
+    for a, b in pares_suspeitos:
+        ra, rb = raiz(a), raiz(b)
+        if ra != rb:
+            pai[rb] = ra
+
+    maior = {}
+    for (a, _), similaridade in zip(pares_suspeitos, similaridades[suspeitos].tolist()):
+        r = raiz(a)
+        maior[r] = max(maior.get(r, 0), similaridade)
+
+    grupos = {}
+    for i in range(len(linhas)):
+        grupos.setdefault(raiz(i), []).append(aluno_ids[i])
+
+    resultado = [
+        {'aluno_ids': membros, 'similaridade': maior[r]}
+        for r, membros in grupos.items()
+        if len(membros) > 1
+    ]
+    resultado.sort(key=lambda grupo: grupo['similaridade'], reverse=True)
+    return resultado
@@ -0,0 +1,102 @@
+# core/services/uso_ia.py
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+import logging
+
+from core.models import UsoIA, UsoIADiario
+
+logger = logging.getLogger(__name__)
+
+
+class OrcamentoIAExcedido(Exception):
+    """Professor atingiu o orçamento diário de tokens de IA"""
+
+
+def orcamento_diario(professor):
+    """
+    Retorna o orçamento diário de tokens do professor
+
+    Args:
+        professor (Professor): Professor
+
+    Returns:
+        int: Limite de tokens por dia (0 = sem limite)
+    """
+    if professor.orcamento_ia_diario is not None:
+        return professor.orcamento_ia_diario
+    return settings.IA_ORCAMENTO_DIARIO_TOKENS
+
+
+def verificar_orcamento(professor):
+    """
+    Bloqueia a chamada antes de ir ao serviço se o orçamento do dia acabou
+
+    Args:
+        professor (Professor): Professor que está usando a IA (ou None)
+
+    Raises:
+        OrcamentoIAExcedido: Se os tokens do dia já atingiram o limite
+    """
+    if professor is None:
+        return
+
+    limite = orcamento_diario(professor)
+    if not limite:
+        return
+
+    uso = UsoIADiario.objects.filter(
+        professor=professor,
+        data=timezone.localdate()
+    ).values_list('tokens_entrada', 'tokens_saida').first()
+
+    if uso and sum(uso) >= limite:
+        raise OrcamentoIAExcedido(
+            f'Limite diário de uso da IA atingido ({limite} tokens). Tente novamente amanhã.'
+        )
+
+
+def registrar_uso(professor, operacao, resultado, tokens_entrada=0, tokens_saida=0,
+                  latencia_ms=0, cache_hit=False):
+    """
+    Grava a chamada e acumula o consolidado diário do professor
+
+    Args:
+        professor (Professor): Professor (ou None para chamadas sem usuário)
+        operacao (str): Ex.: 'gerar_atividade', 'gerar_feedback'
+        resultado (str): UsoIA.RESULTADO_SUCESSO ou UsoIA.RESULTADO_ERRO
+        tokens_entrada (int): prompt_token_count
+        tokens_saida (int): candidates_token_count
+        latencia_ms (int): Tempo da chamada em milissegundos
+        cache_hit (bool): Se a resposta veio do cache
+    """
+    try:
+        UsoIA.objects.create(
+            professor=professor,
+            operacao=operacao,
+            resultado=resultado,
+            tokens_entrada=tokens_entrada,
+            tokens_saida=tokens_saida,
+            latencia_ms=latencia_ms,
+            cache_hit=cache_hit,
+        )
+
+        if professor is None:
+            return
+
+        diario, _ = UsoIADiario.objects.get_or_create(
+            professor=professor,
+            data=timezone.localdate()
+        )
+        # Incremento atômico no banco (várias chamadas simultâneas do mesmo professor)
+        UsoIADiario.objects.filter(pk=diario.pk).update(
+            chamadas=F('chamadas') + 1,
+            erros=F('erros') + (1 if resultado == UsoIA.RESULTADO_ERRO else 0),
+            cache_hits=F('cache_hits') + (1 if cache_hit else 0),
+            tokens_entrada=F('tokens_entrada') + tokens_entrada,
+            tokens_saida=F('tokens_saida') + tokens_saida,
+            latencia_total_ms=F('latencia_total_ms') + (0 if cache_hit else latencia_ms),
+        )
+    except Exception as e:
+        # A contabilização nunca deve derrubar a geração em si
+        logger.error(f"Erro ao registrar uso de IA: {str(e)}")
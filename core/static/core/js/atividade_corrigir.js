@@ -0,0 +1,150 @@
+// core/static/core/js/atividade_corrigir.js
+// Correção em sequência: a fila é buscada em blocos e o próximo bloco é
+// pedido enquanto ainda há submissões em mãos; as notas são enviadas em
+// segundo plano, sem esperar a resposta para mostrar a próxima
+const correcao = document.getElementById('correcao');
+const form = document.getElementById('form-correcao');
+
+const BLOCO = 5;
+const MINIMO_EM_MAOS = 2;
+
+let fila = [];
+let cursor = null;
+let fim = false;
+let buscando = null;
+let atual = null;
+let restantes = null;
+let corrigidas = 0;
+let pulados = 0;
+let enviando = 0;
+
+function buscar() {
+    if (buscando || fim) return buscando;
+    
+    const params = new URLSearchParams({ quantidade: BLOCO });
+    if (cursor) params.set('apos', cursor);
+    
+    buscando = fetch(`${correcao.dataset.filaUrl}?${params}`)
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) throw new Error(data.message);
+            fila.push(...data.submissoes);
+            cursor = data.cursor;
+            fim = data.fim;
+            if (data.pendentes !== undefined) restantes = data.pendentes;
+            atualizarContadores();
+        })
+        .catch(error => {
+            showToast('Erro ao carregar as submissões. Tente novamente.', 'error');
+            console.error('Erro:', error);
+        })
+        .finally(() => { buscando = null; });
+    return buscando;
+}
+
+function atualizarContadores() {
+    document.getElementById('contador-restantes').textContent = restantes ?? '—';
+    document.getElementById('contador-corrigidas').textContent = corrigidas;
+    document.getElementById('salvando').classList.toggle('hidden', enviando === 0);
+}
+
+function mostrarPainel(nome) {
+    for (const painel of ['submissao', 'carregando', 'fim']) {
+        document.getElementById(`painel-${painel}`).classList.toggle('hidden', painel !== nome);
+    }
+}
+
+async function proxima() {
+    if (!fila.length) {
+        mostrarPainel('carregando');
+        await buscar();
+    }
+    
+    atual = fila.shift() || null;
+    // Pré-carrega o próximo bloco enquanto o professor corrige esta
+    if (fila.length < MINIMO_EM_MAOS) buscar();
+    
+    if (!atual) {
+        document.getElementById('fim-pulados').textContent = pulados
+            ? `${pulados} submissão(ões) pulada(s) continuam sem nota.`
+            : 'Todas as submissões enviadas até agora foram corrigidas.';
+        mostrarPainel('fim');
+        return;
+    }
+    
+    document.getElementById('aluno-nome').textContent = atual.aluno;
+    document.getElementById('aluno-ra').textContent = atual.ra;
+    document.getElementById('enviado-em').textContent = atual.enviado_em;
+    document.getElementById('resposta').textContent = atual.resposta;
+    form.nota.value = '';
+    form.observacao.value = atual.observacao;
+    mostrarPainel('submissao');
+    form.nota.focus();
+}
+
+async function enviar(submissao, dados) {
+    enviando++;
+    atualizarContadores();
+    
+    try {
+        const response = await fetch(correcao.dataset.corrigirUrl.replace('/0/', `/${submissao.id}/`), {
+            method: 'POST',
+            headers: {
+                'X-CSRFToken': csrftoken
+            },
+            body: dados
+        });
+        const data = await response.json();
+        
+        if (!data.success) throw new Error(data.message);
+        corrigidas++;
+        if (restantes !== null) restantes--;
+    } catch (error) {
+        // Volta para o fim da fila em mãos para ser corrigida de novo
+        showToast('Uma correção não foi salva e voltou para a fila.', 'error');
+        console.error('Erro:', error);
+        fila.push(submissao);
+        if (!atual) proxima();
+    } finally {
+        enviando--;
+        atualizarContadores();
+    }
+}
+
+form.addEventListener('submit', (event) => {
+    event.preventDefault();
+    
+    const nota = parseFloat(form.nota.value);
+    if (isNaN(nota) || nota < 0 || nota > 10) {
+        showToast('A nota deve estar entre 0 e 10', 'error');
+        return;
+    }
+    
+    enviar(atual, new FormData(form));
+    proxima();
+});
+
+form.observacao.addEventListener('keydown', (event) => {
+    if (event.key === 'Enter' && event.ctrlKey) form.requestSubmit();
+});
+
+document.getElementById('botao-pular').addEventListener('click', () => {
+    pulados++;
+    proxima();
+});
+
+document.getElementById('botao-recomecar').addEventListener('click', () => {
+    // Sem cursor a fila volta para a primeira pendente (as puladas incluídas)
+    fila = [];
+    cursor = null;
+    fim = false;
+    pulados = 0;
+    restantes = null;
+    proxima();
+});
+
+window.addEventListener('beforeunload', (event) => {
+    if (enviando > 0) event.preventDefault();
+});
+
+proxima();
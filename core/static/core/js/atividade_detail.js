@@ -0,0 +1,92 @@
+// core/static/core/js/atividade_detail.js
+// Confirmação antes de enviar
+document.getElementById('form-envio').addEventListener('submit', function(e) {
+    const resposta = document.getElementById('resposta').value.trim();
+    
+    if (!resposta) {
+        e.preventDefault();
+        showToast('Por favor, escreva sua resposta antes de enviar', 'warning');
+        return;
+    }
+    
+    if (resposta.length < 50) {
+        const confirmar = confirm('Sua resposta parece muito curta. Tem certeza que deseja enviar assim?');
+        if (!confirmar) {
+            e.preventDefault();
+            return;
+        }
+    }
+    
+    const confirmacao = confirm('Você tem certeza que deseja enviar? Após o envio não será possível editar.');
+    if (!confirmacao) {
+        e.preventDefault();
+    }
+});
+
+// Rascunho salvo no servidor; o localStorage cobre a sessão expirada
+const textarea = document.getElementById('resposta');
+const statusRascunho = document.getElementById('status-rascunho');
+const formEnvio = document.getElementById('form-envio');
+const storageKey = 'rascunho_atividade_' + formEnvio.dataset.atividade;
+const urlRascunho = formEnvio.dataset.rascunhoUrl;
+let ultimoSalvo = textarea.value;
+let enviando = false;
+
+// Rascunho local só é usado se o servidor não tiver nenhum
+const rascunhoLocal = localStorage.getItem(storageKey);
+if (!textarea.value && rascunhoLocal) {
+    textarea.value = rascunhoLocal;
+    showToast('Rascunho recuperado!', 'info');
+}
+
+function dadosRascunho() {
+    const formData = new FormData();
+    formData.append('texto', textarea.value);
+    formData.append('csrfmiddlewaretoken', csrftoken);
+    return formData;
+}
+
+async function salvarRascunho() {
+    if (textarea.value === ultimoSalvo) return;
+    const texto = textarea.value;
+    try {
+        const response = await fetch(urlRascunho, {method: 'POST', body: dadosRascunho(), redirect: 'manual'});
+        if (!response.ok) throw new Error(response.status);
+        ultimoSalvo = texto;
+        localStorage.removeItem(storageKey);
+        statusRascunho.textContent = 'Rascunho salvo às ' + new Date().toLocaleTimeString().slice(0, 5);
+    } catch (error) {
+        // Sessão expirada ou sem conexão: guarda no navegador até o próximo login
+        localStorage.setItem(storageKey, texto);
+        statusRascunho.textContent = 'Rascunho guardado neste navegador';
+    }
+}
+
+// Salva alguns segundos depois que o aluno para de digitar
+let timeoutId;
+textarea.addEventListener('input', function() {
+    clearTimeout(timeoutId);
+    timeoutId = setTimeout(salvarRascunho, 3000);
+});
+
+// Ao sair da página, envia o que faltar sem esperar a resposta
+window.addEventListener('pagehide', function() {
+    if (textarea.value !== ultimoSalvo && !enviando) {
+        navigator.sendBeacon(urlRascunho, dadosRascunho());
+        localStorage.setItem(storageKey, textarea.value);
+    }
+});
+
+// Limpar rascunho após envio bem-sucedido
+document.getElementById('form-envio').addEventListener('submit', function(e) {
+    if (e.defaultPrevented) return;
+    enviando = true;
+    clearTimeout(timeoutId);
+    localStorage.removeItem(storageKey);
+});
+
+// Contador de caracteres (opcional)
+textarea.addEventListener('input', function() {
+    const count = this.value.length;
+    console.log(`Caracteres: ${count}`);
+});
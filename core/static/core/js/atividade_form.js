@@ -0,0 +1,69 @@
+// core/static/core/js/atividade_form.js
+async function gerarAtividadeIA() {
+    const tema = document.getElementById('ia-tema').value.trim();
+    const disciplina = document.getElementById('ia-disciplina').value;
+    const nivel = document.getElementById('ia-nivel').value;
+    const tipo = document.getElementById('ia-tipo').value;
+
+    // Validação
+    if (!tema) {
+        showToast('Por favor, informe o tema da atividade', 'error');
+        return;
+    }
+
+    // UI feedback
+    const btnGerar = document.getElementById('btn-gerar-ia');
+    const loading = document.getElementById('ia-loading');
+
+    btnGerar.disabled = true;
+    loading.classList.remove('hidden');
+
+    try {
+        const response = await fetch('/api/gerar-atividade/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrftoken
+            },
+            body: JSON.stringify({
+                tema: tema,
+                disciplina: disciplina,
+                nivel_dificuldade: nivel,
+                tipo_atividade: tipo
+            })
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            // Preencher campos do formulário
+            document.getElementById('id_titulo').value = data.titulo;
+            document.getElementById('id_descricao').value = data.descricao;
+
+            showToast('Atividade gerada com sucesso! Revise e ajuste se necessário.', 'success');
+
+            // Scroll suave para o formulário
+            document.getElementById('id_titulo').scrollIntoView({
+                behavior: 'smooth',
+                block: 'center'
+            });
+        } else {
+            showToast(data.message || 'Erro ao gerar atividade', 'error');
+        }
+
+    } catch (error) {
+        console.error('Erro:', error);
+        showToast('Erro ao conectar com o servidor', 'error');
+    } finally {
+        btnGerar.disabled = false;
+        loading.classList.add('hidden');
+    }
+}
+
+// Permitir Enter no campo tema
+document.getElementById('ia-tema')?.addEventListener('keypress', function(e) {
+    if (e.key === 'Enter') {
+        e.preventDefault();
+        gerarAtividadeIA();
+    }
+});
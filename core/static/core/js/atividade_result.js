@@ -0,0 +1,8 @@
+// core/static/core/js/atividade_result.js
+function toggleAtividade() {
+    const collapse = document.getElementById('collapse-atividade');
+    const icon = document.getElementById('icon-atividade');
+    
+    collapse.classList.toggle('hidden');
+    icon.classList.toggle('rotate-180');
+}
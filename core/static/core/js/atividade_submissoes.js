@@ -0,0 +1,143 @@
+// core/static/core/js/atividade_submissoes.js
+function toggleSubmissao(alunoId) {
+    const collapse = document.getElementById(`collapse-${alunoId}`);
+    const icon = document.getElementById(`icon-${alunoId}`);
+    
+    if (!collapse) return; // Não tem submissão
+    
+    collapse.classList.toggle('hidden');
+    icon.classList.toggle('rotate-180');
+    
+    // Resposta e observação só são buscadas na primeira abertura
+    if (!collapse.dataset.carregado) {
+        collapse.dataset.carregado = '1';
+        carregarSubmissao(collapse.dataset.submissao);
+    }
+}
+
+async function carregarSubmissao(submissaoId) {
+    const resposta = document.getElementById(`resposta-${submissaoId}`);
+    const form = document.getElementById(`form-${submissaoId}`);
+    
+    try {
+        const response = await fetch(`/professor/submissoes/${submissaoId}/`);
+        const data = await response.json();
+        
+        resposta.textContent = data.resposta;
+        form.querySelector('[name="observacao"]').value = data.observacao;
+        // Só libera o envio depois de carregar a observação atual
+        form.querySelector('[type="submit"]').disabled = false;
+    } catch (error) {
+        resposta.textContent = 'Erro ao carregar a resposta. Recarregue a página.';
+        console.error('Erro:', error);
+    }
+}
+
+async function corrigirSubmissao(event, submissaoId, alunoNome) {
+    event.preventDefault();
+    
+    const form = event.target;
+    const nota = form.querySelector('[name="nota"]').value;
+    const observacao = form.querySelector('[name="observacao"]').value;
+    
+    // Validação básica
+    if (nota && (parseFloat(nota) < 0 || parseFloat(nota) > 10)) {
+        showToast('A nota deve estar entre 0 e 10', 'error');
+        return;
+    }
+    
+    const formData = new FormData();
+    formData.append('nota', nota);
+    formData.append('observacao', observacao);
+    
+    try {
+        const response = await fetch(`/professor/submissoes/${submissaoId}/corrigir/`, {
+            method: 'POST',
+            headers: {
+                'X-CSRFToken': csrftoken
+            },
+            body: formData
+        });
+        
+        const data = await response.json();
+        
+        if (data.success) {
+            showToast(`Correção salva para ${alunoNome}!`, 'success');
+            // Não espera o próximo evento do feed para mostrar o badge e os contadores
+            atualizarAgora();
+        } else {
+            showToast(data.message, 'error');
+        }
+    } catch (error) {
+        showToast('Erro ao salvar correção. Tente novamente.', 'error');
+        console.error('Erro:', error);
+    }
+}
+
+// Feed ao vivo: recebe só as submissões novas/alteradas e os contadores.
+// Sem EventSource (ou se o navegador desistir de reconectar), a página
+// consulta a mesma view em JSON periodicamente
+const listaSubmissoes = document.getElementById('lista-submissoes');
+const INTERVALO_CONSULTA = 10000;
+let marcaFeed = listaSubmissoes.dataset.marca;
+let consultaPeriodica = null;
+
+function aplicarAlteracoes(data) {
+    if (!data.submissoes.length) return;
+    
+    document.getElementById('contador-total-submissoes').textContent = data.total_submissoes;
+    document.getElementById('contador-pendentes').textContent = data.submissoes_pendentes;
+    
+    for (const item of data.submissoes) {
+        const linha = document.getElementById(`aluno-${item.aluno_id}`);
+        if (!linha) continue;
+        
+        const modelo = document.createElement('template');
+        modelo.innerHTML = item.html.trim();
+        const novaLinha = modelo.content.firstElementChild;
+        const collapse = document.getElementById(`collapse-${item.aluno_id}`);
+        
+        if (collapse && !collapse.classList.contains('hidden')) {
+            // Aluno aberto (possivelmente em correção): troca só o badge
+            const badge = novaLinha.querySelector(`#badge-${item.aluno_id}`);
+            document.getElementById(`badge-${item.aluno_id}`).replaceWith(badge);
+            document.getElementById(`icon-${item.aluno_id}`).classList.add('rotate-180');
+        } else {
+            linha.replaceWith(novaLinha);
+        }
+    }
+}
+
+function aplicarEvento(event) {
+    marcaFeed = event.lastEventId || marcaFeed;
+    aplicarAlteracoes(JSON.parse(event.data));
+}
+
+async function atualizarAgora() {
+    const params = new URLSearchParams({ formato: 'json', desde: marcaFeed });
+    try {
+        const response = await fetch(`${listaSubmissoes.dataset.feedUrl}?${params}`);
+        const data = await response.json();
+        marcaFeed = data.marca;
+        aplicarAlteracoes(data);
+    } catch (error) {
+        console.error('Erro:', error);
+    }
+}
+
+function iniciarConsultaPeriodica() {
+    if (!consultaPeriodica) consultaPeriodica = setInterval(atualizarAgora, INTERVALO_CONSULTA);
+}
+
+if (window.EventSource) {
+    const feed = new EventSource(
+        `${listaSubmissoes.dataset.feedUrl}?${new URLSearchParams({ desde: marcaFeed })}`
+    );
+    feed.addEventListener('submissoes', aplicarEvento);
+    feed.addEventListener('error', () => {
+        // CLOSED: resposta inválida (erro, proxy); o navegador não tenta de novo
+        if (feed.readyState === EventSource.CLOSED) iniciarConsultaPeriodica();
+    });
+} else {
+    iniciarConsultaPeriodica();
+}
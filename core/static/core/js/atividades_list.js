@@ -0,0 +1,31 @@
+// core/static/core/js/atividades_list.js
+// Progresso das exclusões em segundo plano; recarrega quando todas terminam
+const exclusoes = document.getElementById('exclusoes');
+
+async function atualizarExclusoes() {
+    try {
+        const response = await fetch(exclusoes.dataset.url);
+        const data = await response.json();
+        
+        if (!data.exclusoes.length) {
+            location.reload();
+            return;
+        }
+        
+        for (const item of data.exclusoes) {
+            const linha = document.getElementById(`exclusao-${item.id}`);
+            if (!linha) continue;
+            linha.querySelector('.progresso-barra').style.width = `${item.progresso}%`;
+            linha.querySelector('.progresso-texto').textContent = item.erro
+                ? 'Erro na exclusão'
+                : `${item.progresso}%`;
+        }
+    } catch (error) {
+        console.error('Erro:', error);
+    }
+    setTimeout(atualizarExclusoes, 3000);
+}
+
+if (exclusoes) {
+    setTimeout(atualizarExclusoes, 3000);
+}
@@ -0,0 +1,5 @@
+// core/static/core/js/boletins.js
+// Enquanto há boletins sendo gerados, recarrega a página para mostrar o progresso
+if (document.querySelector('[data-gerando]')) {
+    setTimeout(() => location.reload(), 5000);
+}
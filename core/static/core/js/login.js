@@ -0,0 +1,28 @@
+// core/static/core/js/login.js
+function switchTab(type) {
+    const professorTab = document.getElementById('tab-professor');
+    const alunoTab = document.getElementById('tab-aluno');
+    const userTypeInput = document.getElementById('user_type');
+    const labelUsername = document.getElementById('label-username');
+    const usernameInput = document.getElementById('username');
+    
+    if (type === 'professor') {
+        professorTab.classList.add('border-blue-500', 'text-blue-600');
+        professorTab.classList.remove('border-transparent', 'text-gray-500');
+        alunoTab.classList.remove('border-blue-500', 'text-blue-600');
+        alunoTab.classList.add('border-transparent', 'text-gray-500');
+        
+        userTypeInput.value = 'professor';
+        labelUsername.textContent = 'Usuário';
+        usernameInput.placeholder = 'Digite seu usuário';
+    } else {
+        alunoTab.classList.add('border-blue-500', 'text-blue-600');
+        alunoTab.classList.remove('border-transparent', 'text-gray-500');
+        professorTab.classList.remove('border-blue-500', 'text-blue-600');
+        professorTab.classList.add('border-transparent', 'text-gray-500');
+        
+        userTypeInput.value = 'aluno';
+        labelUsername.textContent = 'RA (Registro Acadêmico)';
+        usernameInput.placeholder = 'Digite seu RA';
+    }
+}
@@ -0,0 +1,311 @@
+# core/tarefas.py
+"""
+Fila de tarefas em segundo plano
+
+As tarefas ficam na tabela core_tarefa e são executadas pelo comando
+processar_tarefas. Cada tipo de tarefa é uma função registrada com @tarefa.
+
+Usage:
+    @tarefa('minha_tarefa')
+    def minha_tarefa(atividade_id):
+        ...
+
+    enfileirar('minha_tarefa', atividade_id=1)
+"""
+import logging
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .consultas import descarregar, origem_consultas
+from .models import AssinaturaSubmissao, Atividade, Professor, Rascunho, Submissao, Tarefa, Turma
+from .services import boletins, similaridade
+
+logger = logging.getLogger(__name__)
+
+# Tentativas antes de marcar a tarefa como erro definitivo
+MAX_TENTATIVAS = 3
+
+# Submissões apagadas por transação na exclusão de atividades
+EXCLUSAO_LOTE = 1000
+
+_handlers = {}
+
+# Tarefa em execução, para registrar_progresso()
+_tarefa_atual = ContextVar('tarefa_atual', default=None)
+
+
+def tarefa(tipo):
+    """
+    Decorator que registra uma função como handler de um tipo de tarefa
+
+    Args:
+        tipo (str): Nome do tipo de tarefa
+    """
+    def decorator(func):
+        _handlers[tipo] = func
+        return func
+    return decorator
+
+
+def enfileirar(tipo, **payload):
+    """
+    Enfileira uma tarefa
+
+    Args:
+        tipo (str): Tipo registrado com @tarefa
+        **payload: Parâmetros passados ao handler (serializáveis em JSON)
+
+    Returns:
+        Tarefa: Tarefa criada
+    """
+    return Tarefa.objects.create(tipo=tipo, payload=payload)
+
+
+def enfileirar_em_lote(tipo, payloads):
+    """
+    Enfileira várias tarefas do mesmo tipo com um único INSERT
+
+    Args:
+        tipo (str): Tipo registrado com @tarefa
+        payloads (list[dict]): Parâmetros de cada tarefa
+
+    Returns:
+        list[Tarefa]: Tarefas criadas
+    """
+    return Tarefa.objects.bulk_create([
+        Tarefa(tipo=tipo, payload=payload) for payload in payloads
+    ])
+
+
+def registrar_progresso(percentual):
+    """
+    Atualiza o progresso da tarefa em execução (chamado pelos handlers)
+
+    Também renova a reserva: handlers longos devem chamá-la com frequência
+    menor que TAREFA_RESERVA_SEGUNDOS.
+
+    Args:
+        percentual (int): Progresso de 0 a 100
+    """
+    tarefa_id = _tarefa_atual.get()
+    if tarefa_id is not None:
+        Tarefa.objects.filter(pk=tarefa_id).update(
+            progresso=max(0, min(int(percentual), 100)), reservada_em=timezone.now()
+        )
+
+
+def recuperar_abandonadas():
+    """
+    Devolve à fila as tarefas com a reserva vencida
+
+    Um worker que morre (OOM, kill, deploy) deixa a tarefa em execução para
+    sempre. Passado TAREFA_RESERVA_SEGUNDOS sem renovação, ela volta a
+    pendente (e os handlers retomam de onde pararam) ou, se já usou todas as
+    tentativas, vira erro.
+
+    Returns:
+        int: Tarefas recuperadas
+    """
+    vencidas = Tarefa.objects.filter(
+        status=Tarefa.STATUS_EXECUTANDO,
+        reservada_em__lt=timezone.now() - timedelta(seconds=settings.TAREFA_RESERVA_SEGUNDOS),
+    )
+    erro = 'Worker interrompido durante a execução'
+    recuperadas = vencidas.filter(tentativas__lt=MAX_TENTATIVAS).update(
+        status=Tarefa.STATUS_PENDENTE, reservada_em=None, erro=erro, executar_apos=timezone.now()
+    )
+    recuperadas += vencidas.update(status=Tarefa.STATUS_ERRO, reservada_em=None, erro=erro)
+    if recuperadas:
+        logger.warning(f"{recuperadas} tarefas com a reserva vencida recuperadas")
+    return recuperadas
+
+
+def executar_pendentes(limite=10):
+    """
+    Reserva e executa até `limite` tarefas pendentes
+
+    A reserva usa SELECT ... FOR UPDATE SKIP LOCKED, então vários workers
+    podem rodar em paralelo sem executar a mesma tarefa duas vezes. A
+    tentativa é contada já na reserva: uma tarefa que derruba o worker toda
+    vez também chega a MAX_TENTATIVAS.
+
+    Args:
+        limite (int): Máximo de tarefas reservadas nesta rodada
+
+    Returns:
+        int: Quantidade de tarefas executadas
+    """
+    recuperar_abandonadas()
+
+    with transaction.atomic():
+        ids = list(
+            Tarefa.objects.select_for_update(skip_locked=True)
+            .filter(status=Tarefa.STATUS_PENDENTE, executar_apos__lte=timezone.now())
+            .order_by('executar_apos')
+            .values_list('id', flat=True)[:limite]
+        )
+        Tarefa.objects.filter(id__in=ids).update(
+            status=Tarefa.STATUS_EXECUTANDO, reservada_em=timezone.now(), tentativas=F('tentativas') + 1
+        )
+
+    for item in Tarefa.objects.filter(id__in=ids).order_by('executar_apos'):
+        _executar(item)
+
+    descarregar()
+    return len(ids)
+
+
+def _executar(item):
+    """Executa uma tarefa reservada e registra o resultado"""
+    handler = _handlers.get(item.tipo)
+    contexto = _tarefa_atual.set(item.pk)
+    origem = origem_consultas.set(f'tarefa:{item.tipo}')
+
+    try:
+        if handler is None:
+            raise LookupError(f"Tipo de tarefa desconhecido: {item.tipo}")
+        handler(**item.payload)
+    except Exception as e:
+        logger.error(f"Erro na tarefa {item}: {str(e)}")
+        item.erro = str(e)
+        if item.tentativas >= MAX_TENTATIVAS:
+            item.status = Tarefa.STATUS_ERRO
+        else:
+            # Nova tentativa com espera crescente
+            item.status = Tarefa.STATUS_PENDENTE
+            item.executar_apos = timezone.now() + timedelta(minutes=item.tentativas)
+    else:
+        item.status = Tarefa.STATUS_CONCLUIDA
+        item.concluida_em = timezone.now()
+        item.erro = ''
+        item.progresso = 100
+    finally:
+        _tarefa_atual.reset(contexto)
+        origem_consultas.reset(origem)
+
+    # progresso só é gravado na conclusão: durante a execução quem o atualiza é o handler
+    item.reservada_em = None
+    campos = ['status', 'erro', 'executar_apos', 'concluida_em', 'reservada_em']
+    if item.status == Tarefa.STATUS_CONCLUIDA:
+        campos.append('progresso')
+    item.save(update_fields=campos)
+
+
+# ============================================================================
+# HANDLERS
+# ============================================================================
+
+@tarefa('resumo_pendencias')
+def resumo_pendencias(atividade_id):
+    """
+    Envia ao professor o resumo de uma atividade cujo prazo encerrou
+
+    Args:
+        atividade_id (int): Atividade encerrada
+    """
+    atividade = (
+        Atividade.objects.select_related('professor')
+        .annotate(
+            total=Count('submissoes'),
+            pendentes=Count('submissoes', filter=Q(submissoes__nota__isnull=True)),
+        )
+        .filter(pk=atividade_id)
+        .first()
+    )
+    if atividade is None:
+        return
+
+    mensagem = (
+        f'O prazo da atividade "{atividade.titulo}" encerrou em '
+        f'{atividade.prazo_entrega:%d/%m/%Y}.\n\n'
+        f'Submissões recebidas: {atividade.total}\n'
+        f'Aguardando correção: {atividade.pendentes}\n'
+    )
+    logger.info(f"Resumo de pendências da atividade {atividade_id}: "
+                f"{atividade.total} enviadas, {atividade.pendentes} sem nota")
+
+    if atividade.professor.email:
+        send_mail(
+            subject=f'Prazo encerrado: {atividade.titulo}',
+            message=mensagem,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            recipient_list=[atividade.professor.email],
+        )
+
+
+@tarefa('excluir_atividade')
+def excluir_atividade(atividade_id):
+    """
+    Apaga uma atividade marcada como excluída e as suas submissões
+
+    As submissões saem em lotes de EXCLUSAO_LOTE, cada um em uma transação
+    curta com DELETE direto (sem o collector do ORM carregar as linhas), então
+    nenhum lock fica preso durante a exclusão inteira. Se a tarefa for
+    interrompida, a nova tentativa continua de onde parou.
+
+    Args:
+        atividade_id (int): Atividade com excluida_em preenchido
+    """
+    submissoes = Submissao.objects.filter(atividade_id=atividade_id).order_by()
+    total = submissoes.count()
+    removidas = 0
+
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            ids = list(submissoes.values_list('id', flat=True)[:EXCLUSAO_LOTE])
+            if not ids:
+                break
+            cursor.execute(
+                f"DELETE FROM {AssinaturaSubmissao._meta.db_table} WHERE submissao_id = ANY(%s)", [ids]
+            )
+            cursor.execute(f"DELETE FROM {Submissao._meta.db_table} WHERE id = ANY(%s)", [ids])
+
+        removidas += len(ids)
+        # 100% fica para o fim, depois que a própria atividade for apagada
+        registrar_progresso(min(removidas * 100 // max(total, removidas), 99))
+
+    Rascunho.objects.filter(atividade_id=atividade_id).delete()
+    Atividade.todas.filter(pk=atividade_id, excluida_em__isnull=False).delete()
+    logger.info(f"Atividade {atividade_id} excluída em segundo plano ({removidas} submissões)")
+
+
+@tarefa('gerar_boletins')
+def gerar_boletins(professor_id, lote, turma_id=None):
+    """
+    Gera os boletins de fim de período pedidos pela tela de boletins
+
+    Uma nova tentativa usa o mesmo lote e só renderiza os boletins que
+    faltaram.
+
+    Args:
+        professor_id (int): Professor que pediu
+        lote (str): Nome do lote (define a pasta e o .zip)
+        turma_id (int): Só esta turma (None = todas)
+    """
+    professor = Professor.objects.get(pk=professor_id)
+    turma = Turma.objects.get(pk=turma_id, professor=professor) if turma_id else None
+    boletins.gerar_boletins(professor, turma, lote=lote, progresso=registrar_progresso)
+
+
+@tarefa('indexar_similaridade')
+def indexar_similaridade(atividade_id):
+    """
+    Calcula as assinaturas MinHash pendentes de uma atividade
+
+    Enfileirada pelo relatório de respostas semelhantes quando há respostas
+    demais para calcular durante a requisição.
+
+    Args:
+        atividade_id (int): Atividade
+    """
+    atividade = Atividade.objects.filter(pk=atividade_id).first()
+    if atividade is None:
+        return
+    calculadas = similaridade.indexar_submissoes(atividade)
+    logger.info(f"Similaridade da atividade {atividade_id}: {calculadas} assinaturas calculadas")
@@ -1,3 +1,872 @@
-from django.test import TestCase
+import importlib
+import io
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import unittest
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Avg, F
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from prometheus_client import REGISTRY
+
+from .models import Professor, Aluno, Turma, Atividade, Submissao, Rascunho, Tarefa
+from .services import gemini_service
+from .services.estatisticas import estatisticas_atividade
+from .services.importacao_notas import (
+    STATUS_ALUNO_NAO_ENCONTRADO, STATUS_ATIVIDADE_NAO_ENCONTRADA, STATUS_ATUALIZADA, STATUS_DUPLICADA,
+    STATUS_EM_BRANCO, STATUS_INALTERADA, STATUS_NOTA_INVALIDA, STATUS_SEM_SUBMISSAO, importar_notas,
+)
+from .services.rascunhos import carregar_rascunho, promover_rascunho, salvar_rascunho
+from .services.similaridade import indexar_submissoes
+from .tarefas import (
+    MAX_TENTATIVAS, _handlers, _tarefa_atual, enfileirar, executar_pendentes,
+    recuperar_abandonadas, registrar_progresso, tarefa,
+)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'EXPLAIN (FORMAT JSON) requer PostgreSQL')
+class PlanoConsultasTests(TestCase):
+    """
+    Garante que as consultas mais frequentes continuam usando índices
+
+    Com enable_seqscan desligado o planner só escolhe Seq Scan quando não
+    existe nenhum índice utilizável, então o teste não depende do volume
+    exato de dados para detectar um índice removido ou uma consulta alterada.
+    """
+
+    TOTAL_ALUNOS = 300
+    TOTAL_ATIVIDADES = 40
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = Professor.objects.create_user(
+            username='prof', password='senha', nome='Professor'
+        )
+        outro = Professor.objects.create_user(
+            username='outro', password='senha', nome='Outro'
+        )
+
+        alunos = Aluno.objects.bulk_create([
+            Aluno(nome=f'Aluno {i:04d}', ra=f'RA{i:06d}', password='x', is_active=i % 10 != 0)
+            for i in range(cls.TOTAL_ALUNOS)
+        ])
+        turmas = {
+            professor: Turma.objects.create(nome='Turma', professor=professor)
+            for professor in (cls.professor, outro)
+        }
+        # Cada turma com metade dos alunos
+        Turma.alunos.through.objects.bulk_create([
+            Turma.alunos.through(turma=turmas[cls.professor if j % 2 else outro], aluno=aluno)
+            for j, aluno in enumerate(alunos)
+        ])
+        atividades = Atividade.objects.bulk_create([
+            Atividade(
+                professor=cls.professor if i % 2 else outro,
+                turma=turmas[cls.professor if i % 2 else outro],
+                titulo=f'Atividade {i}',
+                descricao='Descrição',
+                prazo_entrega=date.today() + timedelta(days=i - 20),
+            )
+            for i in range(cls.TOTAL_ATIVIDADES)
+        ])
+        Submissao.objects.bulk_create([
+            Submissao(
+                atividade=atividade,
+                aluno=aluno,
+                resposta='Resposta',
+                nota=(j % 11) if j % 3 else None,
+            )
+            for i, atividade in enumerate(atividades)
+            for j, aluno in enumerate(alunos)
+            if (i + j) % 4
+        ])
+
+        cls.aluno = alunos[1]
+        cls.atividade = atividades[1]
+
+        with connection.cursor() as cursor:
+            for model in (Aluno, Turma.alunos.through, Atividade, Submissao):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def _nos_do_plano(self, plano):
+        """Percorre recursivamente os nós do plano JSON"""
+        yield plano
+        for filho in plano.get('Plans', []):
+            yield from self._nos_do_plano(filho)
+
+    def assertSemSeqScan(self, queryset):
+        plano = json.loads(queryset.explain(format='json'))[0]['Plan']
+        seq_scans = [
+            no['Relation Name']
+            for no in self._nos_do_plano(plano)
+            if no['Node Type'] == 'Seq Scan'
+        ]
+        self.assertEqual(seq_scans, [], f'Seq Scan em {seq_scans}:\n{queryset.query}')
+
+    def test_submissoes_pendentes_da_atividade(self):
+        self.assertSemSeqScan(
+            Submissao.objects.filter(atividade=self.atividade, nota__isnull=True)
+        )
+
+    def test_submissao_do_aluno_na_atividade(self):
+        self.assertSemSeqScan(
+            Submissao.objects.filter(atividade=self.atividade, aluno=self.aluno)[:1]
+        )
+
+    def test_roster_de_submissoes(self):
+        self.assertSemSeqScan(
+            self.atividade.submissoes.select_related('aluno').order_by('aluno__nome')
+        )
+
+    def test_media_notas_do_aluno(self):
+        self.assertSemSeqScan(
+            Submissao.objects.filter(aluno=self.aluno, nota__isnull=False)
+            .values('aluno').annotate(media=Avg('nota'))
+        )
+
+    def test_atividades_do_professor(self):
+        self.assertSemSeqScan(
+            Atividade.objects.filter(professor=self.professor).order_by('-created_at')
+        )
+
+    def test_atividades_recentes(self):
+        self.assertSemSeqScan(Atividade.objects.order_by('-created_at')[:20])
+
+    def test_alunos_ativos_por_nome(self):
+        self.assertSemSeqScan(Aluno.objects.filter(is_active=True).order_by('nome'))
+
+    def test_login_do_aluno(self):
+        self.assertSemSeqScan(Aluno.objects.filter(ra='RA000001', is_active=True))
+
+    def test_atividades_da_turma_do_aluno(self):
+        self.assertSemSeqScan(
+            Atividade.objects.filter(turma__alunos=self.aluno).order_by('-created_at')
+        )
+
+    def test_alunos_da_turma(self):
+        self.assertSemSeqScan(
+            self.atividade.turma.alunos.filter(is_active=True).order_by('nome')
+        )
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Concorrência real requer PostgreSQL')
+class EnvioConcorrenteTests(TransactionTestCase):
+    """
+    Envios simultâneos da mesma atividade (clique duplo, reenvio do
+    navegador, segunda aba) gravam uma única submissão e nenhum dá erro
+    """
+
+    TOTAL_ENVIOS = 16
+
+    def setUp(self):
+        professor = Professor.objects.create_user(
+            username='prof', password='senha', nome='Professor'
+        )
+        self.aluno = Aluno.objects.create(nome='Aluno', ra='RA0001', password='x')
+        turma = Turma.objects.create(nome='Turma', professor=professor)
+        turma.alunos.add(self.aluno)
+        self.atividade = Atividade.objects.create(
+            professor=professor,
+            turma=turma,
+            titulo='Atividade',
+            descricao='Descrição',
+            prazo_entrega=date.today() + timedelta(days=7),
+        )
+
+        cliente = Client()
+        sessao = cliente.session
+        sessao['aluno_id'] = self.aluno.pk
+        sessao.save()
+        self.cookie = cliente.cookies
+
+    def test_envios_simultaneos_gravam_uma_submissao(self):
+        url = reverse('atividade_detail', args=[self.atividade.pk])
+        # Metade repete o mesmo token (clique duplo); o resto simula outras abas
+        token_repetido = str(uuid.uuid4())
+        tokens = [
+            token_repetido if i % 2 else str(uuid.uuid4())
+            for i in range(self.TOTAL_ENVIOS)
+        ]
+        largada = threading.Barrier(self.TOTAL_ENVIOS)
+        respostas, erros = [None] * self.TOTAL_ENVIOS, []
+
+        def enviar(indice, token):
+            cliente = Client(raise_request_exception=True)
+            cliente.cookies = self.cookie
+            try:
+                largada.wait()
+                respostas[indice] = cliente.post(url, {'resposta': f'Resposta {indice}', 'token_envio': token})
+            except Exception as e:
+                erros.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=enviar, args=item) for item in enumerate(tokens)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(erros, [])
+        self.assertEqual({resposta.status_code for resposta in respostas}, {302})
+        self.assertEqual(
+            Submissao.objects.filter(atividade=self.atividade, aluno=self.aluno).count(), 1
+        )
+
+        # Quem enviou com o token gravado volta para a lista; os demais, para o resultado
+        gravado = str(Submissao.objects.get(atividade=self.atividade).token_envio)
+        resultado = reverse('atividade_resultado', args=[self.atividade.pk])
+        for token, resposta in zip(tokens, respostas):
+            esperado = reverse('aluno_atividades') if token == gravado else resultado
+            self.assertEqual(resposta.url, esperado)
+
+    def test_primeiro_envio_sem_token_valido(self):
+        url = reverse('atividade_detail', args=[self.atividade.pk])
+        cliente = Client()
+        cliente.cookies = self.cookie
+
+        # Formulário antigo em cache ou token corrompido: o envio ainda é o primeiro
+        primeira = cliente.post(url, {'resposta': 'Resposta', 'token_envio': 'invalido'})
+        self.assertEqual(primeira.url, reverse('aluno_atividades'))
+        self.assertIsNone(Submissao.objects.get(atividade=self.atividade).token_envio)
+
+        segunda = cliente.post(url, {'resposta': 'Outra resposta'})
+        self.assertEqual(segunda.url, reverse('atividade_resultado', args=[self.atividade.pk]))
+        self.assertEqual(Submissao.objects.get(atividade=self.atividade).resposta, 'Resposta')
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'O arquivamento usa COPY do PostgreSQL')
+class RestauracaoArquivoTests(TestCase):
+    """
+    Arquivos gerados antes de novas colunas (status, turma, atualizado_em)
+    continuam restauráveis
+    """
+
+    # Cabeçalhos das tabelas como eram antes das migrações 0003 em diante
+    ATIVIDADES = (
+        'id,professor_id,titulo,descricao,prazo_entrega,created_at,updated_at\n'
+        '9001,{professor},Antiga,Descrição,2024-06-10,2024-06-01 10:00:00+00,2024-06-01 10:00:00+00\n'
+    )
+    SUBMISSOES = (
+        'id,atividade_id,aluno_id,resposta,nota,observacao,enviado_em,corrigido_em\n'
+        '9101,9001,{aluno},Corrigida,8.50,Bom,2024-06-05 12:00:00+00,2024-06-08 09:00:00+00\n'
+        '9102,9001,{outro_aluno},Pendente,,,2024-06-06 12:00:00+00,\n'
+    )
+
+    def setUp(self):
+        self.professor = Professor.objects.create_user(username='prof', password='senha', nome='Professor')
+        self.turma = Turma.objects.create(nome='Turma padrão', professor=self.professor)
+        self.alunos = [
+            Aluno.objects.create(nome=f'Aluno {i}', ra=f'RA{i}', password='x') for i in range(2)
+        ]
+
+        pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pasta)
+        self.caminho = os.path.join(pasta, 'periodo_ate_2024-06-30.tar.gz')
+        conteudos = {
+            f'{Atividade._meta.db_table}.csv': self.ATIVIDADES.format(professor=self.professor.pk),
+            f'{Submissao._meta.db_table}.csv': self.SUBMISSOES.format(
+                aluno=self.alunos[0].pk, outro_aluno=self.alunos[1].pk
+            ),
+        }
+        with tarfile.open(self.caminho, 'w:gz') as tar:
+            for nome, conteudo in conteudos.items():
+                dados = conteudo.encode()
+                info = tarfile.TarInfo(nome)
+                info.size = len(dados)
+                tar.addfile(info, io.BytesIO(dados))
+
+    def test_colunas_novas_sao_preenchidas(self):
+        call_command('arquivar_periodo', restaurar=self.caminho, stdout=io.StringIO())
+
+        atividade = Atividade.objects.get(pk=9001)
+        self.assertEqual(atividade.turma, self.turma)
+        self.assertEqual(atividade.status, Atividade.STATUS_ABERTA)
+        self.assertIsNone(atividade.excluida_em)
+
+        corrigida, pendente = Submissao.objects.filter(atividade=atividade).order_by('pk')
+        self.assertEqual(corrigida.atualizado_em, corrigida.corrigido_em)
+        self.assertEqual(pendente.atualizado_em, pendente.enviado_em)
+        self.assertIsNone(pendente.token_envio)
+
+    def test_restaurar_de_novo_ignora_linhas_existentes(self):
+        call_command('arquivar_periodo', restaurar=self.caminho, stdout=io.StringIO())
+        Submissao.objects.filter(pk=9102).delete()
+
+        saida = io.StringIO()
+        call_command('arquivar_periodo', restaurar=self.caminho, stdout=saida)
+
+        self.assertIn(f'{Submissao._meta.db_table}: 1 linhas restauradas.', saida.getvalue())
+        self.assertEqual(Submissao.objects.filter(atividade_id=9001).count(), 2)
+
+
+class TarefaInterrompidaTests(TestCase):
+    """
+    Uma tarefa cujo worker morreu no meio da execução volta para a fila
+    quando a reserva vence, em vez de ficar em execução para sempre
+    """
+
+    def setUp(self):
+        self.chamadas = []
+        self.interromper = False
+        tarefa('teste_interrompida')(self._handler)
+        self.addCleanup(_handlers.pop, 'teste_interrompida')
+        self.tarefa = enfileirar('teste_interrompida', etapa=1)
+
+    def _handler(self, etapa):
+        self.chamadas.append(etapa)
+        registrar_progresso(50)
+        if self.interromper:
+            # O que acontece com o SIGTERM do deploy: SystemExit no meio do handler
+            raise SystemExit(1)
+
+    def _rodar_worker_interrompido(self):
+        self.interromper = True
+        with self.assertRaises(SystemExit):
+            executar_pendentes()
+        self.interromper = False
+
+    def _vencer_reserva(self):
+        Tarefa.objects.filter(pk=self.tarefa.pk).update(
+            reservada_em=F('reservada_em') - timedelta(seconds=settings.TAREFA_RESERVA_SEGUNDOS + 1)
+        )
+
+    def test_reserva_vencida_volta_para_a_fila(self):
+        self._rodar_worker_interrompido()
+        self.tarefa.refresh_from_db()
+        self.assertEqual(self.tarefa.status, Tarefa.STATUS_EXECUTANDO)
+        self.assertIsNotNone(self.tarefa.reservada_em)
+
+        # Enquanto a reserva vale, outro worker não pega a tarefa
+        self.assertEqual(executar_pendentes(), 0)
+        self.assertEqual(self.chamadas, [1])
+
+        self._vencer_reserva()
+        self.assertEqual(executar_pendentes(), 1)
+
+        self.tarefa.refresh_from_db()
+        self.assertEqual(self.tarefa.status, Tarefa.STATUS_CONCLUIDA)
+        self.assertEqual(self.tarefa.tentativas, 2)
+        self.assertIsNone(self.tarefa.reservada_em)
+        self.assertEqual(self.chamadas, [1, 1])
+
+    def test_worker_morto_em_todas_as_tentativas_vira_erro(self):
+        for _ in range(MAX_TENTATIVAS):
+            self._rodar_worker_interrompido()
+            self._vencer_reserva()
+
+        self.assertEqual(executar_pendentes(), 0)
+        self.tarefa.refresh_from_db()
+        self.assertEqual(self.tarefa.status, Tarefa.STATUS_ERRO)
+        self.assertEqual(self.tarefa.tentativas, MAX_TENTATIVAS)
+        self.assertEqual(len(self.chamadas), MAX_TENTATIVAS)
+
+    def test_progresso_renova_a_reserva(self):
+        self._rodar_worker_interrompido()
+        self._vencer_reserva()
+
+        # Um handler longo, mas vivo, que informa o progresso mantém a reserva
+        contexto = _tarefa_atual.set(self.tarefa.pk)
+        try:
+            registrar_progresso(60)
+        finally:
+            _tarefa_atual.reset(contexto)
+
+        self.assertEqual(recuperar_abandonadas(), 0)
+        self.tarefa.refresh_from_db()
+        self.assertEqual(self.tarefa.status, Tarefa.STATUS_EXECUTANDO)
+        self.assertEqual(self.tarefa.progresso, 60)
+
+
+class RascunhoTests(TestCase):
+    """
+    Salvamentos repetidos do rascunho não regravam a linha, mesmo sem o
+    atalho do cache, e o rascunho some depois do envio e da limpeza
+    """
+
+    def setUp(self):
+        professor = Professor.objects.create_user(
+            username='prof', password='senha', nome='Professor'
+        )
+        self.aluno = Aluno.objects.create(nome='Aluno', ra='RA0001', password='x')
+        self.turma = Turma.objects.create(nome='Turma', professor=professor)
+        self.turma.alunos.add(self.aluno)
+        self.atividade = Atividade.objects.create(
+            professor=professor,
+            turma=self.turma,
+            titulo='Atividade',
+            descricao='Descrição',
+            prazo_entrega=date.today() + timedelta(days=7),
+        )
+        cache.clear()
+
+    def _rascunho(self):
+        return Rascunho.objects.get(aluno=self.aluno, atividade=self.atividade)
+
+    def test_texto_repetido_nao_regrava_sem_cache(self):
+        self.assertTrue(salvar_rascunho(self.aluno.pk, self.atividade.pk, 'Primeira versão'))
+        gravado_em = self._rascunho().atualizado_em
+
+        # Outro processo, ou a chave expirada: só o upsert decide
+        cache.clear()
+        self.assertFalse(salvar_rascunho(self.aluno.pk, self.atividade.pk, 'Primeira versão'))
+        self.assertEqual(self._rascunho().atualizado_em, gravado_em)
+
+        # Com a chave no cache nem o upsert é feito
+        with self.assertNumQueries(0):
+            self.assertFalse(salvar_rascunho(self.aluno.pk, self.atividade.pk, 'Primeira versão'))
+
+        self.assertTrue(salvar_rascunho(self.aluno.pk, self.atividade.pk, 'Segunda versão'))
+        rascunho = self._rascunho()
+        self.assertEqual(rascunho.texto, 'Segunda versão')
+        self.assertGreater(rascunho.atualizado_em, gravado_em)
+        self.assertEqual(carregar_rascunho(self.aluno.pk, self.atividade.pk), 'Segunda versão')
+
+    def test_promover_descarta_rascunho_e_chave(self):
+        salvar_rascunho(self.aluno.pk, self.atividade.pk, 'Resposta')
+        promover_rascunho(self.aluno.pk, self.atividade.pk)
+
+        self.assertFalse(Rascunho.objects.filter(aluno=self.aluno).exists())
+        self.assertEqual(carregar_rascunho(self.aluno.pk, self.atividade.pk), '')
+        # Sem a chave antiga, o mesmo texto volta a ser gravado
+        self.assertTrue(salvar_rascunho(self.aluno.pk, self.atividade.pk, 'Resposta'))
+
+    def test_limpar_rascunhos_abandonados(self):
+        outros = {
+            nome: Aluno.objects.create(nome=nome, ra=f'RA-{nome}', password='x')
+            for nome in ('antigo', 'enviado', 'encerrada')
+        }
+        self.turma.alunos.add(*outros.values())
+        encerrada = Atividade.objects.create(
+            professor=self.atividade.professor,
+            turma=self.turma,
+            titulo='Encerrada',
+            descricao='Descrição',
+            prazo_entrega=date.today() - timedelta(days=1),
+            status=Atividade.STATUS_ENCERRADA,
+        )
+
+        salvar_rascunho(self.aluno.pk, self.atividade.pk, 'Em andamento')
+        salvar_rascunho(outros['antigo'].pk, self.atividade.pk, 'Esquecido')
+        salvar_rascunho(outros['enviado'].pk, self.atividade.pk, 'Enviado')
+        salvar_rascunho(outros['encerrada'].pk, encerrada.pk, 'Sem prazo')
+        Rascunho.objects.filter(aluno=outros['antigo']).update(
+            atualizado_em=timezone.now() - timedelta(days=settings.RASCUNHO_RETENCAO_DIAS + 1)
+        )
+        Submissao.objects.create(atividade=self.atividade, aluno=outros['enviado'], resposta='Enviado')
+
+        saida = io.StringIO()
+        call_command('limpar_rascunhos', lote=1, stdout=saida)
+
+        self.assertIn('3 rascunhos removidos', saida.getvalue())
+        self.assertEqual(list(Rascunho.objects.values_list('aluno_id', flat=True)), [self.aluno.pk])
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'A importação de notas usa COPY do PostgreSQL')
+class ImportacaoNotasTests(TestCase):
+    """
+    Cada situação do relatório da importação de notas, e a importação
+    gravando como uma correção manual
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = Professor.objects.create_user(
+            username='prof', password='senha', nome='Professor'
+        )
+        outro = Professor.objects.create_user(
+            username='outro', password='senha', nome='Outro'
+        )
+        cls.alunos = {
+            ra: Aluno.objects.create(nome=f'Aluno {ra}', ra=ra, password='x')
+            for ra in ('RA1', 'RA2', 'RA3', 'RA4', 'RA5', 'RA6')
+        }
+        turma = Turma.objects.create(nome='Turma', professor=cls.professor)
+        turma.alunos.add(*cls.alunos.values())
+        cls.atividade = Atividade.objects.create(
+            professor=cls.professor, turma=turma, titulo='Atividade',
+            descricao='Descrição', prazo_entrega=date.today() + timedelta(days=7),
+        )
+        cls.alheia = Atividade.objects.create(
+            professor=outro, turma=Turma.objects.create(nome='Outra', professor=outro),
+            titulo='Alheia', descricao='Descrição', prazo_entrega=date.today() + timedelta(days=7),
+        )
+        # RA5 não enviou; RA2 já tem a nota que vem na planilha
+        for ra in ('RA1', 'RA2', 'RA3', 'RA4', 'RA6'):
+            Submissao.objects.create(
+                atividade=cls.atividade, aluno=cls.alunos[ra], resposta=f'Resposta de {ra}',
+                nota=7 if ra == 'RA2' else None,
+            )
+
+    def _arquivo(self, texto, codificacao='utf-8'):
+        return SimpleUploadedFile('notas.csv', texto.encode(codificacao), content_type='text/csv')
+
+    def _importar(self, texto, codificacao='utf-8', aplicar=True):
+        return importar_notas(self.professor, self._arquivo(texto, codificacao), aplicar=aplicar)
+
+    def _submissao(self, ra):
+        return Submissao.objects.get(atividade=self.atividade, aluno=self.alunos[ra])
+
+    def _planilha(self):
+        at, alheia = self.atividade.pk, self.alheia.pk
+        return (
+            'ra,atividade,nota,observacao\n'
+            f'RA1,{at},8.5,Bom trabalho\n'
+            f'RA2,{at},7,\n'
+            f'RA3,{at},,\n'
+            f'RA4,{at},dez,\n'
+            f'RA999,{at},5,\n'
+            f'RA1,{alheia},5,\n'
+            f'RA1,abc,5,\n'
+            f'RA5,{at},6,\n'
+            f'RA6,{at},5,\n'
+            f'RA6,{at},6,Corrigida na segunda linha\n'
+        )
+
+    def test_situacao_de_cada_linha(self):
+        resultado = self._importar(self._planilha())
+
+        self.assertEqual(
+            [(linha['linha'], linha['status']) for linha in resultado['linhas']],
+            [
+                (2, STATUS_ATUALIZADA),
+                (3, STATUS_INALTERADA),
+                (4, STATUS_EM_BRANCO),
+                (5, STATUS_NOTA_INVALIDA),
+                (6, STATUS_ALUNO_NAO_ENCONTRADO),
+                (7, STATUS_ATIVIDADE_NAO_ENCONTRADA),
+                (8, STATUS_ATIVIDADE_NAO_ENCONTRADA),
+                (9, STATUS_SEM_SUBMISSAO),
+                (10, STATUS_DUPLICADA),
+                (11, STATUS_ATUALIZADA),
+            ]
+        )
+        self.assertEqual(resultado['resumo'][STATUS_ATUALIZADA], 2)
+
+        ra1 = self._submissao('RA1')
+        self.assertEqual(ra1.nota, Decimal('8.50'))
+        self.assertEqual(ra1.observacao, 'Bom trabalho')
+        self.assertIsNotNone(ra1.corrigido_em)
+
+        # A última linha repetida vale
+        ra6 = self._submissao('RA6')
+        self.assertEqual(ra6.nota, Decimal('6.00'))
+        self.assertEqual(ra6.observacao, 'Corrigida na segunda linha')
+
+        for ra in ('RA3', 'RA4'):
+            self.assertIsNone(self._submissao(ra).nota)
+        self.assertFalse(Submissao.objects.filter(aluno=self.alunos['RA5']).exists())
+        self.assertFalse(Submissao.objects.filter(atividade=self.alheia).exists())
+
+    def test_linha_invalida_depois_da_nota_nao_a_descarta(self):
+        at = self.atividade.pk
+        resultado = self._importar(
+            'ra,atividade,nota\n'
+            f'RA1,{at},8\n'
+            f'RA1,{at},\n'
+            f'RA4,{at},6\n'
+            f'RA4,{at},onze\n'
+            f'RA4,{at},7\n'
+            f'RA4,{at},12\n'
+        )
+
+        self.assertEqual(
+            [linha['status'] for linha in resultado['linhas']],
+            [
+                STATUS_ATUALIZADA, STATUS_EM_BRANCO,
+                STATUS_DUPLICADA, STATUS_NOTA_INVALIDA, STATUS_ATUALIZADA, STATUS_NOTA_INVALIDA,
+            ]
+        )
+        self.assertEqual(self._submissao('RA1').nota, Decimal('8.00'))
+        self.assertEqual(self._submissao('RA4').nota, Decimal('7.00'))
+
+    def test_planilha_do_excel_em_cp1252_com_ponto_e_virgula(self):
+        texto = (
+            'RA;Atividade;Nota;Observação\n'
+            f'RA1;{self.atividade.pk};9,5;Ótima resposta, parabéns\n'
+        )
+        resultado = self._importar(texto, codificacao='cp1252')
+
+        self.assertEqual([linha['status'] for linha in resultado['linhas']], [STATUS_ATUALIZADA])
+        ra1 = self._submissao('RA1')
+        self.assertEqual(ra1.nota, Decimal('9.50'))
+        self.assertEqual(ra1.observacao, 'Ótima resposta, parabéns')
+
+    def test_somente_conferir_nao_grava(self):
+        antes = list(Submissao.objects.order_by('pk').values_list('nota', 'observacao', 'atualizado_em'))
+
+        resultado = self._importar(self._planilha(), aplicar=False)
+
+        self.assertEqual(resultado['resumo'][STATUS_ATUALIZADA], 2)
+        self.assertEqual(
+            list(Submissao.objects.order_by('pk').values_list('nota', 'observacao', 'atualizado_em')),
+            antes
+        )
+
+    def test_importacao_grava_como_correcao_manual(self):
+        indexar_submissoes(self.atividade)
+        antes = estatisticas_atividade(self.atividade)
+        corrigida_antes = self._submissao('RA2').atualizado_em
+
+        self._importar(f'ra,atividade,nota\nRA1,{self.atividade.pk},10\n')
+
+        ra1 = self._submissao('RA1')
+        self.assertGreater(ra1.atualizado_em, corrigida_antes)
+        # A chave do cache das estatísticas muda como numa correção manual
+        depois = estatisticas_atividade(self.atividade)
+        self.assertEqual(depois['corrigidas'], antes['corrigidas'] + 1)
+        # A resposta não mudou: nenhuma assinatura é recalculada
+        self.assertEqual(indexar_submissoes(self.atividade), 0)
+        self.assertGreaterEqual(ra1.assinatura.calculada_em, ra1.atualizado_em)
+
+
+class RespostaCondicionalTests(TestCase):
+    """
+    As páginas do aluno respondem 304 enquanto nada do que exibem mudou, e
+    voltam a ser renderizadas quando muda
+    """
+
+    def setUp(self):
+        self.professor = Professor.objects.create_user(
+            username='prof', password='senha', nome='Professor'
+        )
+        self.aluno = Aluno.objects.create(nome='Aluno', ra='RA0001', password='x')
+        turma = Turma.objects.create(nome='Turma', professor=self.professor)
+        turma.alunos.add(self.aluno)
+        self.atividade, self.enviada = [
+            Atividade.objects.create(
+                professor=self.professor, turma=turma, titulo=titulo,
+                descricao='Descrição', prazo_entrega=date.today() + timedelta(days=7),
+            )
+            for titulo in ('Aberta', 'Enviada')
+        ]
+        self.submissao = Submissao.objects.create(
+            atividade=self.enviada, aluno=self.aluno, resposta='Resposta'
+        )
+
+        sessao = self.client.session
+        sessao['aluno_id'] = self.aluno.pk
+        sessao.save()
+
+    def _etag(self, url):
+        """ETag atual da página, depois que o cookie CSRF já foi emitido"""
+        self.client.get(url)
+        resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        return resposta['ETag']
+
+    def _revalidar(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_pagina_inalterada_responde_304(self):
+        url = reverse('aluno_atividades')
+        etag = self._etag(url)
+
+        resposta = self._revalidar(url, etag)
+        self.assertEqual(resposta.status_code, 304)
+        self.assertEqual(resposta['ETag'], etag)
+        self.assertEqual(resposta.content, b'')
+
+    def test_correcao_da_nota_renderiza_de_novo(self):
+        url = reverse('atividade_resultado', args=[self.enviada.pk])
+        etag = self._etag(url)
+
+        professor = Client()
+        professor.force_login(self.professor)
+        professor.post(reverse('submissao_corrigir', args=[self.submissao.pk]), {'nota': '9'})
+
+        resposta = self._revalidar(url, etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.context['submissao'].nota, Decimal('9.00'))
+
+    def test_rascunho_salvo_renderiza_de_novo(self):
+        url = reverse('atividade_detail', args=[self.atividade.pk])
+        etag = self._etag(url)
+        self.assertEqual(self._revalidar(url, etag).status_code, 304)
+
+        self.client.post(reverse('rascunho_salvar', args=[self.atividade.pk]), {'texto': 'Começo da resposta'})
+
+        resposta = self._revalidar(url, etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertContains(resposta, 'Começo da resposta')
+
+    def test_novo_dia_renderiza_de_novo(self):
+        url = reverse('aluno_atividades')
+        etag = self._etag(url)
+
+        # Prazos relativos ("faltam 2 dias") mudam na virada do dia
+        amanha = timezone.localdate() + timedelta(days=1)
+        with mock.patch('core.decorators.timezone.localdate', return_value=amanha):
+            resposta = self._revalidar(url, etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta['ETag'], etag)
+
+    def test_mensagem_pendente_renderiza_de_novo(self):
+        url = reverse('atividade_resultado', args=[self.enviada.pk])
+        etag = self._etag(url)
+
+        # Reenvio de uma atividade já enviada: redireciona com uma mensagem
+        self.client.post(reverse('atividade_detail', args=[self.enviada.pk]), {'resposta': 'De novo'})
+
+        resposta = self._revalidar(url, etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertContains(resposta, 'Você já havia enviado esta atividade.')
+        # Depois de exibida, a página volta a ser revalidada
+        self.assertEqual(self._revalidar(url, etag).status_code, 304)
+
+
+class FilaCorrecaoTests(TestCase):
+    """
+    A fila de correção pagina pelo cursor sem repetir nem perder
+    submissões, mesmo com envios no mesmo instante
+    """
+
+    TOTAL_PENDENTES = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = Professor.objects.create_user(
+            username='prof', password='senha', nome='Professor'
+        )
+        cls.outro = Professor.objects.create_user(
+            username='outro', password='senha', nome='Outro'
+        )
+        turma = Turma.objects.create(nome='Turma', professor=cls.professor)
+        cls.atividade = Atividade.objects.create(
+            professor=cls.professor, turma=turma, titulo='Atividade',
+            descricao='Descrição', prazo_entrega=date.today() + timedelta(days=7),
+        )
+        alunos = Aluno.objects.bulk_create([
+            Aluno(nome=f'Aluno {i}', ra=f'RA{i:04d}', password='x')
+            for i in range(cls.TOTAL_PENDENTES + 1)
+        ])
+        turma.alunos.add(*alunos)
+        submissoes = [
+            Submissao.objects.create(atividade=cls.atividade, aluno=aluno, resposta='Resposta')
+            for aluno in alunos
+        ]
+        # Turma inteira enviando no mesmo segundo: só o id desempata
+        Submissao.objects.filter(atividade=cls.atividade).update(
+            enviado_em=timezone.now().replace(microsecond=0)
+        )
+        corrigida = submissoes[3]
+        corrigida.nota = 8
+        corrigida.save()
+        cls.pendentes = [submissao.pk for submissao in submissoes if submissao.pk != corrigida.pk]
+
+    def setUp(self):
+        self.client.force_login(self.professor)
+        self.url = reverse('atividade_fila', args=[self.atividade.pk])
+
+    def test_paginas_com_envios_no_mesmo_instante(self):
+        primeira = self.client.get(self.url, {'quantidade': 3}).json()
+        self.assertEqual(primeira['pendentes'], self.TOTAL_PENDENTES)
+
+        recebidas, pagina = [], primeira
+        while True:
+            recebidas += [submissao['id'] for submissao in pagina['submissoes']]
+            if pagina['fim']:
+                break
+            pagina = self.client.get(self.url, {'quantidade': 3, 'apos': pagina['cursor']}).json()
+            self.assertNotIn('pendentes', pagina)
+
+        self.assertEqual(recebidas, self.pendentes)
+
+    def test_cursor_invalido(self):
+        for apos in ('abc', 'ontem_12', '2024-06-01T10:00:00+00:00_', '2024-06-01T10:00:00+00:00_x'):
+            with self.subTest(apos=apos):
+                resposta = self.client.get(self.url, {'apos': apos})
+                self.assertEqual(resposta.status_code, 400)
+                self.assertFalse(resposta.json()['success'])
+
+        self.assertEqual(self.client.get(self.url, {'quantidade': 'muitas'}).status_code, 400)
+
+    def test_atividade_de_outro_professor(self):
+        cursor = self.client.get(self.url, {'quantidade': 1}).json()['cursor']
+
+        self.client.force_login(self.outro)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+        # Com cursor a atividade não é conferida, mas a consulta não devolve nada
+        resposta = self.client.get(self.url, {'apos': cursor}).json()
+        self.assertEqual(resposta['submissoes'], [])
+        self.assertTrue(resposta['fim'])
+
+
+class BenchmarkIATests(TransactionTestCase):
+    """O benchmark com o provedor falso roda sem a chave do Gemini"""
+
+    @override_settings(GEMINI_API_KEY='')
+    def test_benchmark_falso_sem_chave(self):
+        # Importar o serviço, como o comando faz, não pode criar o provedor do Gemini
+        importlib.reload(gemini_service)
+
+        saida = io.StringIO()
+        call_command(
+            'benchmark_ia', '--falso', '--chamadas', '4', '--concorrencia', '2',
+            '--latencia-media', '0.001', '--taxa-erro', '0', stdout=saida,
+        )
+
+        self.assertIn('provedor ProvedorFalso', saida.getvalue())
+        self.assertIn('Chamadas ao modelo: 4', saida.getvalue())
+        self.assertIn('Nenhum erro.', saida.getvalue())
+
+
+class MetricasTests(TestCase):
+    """O /metrics só abre com o token ou um IP liberado"""
+
+    def setUp(self):
+        self.url = reverse('metricas')
+
+    @override_settings(METRICAS_TOKEN='', METRICAS_IPS_PERMITIDOS=[])
+    def test_fechado_sem_configuracao(self):
+        # Atrás de um proxy no mesmo host tudo chega de 127.0.0.1
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR='127.0.0.1').status_code, 403)
+
+    @override_settings(METRICAS_TOKEN='segredo', METRICAS_IPS_PERMITIDOS=[])
+    def test_token(self):
+        resposta = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer segredo')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn(b'smartclass_http_requisicoes_total', resposta.content)
+
+        for autorizacao in ('Bearer errado', 'segredo', 'Basic segredo', ''):
+            with self.subTest(autorizacao=autorizacao):
+                resposta = self.client.get(self.url, HTTP_AUTHORIZATION=autorizacao)
+                self.assertEqual(resposta.status_code, 403)
+
+    @override_settings(METRICAS_TOKEN='', METRICAS_IPS_PERMITIDOS=['10.0.0.5'])
+    def test_ip_liberado(self):
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR='10.0.0.5').status_code, 200)
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR='10.0.0.6').status_code, 403)
+
+    def test_metodo_inventado_nao_cria_serie(self):
+        rotulos = {'view': 'metricas', 'status': '403'}
+        antes = REGISTRY.get_sample_value('smartclass_http_requisicoes_total', {**rotulos, 'metodo': 'outro'}) or 0
+
+        self.client.generic('INVENTADO', self.url)
+
+        self.assertEqual(
+            REGISTRY.get_sample_value('smartclass_http_requisicoes_total', {**rotulos, 'metodo': 'outro'}),
+            antes + 1
+        )
+        self.assertIsNone(
+            REGISTRY.get_sample_value('smartclass_http_requisicoes_total', {**rotulos, 'metodo': 'INVENTADO'})
+        )
@@ -2,16 +2,36 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.utils.dateparse import parse_datetime
 from django.views.decorators.http import require_http_methods, require_POST
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q, Avg
+from django.db import transaction
+from django.db.models import Q, Avg, Count, Exists, F, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.db.models.functions import Substr
 from django.utils import timezone
-from .decorators import professor_required, aluno_required
-from .models import Professor, Aluno, Atividade, Submissao
-from .forms import AtividadeForm, AlunoForm, SubmissaoForm, CorrecaoForm
-from core.services.gemini_service import gemini_service
+from django.conf import settings
+from prometheus_client import CONTENT_TYPE_LATEST
+from .decorators import professor_required, aluno_required, resposta_condicional, staff_required
+from .models import Professor, Aluno, Turma, Atividade, Submissao, Rascunho, Tarefa, UsoIADiario
+from .tarefas import enfileirar
+from .forms import AtividadeForm, AlunoForm, SubmissaoForm, CorrecaoForm, ImportacaoNotasForm, UnidadeForm
+from .metricas import gerar_metricas
+from core.services.gemini_service import obter_gemini_service
+from core.services.estatisticas import estatisticas_atividade, estatisticas_professor, estatisticas_turma
+from core.services.boletins import caminho_zip, listar_lotes, novo_lote
+from core.services.importacao_notas import ErroImportacao, importar_notas
+from core.services.perfis import ORDENACOES, caminho_perfil, carregar_perfil, listar_perfis
+from core.services.rascunhos import carregar_rascunho, promover_rascunho, salvar_rascunho
+from core.services.similaridade import grupos_semelhantes
+from core.services.uso_ia import OrcamentoIAExcedido, orcamento_diario
+from datetime import datetime, timedelta
+import hmac
 import json
+import time
+import uuid
 
 
 # ============================================================================
@@ -37,6 +57,8 @@ def login_view(request):
             try:
                 aluno = Aluno.objects.get(ra=username, is_active=True)
                 if aluno.check_password(password):
+                    # Nova chave de sessão no login (evita session fixation)
+                    request.session.cycle_key()
                     request.session['aluno_id'] = aluno.id
                     messages.success(request, f'Bem-vindo(a), {aluno.nome}!')
                     return redirect('aluno_atividades')
@@ -49,8 +71,8 @@ def login_view(request):
 
 def logout_view(request):
     """Logout para Professor e Aluno"""
-    if 'aluno_id' in request.session:
-        del request.session['aluno_id']
+    # logout() chama session.flush(): remove a sessão do cache e do banco de
+    # uma vez e gera uma nova chave, invalidando o cookie antigo (professor ou aluno)
     logout(request)
     messages.info(request, 'Logout realizado com sucesso.')
     return redirect('login')
@@ -60,27 +82,98 @@ def logout_view(request):
 # VIEWS DO PROFESSOR
 # ============================================================================
 
+def _versao(*valores):
+    """
+    Versão de uma página para o ETag (veja resposta_condicional)
+
+    Args:
+        *valores: Contagens e timestamps dos dados exibidos
+
+    Returns:
+        tuple: (chave, última alteração entre os timestamps)
+    """
+    datas = [valor for valor in valores if isinstance(valor, datetime)]
+    return ':'.join(map(str, valores)), max(datas, default=None)
+
+
+def _exclusoes_em_andamento(professor):
+    """
+    Atividades excluídas do professor cujas submissões ainda estão sendo apagadas
+
+    Returns:
+        list[dict]: 'id', 'titulo', 'progresso' e 'erro' (a tarefa falhou de vez)
+    """
+    excluidas = dict(
+        Atividade.todas.filter(professor=professor, excluida_em__isnull=False)
+        .values_list('id', 'titulo')
+    )
+    if not excluidas:
+        return []
+
+    tarefas = {
+        tarefa['payload']['atividade_id']: tarefa
+        for tarefa in Tarefa.objects.filter(
+            tipo='excluir_atividade', payload__atividade_id__in=list(excluidas)
+        ).order_by('criada_em').values('payload', 'progresso', 'status')
+    }
+    return [
+        {
+            'id': pk,
+            'titulo': titulo,
+            'progresso': tarefas[pk]['progresso'] if pk in tarefas else 0,
+            'erro': pk in tarefas and tarefas[pk]['status'] == Tarefa.STATUS_ERRO,
+        }
+        for pk, titulo in excluidas.items()
+    ]
+
+
+def _versao_atividades_professor(request):
+    atividades = Atividade.objects.filter(professor=request.user).aggregate(
+        total=Count('id'), ultima=Max('updated_at')
+    )
+    submissoes = Submissao.objects.filter(atividade__professor=request.user).aggregate(
+        total=Count('id'), ultima=Max('atualizado_em')
+    )
+    exclusoes = [(item['id'], item['progresso']) for item in _exclusoes_em_andamento(request.user)]
+    return _versao(*atividades.values(), *submissoes.values(), exclusoes)
+
+
 @professor_required
+@resposta_condicional(_versao_atividades_professor)
 def professor_atividades(request):
     """Lista de atividades do professor"""
-    atividades = Atividade.objects.filter(professor=request.user).prefetch_related('submissoes')
-
-    # Adicionar informações de submissões pendentes
-    for atividade in atividades:
-        atividade.novas_submissoes = atividade.submissoes_pendentes()
+    # Contagens agregadas em uma única query, sem carregar as submissões
+    # e só com o trecho da descrição exibido no card
+    atividades = (
+        Atividade.objects.filter(professor=request.user)
+        .select_related('turma')
+        .defer('descricao')
+        .annotate(
+            descricao_resumo=Substr('descricao', 1, 120),
+            num_submissoes=Count('submissoes'),
+            novas_submissoes=Count('submissoes', filter=Q(submissoes__nota__isnull=True)),
+        )
+    )
 
     context = {
         'atividades': atividades,
-        'total_atividades': atividades.count(),
+        'total_atividades': len(atividades),
+        'exclusoes': _exclusoes_em_andamento(request.user),
     }
     return render(request, 'professor/atividades_list.html', context)
 
 
+@professor_required
+def atividades_exclusoes(request):
+    """Progresso das exclusões em segundo plano (consultado pela lista de atividades)"""
+    return JsonResponse({'exclusoes': _exclusoes_em_andamento(request.user)})
+
+
 @professor_required
 def atividade_create(request):
     """Criar nova atividade"""
     if request.method == 'POST':
-        form = AtividadeForm(request.POST)
+        form = AtividadeForm(request.POST, professor=request.user)
         if form.is_valid():
             atividade = form.save(commit=False)
             atividade.professor = request.user
@@ -89,7 +182,7 @@ def atividade_create(request):
             return redirect('professor_atividades')
         messages.error(request, 'Erro ao criar atividade. Verifique os campos.')
     else:
-        form = AtividadeForm()
+        form = AtividadeForm(professor=request.user)
 
     context = {'form': form, 'action': 'Criar'}
     return render(request, 'professor/atividade_form.html', context)
@@ -105,14 +198,14 @@ def atividade_edit(request, pk):
         return redirect('professor_atividades')
 
     if request.method == 'POST':
-        form = AtividadeForm(request.POST, instance=atividade)
+        form = AtividadeForm(request.POST, instance=atividade, professor=request.user)
         if form.is_valid():
             form.save()
             messages.success(request, f'Atividade "{atividade.titulo}" atualizada!')
             return redirect('professor_atividades')
         messages.error(request, 'Erro ao atualizar atividade.')
     else:
-        form = AtividadeForm(instance=atividade)
+        form = AtividadeForm(instance=atividade, professor=request.user)
 
     context = {
         'form': form,
@@ -128,12 +221,15 @@ def atividade_delete(request, pk):
     atividade = get_object_or_404(Atividade, pk=pk, professor=request.user)
 
     if request.method == 'POST':
-        titulo = atividade.titulo
-        total_submissoes = atividade.total_submissoes()
-        atividade.delete()
+        # Some das telas na hora; as submissões são apagadas em lotes pelo
+        # worker (tarefa excluir_atividade), sem uma transação longa aqui
+        agora = timezone.now()
+        with transaction.atomic():
+            Atividade.objects.filter(pk=atividade.pk).update(excluida_em=agora, updated_at=agora)
+            enfileirar('excluir_atividade', atividade_id=atividade.pk)
         messages.warning(
             request,
-            f'Atividade "{titulo}" deletada (incluindo {total_submissoes} submissões).'
+            f'Atividade "{atividade.titulo}" deletada. As submissões estão sendo apagadas em segundo plano.'
         )
         return redirect('professor_atividades')
 
@@ -144,38 +240,273 @@ def atividade_delete(request, pk):
 @professor_required
 def atividade_submissoes(request, pk):
     """Visualizar submissões de uma atividade"""
-    atividade = get_object_or_404(Atividade, pk=pk, professor=request.user)
-    submissoes = atividade.submissoes.select_related('aluno').order_by('aluno__nome')
+    atividade = get_object_or_404(
+        Atividade.objects.select_related('turma'), pk=pk, professor=request.user
+    )
 
-    # Listar todos os alunos e marcar quem enviou
-    todos_alunos = Aluno.objects.filter(is_active=True).order_by('nome')
-    alunos_enviaram = submissoes.values_list('aluno_id', flat=True)
+    # Marca inicial do feed ao vivo: tirada antes da consulta para não perder nada
+    marca = timezone.now()
+
+    # Resposta e observação são carregadas sob demanda (submissao_detalhe)
+    submissoes = {
+        submissao.aluno_id: submissao
+        for submissao in atividade.submissoes.para_listagem()
+    }
+
+    # Listar os alunos da turma e marcar quem enviou
+    todos_alunos = atividade.turma.alunos.filter(is_active=True).order_by('nome')
 
     alunos_info = []
     for aluno in todos_alunos:
-        submissao = submissoes.filter(aluno=aluno).first()
+        submissao = submissoes.get(aluno.id)
         alunos_info.append({
             'aluno': aluno,
             'submissao': submissao,
             'status': 'enviado' if submissao else 'pendente'
         })
 
+    # Respostas muito parecidas entre si (MinHash + LSH, sem comparar todos os pares)
+    alunos_por_id = {info['aluno'].id: info['aluno'] for info in alunos_info}
+    semelhantes = [
+        {
+            'alunos': [alunos_por_id[aluno_id] for aluno_id in grupo['aluno_ids'] if aluno_id in alunos_por_id],
+            'similaridade': round(grupo['similaridade'] * 100),
+        }
+        for grupo in grupos_semelhantes(atividade)
+    ]
+
     context = {
         'atividade': atividade,
         'alunos_info': alunos_info,
-        'total_submissoes': submissoes.count(),
-        'total_alunos': todos_alunos.count(),
-        'submissoes_pendentes': atividade.submissoes_pendentes(),
+        'grupos_semelhantes': [grupo for grupo in semelhantes if len(grupo['alunos']) > 1],
+        'total_submissoes': len(submissoes),
+        'total_alunos': len(alunos_info),
+        'submissoes_pendentes': sum(1 for s in submissoes.values() if s.nota is None),
+        'marca': marca.isoformat(),
     }
     return render(request, 'professor/atividade_submissoes.html', context)
 
 
+# Intervalo entre consultas do feed, sobreposição da marca (transações que
+# gravaram com horário anterior mas confirmaram depois) e duração máxima de
+# cada conexão. A conexão é curta porque ocupa uma thread do worker enquanto
+# está aberta; o EventSource reconecta sozinho usando o Last-Event-ID
+FEED_INTERVALO = 2
+FEED_SOBREPOSICAO = timedelta(seconds=5)
+FEED_DURACAO_MAXIMA = 30
+
+
+def _alteracoes_feed(atividade, marca, enviados):
+    """
+    Submissões alteradas desde a marca, prontas para o feed
+
+    Args:
+        atividade (Atividade): Atividade acompanhada
+        marca (datetime): Última alteração já enviada ao navegador
+        enviados (dict): {submissao_id: atualizado_em} já enviados nesta
+            conexão (evita repetir as linhas da sobreposição)
+
+    Returns:
+        tuple: (payload com contadores e linhas em HTML, ou None se nada
+        mudou; nova marca)
+    """
+    alteradas = [
+        submissao for submissao in
+        Submissao.objects.filter(
+            atividade=atividade,
+            atualizado_em__gt=marca - FEED_SOBREPOSICAO
+        ).para_listagem().select_related('aluno').order_by('atualizado_em')
+        if enviados.get(submissao.pk) != submissao.atualizado_em
+    ]
+    if not alteradas:
+        return None, marca
+
+    for submissao in alteradas:
+        enviados[submissao.pk] = submissao.atualizado_em
+    marca = max(marca, alteradas[-1].atualizado_em)
+
+    contadores = atividade.submissoes.aggregate(
+        total_submissoes=Count('id'),
+        submissoes_pendentes=Count('id', filter=Q(nota__isnull=True)),
+    )
+    payload = {
+        **contadores,
+        'submissoes': [
+            {
+                'aluno_id': submissao.aluno_id,
+                'html': render_to_string('professor/submissao_aluno.html', {
+                    'item': {
+                        'aluno': submissao.aluno,
+                        'submissao': submissao,
+                        'status': 'enviado',
+                    }
+                }),
+            }
+            for submissao in alteradas
+        ],
+    }
+    return payload, marca
+
+
+@professor_required
+def atividade_submissoes_stream(request, pk):
+    """
+    Feed ao vivo (Server-Sent Events) das submissões de uma atividade
+
+    Consulta periodicamente as submissões com atualizado_em posterior à
+    última marca enviada e envia apenas as linhas alteradas (HTML parcial)
+    e os contadores atualizados. O gerador é síncrono: roda igual no
+    runserver e no gunicorn (WSGI), enviando cada evento assim que é gerado.
+
+    Com ?formato=json responde uma única vez, sem manter a conexão (consulta
+    periódica da página quando o EventSource não funciona e atualização
+    logo depois de uma correção).
+    """
+    atividade = get_object_or_404(Atividade, pk=pk, professor=request.user)
+
+    marca = parse_datetime(
+        request.headers.get('Last-Event-ID') or request.GET.get('desde') or ''
+    ) or timezone.now()
+
+    if request.GET.get('formato') == 'json':
+        payload, marca = _alteracoes_feed(atividade, marca, {})
+        return JsonResponse({'submissoes': [], **(payload or {}), 'marca': marca.isoformat()})
+
+    def eventos():
+        nonlocal marca
+        enviados = {}
+        limite = time.monotonic() + FEED_DURACAO_MAXIMA
+        yield f'retry: {FEED_INTERVALO * 1000}\n\n'
+
+        while time.monotonic() < limite:
+            payload, marca = _alteracoes_feed(atividade, marca, enviados)
+            if payload:
+                yield (
+                    f'id: {marca.isoformat()}\n'
+                    f'event: submissoes\n'
+                    f'data: {json.dumps(payload)}\n\n'
+                )
+            else:
+                # Comentário SSE: mantém a conexão viva em proxies
+                yield ': ping\n\n'
+
+            time.sleep(FEED_INTERVALO)
+
+    response = StreamingHttpResponse(eventos(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# Submissões entregues por chamada da fila de correção (padrão e máximo)
+FILA_QUANTIDADE = 5
+FILA_QUANTIDADE_MAXIMA = 20
+
+
+@professor_required
+def atividade_corrigir(request, pk):
+    """Correção em sequência: uma submissão sem nota por vez, com a próxima já carregada"""
+    atividade = get_object_or_404(Atividade, pk=pk, professor=request.user)
+    return render(request, 'professor/atividade_corrigir.html', {'atividade': atividade})
+
+
+@professor_required
+def atividade_fila(request, pk):
+    """
+    Próximas submissões sem nota de uma atividade (fila de correção)
+
+    Devolve até `quantidade` submissões, por ordem de envio, em uma única
+    consulta pelo índice parcial submissao_pendente_idx (atividade,
+    enviado_em WHERE nota IS NULL): como as corrigidas saem do índice, a
+    fila começa sempre na primeira pendente. O cursor `apos`
+    (enviado_em_id da última recebida) pula as que o professor já tem em
+    mãos ou pulou. Só a primeira chamada (sem cursor) confere a atividade
+    e conta as pendentes.
+
+    Query params:
+        quantidade (int): Submissões por chamada (até FILA_QUANTIDADE_MAXIMA)
+        apos (str): Cursor devolvido pela chamada anterior
+    """
+    try:
+        quantidade = min(max(int(request.GET.get('quantidade', FILA_QUANTIDADE)), 1), FILA_QUANTIDADE_MAXIMA)
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'Quantidade inválida.'}, status=400)
+
+    fila = (
+        Submissao.objects.filter(
+            atividade_id=pk,
+            atividade__professor=request.user,
+            atividade__excluida_em__isnull=True,
+            nota__isnull=True,
+        )
+        .select_related('aluno')
+        .only('id', 'resposta', 'observacao', 'enviado_em', 'aluno__nome', 'aluno__ra')
+        .order_by('enviado_em', 'id')
+    )
+    payload = {}
+
+    apos = request.GET.get('apos')
+    if apos:
+        enviado_em, _, ultimo_id = apos.rpartition('_')
+        enviado_em = parse_datetime(enviado_em)
+        if enviado_em is None or not ultimo_id.isdigit():
+            return JsonResponse({'success': False, 'message': 'Cursor inválido.'}, status=400)
+        # O >= repete a condição do OR de forma que o índice consiga usá-la
+        fila = fila.filter(
+            Q(enviado_em__gt=enviado_em) | Q(enviado_em=enviado_em, id__gt=int(ultimo_id)),
+            enviado_em__gte=enviado_em,
+        )
+    else:
+        get_object_or_404(Atividade, pk=pk, professor=request.user)
+        payload['pendentes'] = fila.count()
+
+    submissoes = list(fila[:quantidade])
+    if submissoes:
+        ultima = submissoes[-1]
+        apos = f'{ultima.enviado_em.isoformat()}_{ultima.pk}'
+
+    return JsonResponse({
+        'success': True,
+        'submissoes': [
+            {
+                'id': submissao.pk,
+                'aluno': submissao.aluno.nome,
+                'ra': submissao.aluno.ra,
+                'enviado_em': timezone.localtime(submissao.enviado_em).strftime('%d/%m/%Y %H:%M'),
+                'resposta': submissao.resposta,
+                'observacao': submissao.observacao or '',
+            }
+            for submissao in submissoes
+        ],
+        'cursor': apos,
+        'fim': len(submissoes) < quantidade,
+        **payload,
+    })
+
+
+@professor_required
+def submissao_detalhe(request, pk):
+    """Resposta e observação de uma submissão (carregadas ao expandir o aluno)"""
+    submissao = get_object_or_404(
+        Submissao.objects.only('id', 'resposta', 'observacao'),
+        pk=pk,
+        atividade__professor=request.user
+    )
+
+    return JsonResponse({
+        'success': True,
+        'resposta': submissao.resposta,
+        'observacao': submissao.observacao or '',
+    })
+
+
 @professor_required
 @require_POST
 def submissao_corrigir(request, pk):
     """Corrigir submissão de aluno"""
+    # Sem a resposta: o save() grava apenas os campos carregados
     submissao = get_object_or_404(
-        Submissao,
+        Submissao.objects.select_related('aluno').defer('resposta'),
         pk=pk,
         atividade__professor=request.user
     )
@@ -216,24 +547,127 @@ def submissao_corrigir(request, pk):
         }, status=500)
 
 
+@professor_required
+def notas_importar(request):
+    """
+    Importa notas de uma planilha (CSV) e mostra o relatório linha a linha
+
+    A planilha tem as colunas ra, atividade (id), nota e, opcionalmente,
+    observacao. Veja core/services/importacao_notas.py.
+    """
+    form = ImportacaoNotasForm(request.POST or None, request.FILES or None)
+    resultado = None
+
+    if request.method == 'POST' and form.is_valid():
+        aplicar = not form.cleaned_data['somente_conferir']
+        try:
+            resultado = importar_notas(request.user, form.cleaned_data['arquivo'], aplicar=aplicar)
+        except ErroImportacao as e:
+            messages.error(request, str(e))
+        else:
+            atualizadas = resultado['resumo']['atualizada']
+            if aplicar:
+                messages.success(request, f'{atualizadas} nota(s) importada(s).')
+            else:
+                messages.info(request, f'Conferência: {atualizadas} nota(s) seriam atualizadas. Nada foi gravado.')
+
+    context = {
+        'form': form,
+        'resultado': resultado,
+    }
+    return render(request, 'professor/notas_importar.html', context)
+
+
+@professor_required
+def boletins(request):
+    """
+    Boletins de fim de período: pede um novo lote e lista os prontos
+
+    A geração roda em segundo plano (tarefa gerar_boletins); a página mostra
+    o progresso das que estão em andamento.
+    """
+    turmas = Turma.objects.filter(professor=request.user)
+
+    if request.method == 'POST':
+        turma = None
+        if request.POST.get('turma'):
+            turma = get_object_or_404(turmas, pk=request.POST['turma'])
+        lote = novo_lote(turma)
+        enfileirar(
+            'gerar_boletins', professor_id=request.user.pk, lote=lote,
+            turma_id=turma.pk if turma else None,
+        )
+        messages.success(request, 'Geração dos boletins iniciada. O arquivo aparece aqui quando ficar pronto.')
+        return redirect('boletins')
+
+    em_andamento = (
+        Tarefa.objects.filter(tipo='gerar_boletins', payload__professor_id=request.user.pk)
+        .exclude(status=Tarefa.STATUS_CONCLUIDA)
+        .order_by('-criada_em')
+        .values('payload', 'status', 'progresso', 'erro')[:10]
+    )
+
+    context = {
+        'turmas': turmas,
+        'lotes': listar_lotes(request.user.pk),
+        'em_andamento': em_andamento,
+        'STATUS_ERRO': Tarefa.STATUS_ERRO,
+    }
+    return render(request, 'professor/boletins.html', context)
+
+
+@professor_required
+def boletins_download(request, lote):
+    """Download do .zip de um lote de boletins do professor"""
+    caminho = caminho_zip(request.user.pk, lote)
+    if caminho is None:
+        raise Http404('Lote não encontrado')
+    return FileResponse(open(caminho, 'rb'), as_attachment=True, filename=f'boletins-{lote}.zip')
+
+
 @professor_required
 def professor_alunos(request):
-    """Lista de alunos cadastrados"""
-    alunos = Aluno.objects.filter(is_active=True).order_by('nome')
-
-    # Estatísticas por aluno
-    for aluno in alunos:
-        total_atividades = Atividade.objects.count()
-        aluno.total_atividades = total_atividades
-        aluno.atividades_enviadas = aluno.submissoes.count()
-        aluno.atividades_pendentes = total_atividades - aluno.atividades_enviadas
-        aluno.media_notas = aluno.submissoes.filter(
-            nota__isnull=False
-        ).aggregate(Avg('nota'))['nota__avg'] or 0
+    """Lista de alunos das turmas do professor"""
+    turmas = Turma.objects.filter(professor=request.user)
+    turma = None
+    if request.GET.get('turma'):
+        turma = get_object_or_404(turmas, pk=request.GET['turma'])
+    escopo = [turma] if turma else turmas
+
+    # Atividades das turmas do escopo em que o aluno está matriculado
+    total_atividades = (
+        Atividade.objects.filter(turma__in=escopo, turma__alunos=OuterRef('pk'))
+        .order_by()
+        .values('turma__alunos')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+
+    # Atividades excluídas somem antes de o worker apagar as submissões
+    submissoes_do_escopo = Q(
+        submissoes__atividade__turma__in=escopo, submissoes__atividade__excluida_em__isnull=True
+    )
+
+    # Estatísticas de todos os alunos em uma única query
+    alunos = (
+        Aluno.objects.filter(
+            is_active=True,
+            pk__in=Turma.alunos.through.objects.filter(turma__in=escopo).values('aluno_id'),
+        )
+        .annotate(
+            total_atividades=Coalesce(Subquery(total_atividades), 0),
+            atividades_enviadas=Count('submissoes', filter=submissoes_do_escopo),
+            media_notas=Avg('submissoes__nota', filter=submissoes_do_escopo),
+        )
+        .annotate(atividades_pendentes=F('total_atividades') - F('atividades_enviadas'))
+        .order_by('nome')
+    )
 
     context = {
         'alunos': alunos,
-        'total_alunos': alunos.count(),
+        'total_alunos': len(alunos),
+        'turmas': turmas,
+        'turma': turma,
     }
     return render(request, 'professor/alunos_list.html', context)
 
@@ -261,7 +695,9 @@ def gerar_atividade_api(request):
     {
         "success": true,
         "titulo": "...",
-        "descricao": "..."
+        "descricao": "...",
+        "questoes": ["..."],
+        "rubrica": [{"criterio": "...", "pontos": 2.5}]
     }
     """
     try:
@@ -301,19 +737,28 @@ def gerar_atividade_api(request):
         tipo_atividade = data.get('tipo_atividade', '').strip() or None
 
         # Gerar atividade usando o serviço Gemini
-        resultado = gemini_service.gerar_atividade(
+        resultado = obter_gemini_service().gerar_atividade(
             tema=tema,
             disciplina=disciplina,
             nivel_dificuldade=nivel_dificuldade,
-            tipo_atividade=tipo_atividade
+            tipo_atividade=tipo_atividade,
+            professor=request.user
         )
 
         return JsonResponse({
             'success': True,
             'titulo': resultado['titulo'],
-            'descricao': resultado['descricao']
+            'descricao': resultado['descricao'],
+            'questoes': resultado['questoes'],
+            'rubrica': resultado['rubrica']
         })
 
+    except OrcamentoIAExcedido as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=429)
+
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -321,23 +766,188 @@ def gerar_atividade_api(request):
         }, status=500)
 
 
+@professor_required
+def unidade_gerar(request):
+    """
+    Gera uma unidade de atividades com IA
+
+    1. O professor informa os temas e os parâmetros comuns ('gerar')
+    2. As atividades são geradas em paralelo e exibidas para revisão
+    3. As selecionadas são criadas com um único bulk_create ('salvar')
+    """
+    form = UnidadeForm(request.POST or None, professor=request.user)
+
+    if request.method != 'POST' or not form.is_valid():
+        return render(request, 'professor/unidade_form.html', {'form': form})
+
+    dados = form.cleaned_data
+
+    if request.POST.get('acao') == 'salvar':
+        titulos = request.POST.getlist('titulo')
+        descricoes = request.POST.getlist('descricao')
+        selecionadas = set(request.POST.getlist('incluir'))
+
+        atividades = [
+            Atividade(
+                professor=request.user,
+                turma=dados['turma'],
+                titulo=titulo.strip()[:200],
+                descricao=descricao.strip(),
+                prazo_entrega=dados['prazo_entrega'],
+            )
+            for indice, (titulo, descricao) in enumerate(zip(titulos, descricoes))
+            if str(indice) in selecionadas and titulo.strip() and descricao.strip()
+        ]
+        if atividades:
+            Atividade.objects.bulk_create(atividades)
+            messages.success(request, f'{len(atividades)} atividades criadas para a turma {dados["turma"]}.')
+            return redirect('professor_atividades')
+
+        # Nada válido selecionado: devolve a prévia como o professor a editou,
+        # sem gerar de novo (custaria chamadas à IA e apagaria as edições)
+        messages.error(request, 'Selecione pelo menos uma atividade com título e descrição para criar.')
+        previa = [
+            {'tema': tema, 'titulo': titulo, 'descricao': descricao, 'incluida': str(indice) in selecionadas}
+            if titulo.strip() or descricao.strip()
+            else {'tema': tema, 'erro': 'Atividade não gerada. Gere a unidade de novo para tentar outra vez.'}
+            for indice, (tema, titulo, descricao) in enumerate(zip(dados['temas'], titulos, descricoes))
+        ]
+        return render(request, 'professor/unidade_form.html', {'form': form, 'previa': previa})
+
+    try:
+        previa = obter_gemini_service().gerar_unidade(
+            dados['temas'],
+            disciplina=dados['disciplina'] or None,
+            nivel_dificuldade=dados['nivel_dificuldade'] or None,
+            tipo_atividade=dados['tipo_atividade'] or None,
+            professor=request.user,
+        )
+    except OrcamentoIAExcedido as e:
+        messages.error(request, str(e))
+        return render(request, 'professor/unidade_form.html', {'form': form})
+
+    for item in previa:
+        item['incluida'] = True
+
+    falhas = sum(1 for item in previa if 'erro' in item)
+    if falhas:
+        messages.warning(request, f'{falhas} de {len(previa)} atividades não puderam ser geradas.')
+
+    context = {
+        'form': form,
+        'previa': previa,
+    }
+    return render(request, 'professor/unidade_form.html', context)
+
+
+@professor_required
+def professor_uso_ia(request):
+    """Relatório de uso da IA (tokens, latência e orçamento) dos últimos 30 dias"""
+    desde = timezone.localdate() - timedelta(days=29)
+    dias = UsoIADiario.objects.filter(professor=request.user, data__gte=desde)
+
+    totais = dias.aggregate(
+        chamadas=Sum('chamadas'),
+        erros=Sum('erros'),
+        cache_hits=Sum('cache_hits'),
+        tokens_entrada=Sum('tokens_entrada'),
+        tokens_saida=Sum('tokens_saida'),
+    )
+    hoje = next((dia for dia in dias if dia.data == timezone.localdate()), None)
+
+    context = {
+        'dias': dias,
+        'totais': totais,
+        'tokens_hoje': hoje.total_tokens if hoje else 0,
+        'orcamento_diario': orcamento_diario(request.user),
+    }
+
+    # Administradores veem o consumo de todos os professores
+    if request.user.is_superuser:
+        context['por_professor'] = (
+            UsoIADiario.objects.filter(data__gte=desde)
+            .values('professor__nome', 'professor__username')
+            .annotate(
+                chamadas=Sum('chamadas'),
+                erros=Sum('erros'),
+                tokens_entrada=Sum('tokens_entrada'),
+                tokens_saida=Sum('tokens_saida'),
+            )
+            .order_by('-tokens_saida')
+        )
+
+    return render(request, 'professor/uso_ia.html', context)
+
+
+@professor_required
+def professor_estatisticas(request, pk=None, turma_pk=None):
+    """Estatísticas das notas de uma atividade, de uma turma ou de todas as atividades do professor"""
+    atividade = turma = None
+    if pk is not None:
+        atividade = get_object_or_404(Atividade, pk=pk, professor=request.user)
+        estatisticas = estatisticas_atividade(atividade)
+    elif turma_pk is not None:
+        turma = get_object_or_404(Turma, pk=turma_pk, professor=request.user)
+        estatisticas = estatisticas_turma(turma)
+    else:
+        estatisticas = estatisticas_professor(request.user)
+
+    # Nomes dos alunos fora da curva em uma única query
+    fora_da_curva = estatisticas['fora_da_curva']
+    alunos = Aluno.objects.only('nome', 'ra').in_bulk([item['aluno_id'] for item in fora_da_curva])
+
+    context = {
+        'atividade': atividade,
+        'turma': turma,
+        'estatisticas': estatisticas,
+        'fora_da_curva': [
+            {**item, 'aluno': alunos[item['aluno_id']]}
+            for item in fora_da_curva
+            if item['aluno_id'] in alunos
+        ],
+        'turmas': Turma.objects.filter(professor=request.user),
+        'atividades': Atividade.objects.filter(professor=request.user).only('titulo').order_by('-created_at'),
+    }
+    return render(request, 'professor/estatisticas.html', context)
+
+
 # ============================================================================
 # VIEWS DO ALUNO
 # ============================================================================
 
+def _versao_atividades_aluno(request):
+    aluno_id = request.session['aluno_id']
+    atividades = Atividade.objects.filter(turma__alunos=aluno_id).aggregate(
+        total=Count('id'), ultima=Max('updated_at')
+    )
+    submissoes = Submissao.objects.filter(aluno_id=aluno_id).aggregate(
+        total=Count('id'), ultima=Max('atualizado_em')
+    )
+    return _versao(*atividades.values(), *submissoes.values())
+
+
 @aluno_required
+@resposta_condicional(_versao_atividades_aluno)
 def aluno_atividades(request):
     """Lista de atividades disponíveis para o aluno"""
     aluno = get_object_or_404(Aluno, pk=request.session['aluno_id'])
-    atividades = Atividade.objects.all().order_by('-created_at')
+    atividades = (
+        Atividade.objects.filter(turma__alunos=aluno)
+        .defer('descricao')
+        .annotate(descricao_resumo=Substr('descricao', 1, 300))
+        .order_by('-created_at')
+    )
+
+    # Uma query para todas as submissões do aluno, sem os campos de texto
+    submissoes = {
+        submissao.atividade_id: submissao
+        for submissao in Submissao.objects.filter(aluno=aluno).para_listagem()
+    }
 
     # Verificar status de cada atividade
     atividades_info = []
     for atividade in atividades:
-        submissao = Submissao.objects.filter(
-            atividade=atividade,
-            aluno=aluno
-        ).first()
+        submissao = submissoes.get(atividade.id)
 
         if submissao:
             if submissao.nota is not None:
@@ -359,7 +969,7 @@ def aluno_atividades(request):
             'status': status,
             'status_display': status_display,
             'status_class': status_class,
-            'prazo_vencido': atividade.prazo_entrega < timezone.now().date()
+            'prazo_vencido': atividade.prazo_vencido()
         })
 
     context = {
@@ -369,48 +979,107 @@ def aluno_atividades(request):
     return render(request, 'aluno/atividades_list.html', context)
 
 
+def _versao_atividade_detail(request, pk):
+    aluno_id = request.session['aluno_id']
+    linha = (
+        Atividade.objects.filter(pk=pk, turma__alunos=aluno_id)
+        .annotate(
+            enviada=Exists(Submissao.objects.filter(atividade=OuterRef('pk'), aluno_id=aluno_id)),
+            rascunho_em=Subquery(
+                Rascunho.objects.filter(atividade=OuterRef('pk'), aluno_id=aluno_id).values('atualizado_em')
+            ),
+        )
+        .values_list('updated_at', 'enviada', 'rascunho_em')
+        .first()
+    )
+    # Inexistente (404) ou já enviada (redireciona): a view decide
+    if linha is None or linha[1]:
+        return None
+    return _versao(linha[0], linha[2])
+
+
 @aluno_required
+@resposta_condicional(_versao_atividade_detail)
 def atividade_detail(request, pk):
     """Visualizar detalhes de uma atividade e enviar resposta"""
     aluno = get_object_or_404(Aluno, pk=request.session['aluno_id'])
-    atividade = get_object_or_404(Atividade, pk=pk)
-
-    # Verificar se já existe submissão
-    submissao = Submissao.objects.filter(
-        atividade=atividade,
-        aluno=aluno
-    ).first()
-
-    # Se já enviou, redireciona para resultado
-    if submissao:
-        return redirect('atividade_resultado', pk=pk)
+    atividade = get_object_or_404(Atividade, pk=pk, turma__alunos=aluno)
 
     if request.method == 'POST':
         resposta = request.POST.get('resposta', '').strip()
 
+        try:
+            token = uuid.UUID(request.POST.get('token_envio', ''))
+        except ValueError:
+            token = None
+
         if not resposta:
             messages.error(request, 'A resposta não pode estar vazia.')
         else:
-            submissao = Submissao.objects.create(
-                atividade=atividade,
-                aluno=aluno,
-                resposta=resposta
-            )
-            messages.success(request, 'Atividade enviada com sucesso!')
-            return redirect('aluno_atividades')
+            # Clique duplo e reenvio caem no ON CONFLICT e recebem a submissão existente
+            submissao, enviada_agora = Submissao.objects.enviar(atividade, aluno, resposta, token)
+            if enviada_agora:
+                promover_rascunho(aluno.pk, atividade.pk)
+                messages.success(request, 'Atividade enviada com sucesso!')
+                return redirect('aluno_atividades')
+            messages.info(request, 'Você já havia enviado esta atividade.')
+            return redirect('atividade_resultado', pk=pk)
+
+    # Se já enviou, redireciona para resultado
+    elif Submissao.objects.filter(atividade=atividade, aluno=aluno).exists():
+        return redirect('atividade_resultado', pk=pk)
 
     context = {
         'atividade': atividade,
         'aluno': aluno,
+        # Mantido no reenvio do formulário para reconhecer o mesmo envio
+        'token_envio': request.POST.get('token_envio') or uuid.uuid4(),
+        'rascunho': carregar_rascunho(aluno.pk, atividade.pk),
     }
     return render(request, 'aluno/atividade_detail.html', context)
 
 
 @aluno_required
+@require_POST
+def rascunho_salvar(request, pk):
+    """
+    Salvamento automático do rascunho da resposta (chamado pelo navegador)
+
+    Textos iguais ao último salvamento não chegam ao banco (veja
+    core/services/rascunhos.py).
+    """
+    texto = request.POST.get('texto', '')
+    if len(texto) > settings.RASCUNHO_MAX_CARACTERES:
+        return JsonResponse({
+            'success': False,
+            'message': f'O rascunho passou de {settings.RASCUNHO_MAX_CARACTERES} caracteres.'
+        }, status=400)
+
+    aluno_id = request.session['aluno_id']
+    permitida = Atividade.objects.filter(pk=pk, turma__alunos=aluno_id).exclude(
+        submissoes__aluno_id=aluno_id
+    ).exists()
+    if not permitida:
+        return JsonResponse({'success': False, 'message': 'Atividade indisponível.'}, status=404)
+
+    salvo = salvar_rascunho(aluno_id, pk, texto)
+    return JsonResponse({'success': True, 'salvo': salvo})
+
+
+def _versao_atividade_resultado(request, pk):
+    aluno_id = request.session['aluno_id']
+    linha = Submissao.objects.filter(
+        atividade_id=pk, aluno_id=aluno_id, atividade__turma__alunos=aluno_id
+    ).values_list('atualizado_em', 'atividade__updated_at').first()
+    return _versao(*linha) if linha else None
+
+
+@aluno_required
+@resposta_condicional(_versao_atividade_resultado)
 def atividade_resultado(request, pk):
     """Ver resultado/correção de uma atividade"""
     aluno = get_object_or_404(Aluno, pk=request.session['aluno_id'])
-    atividade = get_object_or_404(Atividade, pk=pk)
+    atividade = get_object_or_404(Atividade, pk=pk, turma__alunos=aluno)
 
     submissao = get_object_or_404(
         Submissao,
@@ -423,4 +1092,65 @@ def atividade_resultado(request, pk):
         'submissao': submissao,
         'aluno': aluno,
     }
-    return render(request, 'aluno/atividade_resultado.html', context)
\ No newline at end of file
+    return render(request, 'aluno/atividade_result.html', context)
+
+
+# ============================================================================
+# DIAGNÓSTICO (STAFF)
+# ============================================================================
+
+@staff_required
+def perfis_list(request):
+    """Perfis de requisições guardados pelo PerfilMiddleware"""
+    return render(request, 'staff/perfis_list.html', {
+        'perfis': listar_perfis(),
+        'amostra_taxa': settings.PERFIL_AMOSTRA_TAXA,
+        'amostra_por_view': settings.PERFIL_AMOSTRA_POR_VIEW,
+    })
+
+
+@staff_required
+def perfil_detail(request, nome):
+    """Funções mais custosas e consultas SQL de um perfil"""
+    ordenacao = request.GET.get('ordem', 'cumulative')
+    if ordenacao not in ORDENACOES:
+        ordenacao = 'cumulative'
+
+    perfil = carregar_perfil(nome, ordenacao)
+    if perfil is None:
+        raise Http404('Perfil não encontrado')
+
+    return render(request, 'staff/perfil_detail.html', {
+        'perfil': perfil,
+        'ordenacao': ordenacao,
+        'ordenacoes': ORDENACOES,
+    })
+
+
+@staff_required
+def perfil_download(request, nome):
+    """Arquivo .prof do perfil (para snakeviz, pstats etc.)"""
+    caminho = caminho_perfil(nome)
+    if caminho is None:
+        raise Http404('Perfil não encontrado')
+    return FileResponse(open(caminho, 'rb'), as_attachment=True, filename=caminho.name)
+
+
+# ============================================================================
+# MÉTRICAS
+# ============================================================================
+
+def metricas(request):
+    """
+    Endpoint /metrics para o Prometheus
+
+    Sem login: exige o token de METRICAS_TOKEN (Authorization: Bearer) ou
+    um IP de METRICAS_IPS_PERMITIDOS. Sem nenhum dos dois configurado, nega.
+    """
+    token = settings.METRICAS_TOKEN
+    autorizacao = request.META.get('HTTP_AUTHORIZATION', '')
+    por_token = bool(token) and hmac.compare_digest(autorizacao.encode(), f'Bearer {token}'.encode())
+    if not por_token and request.META.get('REMOTE_ADDR') not in settings.METRICAS_IPS_PERMITIDOS:
+        return HttpResponseForbidden()
+
+    return HttpResponse(gerar_metricas(), content_type=CONTENT_TYPE_LATEST)
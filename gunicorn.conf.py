@@ -0,0 +1,22 @@
+# gunicorn.conf.py
+"""
+Configuração do gunicorn
+
+Workers gthread: o feed ao vivo de submissões mantém cada conexão aberta
+por até FEED_DURACAO_MAXIMA segundos, e assim ela ocupa uma thread em vez
+de um worker inteiro.
+
+Com PROMETHEUS_MULTIPROC_DIR definido, remove os arquivos de métricas
+"ao vivo" (gauges) de workers que saíram, para não somarem no /metrics.
+"""
+import os
+
+worker_class = 'gthread'
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 16))
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
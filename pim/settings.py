@@ -37,18 +37,24 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    # Antes do staticfiles: o runserver também serve os estáticos pelo WhiteNoise
+    'whitenoise.runserver_nostatic',
     'django.contrib.staticfiles',
     'core',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.CompressaoMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.PerfilMiddleware',
 ]
 
 ROOT_URLCONF = 'pim.urls'
@@ -89,6 +95,39 @@ DATABASES = {
 }
 
 
+# Cache e sessões
+# O backend cached_db evita o SELECT em django_session a cada requisição:
+# a sessão é lida do cache e o banco só é consultado em caso de miss.
+# O cache precisa ser compartilhado entre os workers (Redis ou memcached):
+# com o LocMemCache cada processo guarda sua cópia, e um logout feito em um
+# worker não apaga a sessão do cache dos outros. Exemplo:
+#   CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+#   CACHE_LOCATION=redis://localhost:6379/1
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'smartclass'),
+    }
+}
+CACHE_POR_PROCESSO = CACHES['default']['BACKEND'] in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Opções: 'django.contrib.sessions.backends.cached_db' (padrão com cache
+# compartilhado), 'django.contrib.sessions.backends.db' (padrão com o cache
+# local de cada processo) ou 'django.contrib.sessions.backends.signed_cookies'
+# (sem nenhum acesso ao banco, mas o logout só invalida o cookie do próprio navegador)
+SESSION_ENGINE = os.getenv(
+    'SESSION_ENGINE',
+    'django.contrib.sessions.backends.db' if CACHE_POR_PROCESSO
+    else 'django.contrib.sessions.backends.cached_db'
+)
+SESSION_COOKIE_AGE = int(os.getenv('SESSION_COOKIE_AGE', 60 * 60 * 8))  # 8 horas
+SESSION_COOKIE_HTTPONLY = True
+SESSION_SAVE_EVERY_REQUEST = False
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -111,6 +150,17 @@ AUTH_PASSWORD_VALIDATORS = [
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# collectstatic gera cópias .gz/.br e nomes com hash do conteúdo
+# (base.3f2a1c9b.css); o WhiteNoise serve esses com cache de um ano
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -145,5 +195,78 @@ USE_TZ = True
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# E-mail (resumos enviados pelas tarefas em segundo plano)
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'SmartClass <nao-responda@smartclass.local>')
+
 # Gemini API Configuration
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')
+
+# Orçamento diário padrão de tokens de IA por professor (0 = sem limite);
+# pode ser sobrescrito por professor no admin
+IA_ORCAMENTO_DIARIO_TOKENS = int(os.getenv('IA_ORCAMENTO_DIARIO_TOKENS', 200000))
+
+# Tempo (segundos) que respostas idênticas da IA ficam em cache (0 = desligado)
+GEMINI_CACHE_SEGUNDOS = int(os.getenv('GEMINI_CACHE_SEGUNDOS', 0))
+
+# Provedor do modelo de linguagem (caminho da classe). Para testes de carga
+# e desenvolvimento offline: core.services.provedores_ia.ProvedorFalso
+IA_PROVEDOR = os.getenv('IA_PROVEDOR', 'core.services.provedores_ia.ProvedorGemini')
+IA_TIMEOUT_SEGUNDOS = float(os.getenv('IA_TIMEOUT_SEGUNDOS', 60))
+
+# Tokens de raciocínio ("thinking") do Gemini por chamada, à parte do limite
+# de saída de cada operação (0 = sem raciocínio: mais rápido e barato, e o
+# JSON estruturado não disputa os tokens com o raciocínio)
+GEMINI_RACIOCINIO_TOKENS = int(os.getenv('GEMINI_RACIOCINIO_TOKENS', 0))
+
+# Comportamento do ProvedorFalso
+IA_PROVEDOR_FALSO = {
+    'latencia': os.getenv('IA_FALSO_LATENCIA', 'lognormal'),  # fixa, uniforme, normal, lognormal
+    'latencia_media': float(os.getenv('IA_FALSO_LATENCIA_MEDIA', 2.0)),
+    'latencia_desvio': float(os.getenv('IA_FALSO_LATENCIA_DESVIO', 1.0)),
+    'taxa_erro': float(os.getenv('IA_FALSO_TAXA_ERRO', 0)),
+    'respostas': [],
+    'semente': None,
+}
+
+# Chamadas simultâneas ao Gemini ao gerar uma unidade de atividades
+GEMINI_MAX_PARALELO = int(os.getenv('GEMINI_MAX_PARALELO', 10))
+
+# Rascunhos das respostas dos alunos: tamanho máximo e dias sem alteração
+# até serem apagados pelo comando limpar_rascunhos
+RASCUNHO_MAX_CARACTERES = int(os.getenv('RASCUNHO_MAX_CARACTERES', 50000))
+RASCUNHO_RETENCAO_DIAS = int(os.getenv('RASCUNHO_RETENCAO_DIAS', 30))
+
+# Linhas aceitas por arquivo na importação de notas (CSV)
+IMPORTACAO_NOTAS_MAX_LINHAS = int(os.getenv('IMPORTACAO_NOTAS_MAX_LINHAS', 20000))
+
+# Perfis de requisições (cProfile + SQL), listados em /staff/perfis/.
+# Staff perfila uma requisição com ?_perfil=1 ou o cabeçalho X-Perfil;
+# PERFIL_AMOSTRA_TAXA é a fração de requisições perfiladas automaticamente
+# (0 = desligado), das quais ficam as PERFIL_AMOSTRA_POR_VIEW mais lentas
+PERFIL_DIR = os.getenv('PERFIL_DIR', BASE_DIR / 'perfis')
+PERFIL_MAX_ARQUIVOS = int(os.getenv('PERFIL_MAX_ARQUIVOS', 200))
+PERFIL_AMOSTRA_TAXA = float(os.getenv('PERFIL_AMOSTRA_TAXA', 0))
+PERFIL_AMOSTRA_POR_VIEW = int(os.getenv('PERFIL_AMOSTRA_POR_VIEW', 5))
+
+# Duração (segundos) da reserva de uma tarefa pelo worker. Uma tarefa em
+# execução há mais tempo sem renovar a reserva (registrar_progresso renova)
+# é considerada abandonada (worker morto ou parado no deploy) e volta à fila
+TAREFA_RESERVA_SEGUNDOS = int(os.getenv('TAREFA_RESERVA_SEGUNDOS', 900))
+
+# Processos que renderizam os boletins (comando gerar_boletins e tarefa)
+BOLETINS_PROCESSOS = int(os.getenv('BOLETINS_PROCESSOS', min(os.cpu_count() or 1, 4)))
+
+# Estatísticas de consultas SQL por formato (core/consultas.py): descarga
+# na tabela a cada N segundos e log das consultas acima de SQL_LENTA_MS
+SQL_ESTATISTICAS_ATIVAS = os.getenv('SQL_ESTATISTICAS_ATIVAS', '1') == '1'
+SQL_ESTATISTICAS_DESCARGA_SEGUNDOS = int(os.getenv('SQL_ESTATISTICAS_DESCARGA_SEGUNDOS', 60))
+SQL_LENTA_MS = float(os.getenv('SQL_LENTA_MS', 500))
+
+# Acesso ao endpoint /metrics (Prometheus): o token vai no cabeçalho
+# Authorization: Bearer <token> (bearer_token no scrape_config). Os IPs
+# liberam sem token e, atrás de um proxy no mesmo host (nginx -> gunicorn),
+# todo acesso de fora chega como 127.0.0.1; por isso a lista começa vazia.
+# Sem token e sem IPs o endpoint fica fechado.
+METRICAS_TOKEN = os.getenv('METRICAS_TOKEN', '')
+METRICAS_IPS_PERMITIDOS = [ip for ip in os.getenv('METRICAS_IPS_PERMITIDOS', '').split(',') if ip]
@@ -14,21 +14,45 @@ urlpatterns = [
     # Professor - Atividades
     path('professor/atividades/', views.professor_atividades, name='professor_atividades'),
     path('professor/atividades/criar/', views.atividade_create, name='atividade_create'),
+    path('professor/atividades/exclusoes/', views.atividades_exclusoes, name='atividades_exclusoes'),
     path('professor/atividades/<int:pk>/editar/', views.atividade_edit, name='atividade_edit'),
     path('professor/atividades/<int:pk>/deletar/', views.atividade_delete, name='atividade_delete'),
     path('professor/atividades/<int:pk>/submissoes/', views.atividade_submissoes, name='atividade_submissoes'),
+    path('professor/atividades/<int:pk>/submissoes/stream/', views.atividade_submissoes_stream, name='atividade_submissoes_stream'),
+    path('professor/atividades/<int:pk>/corrigir/', views.atividade_corrigir, name='atividade_corrigir'),
+    path('professor/atividades/<int:pk>/fila/', views.atividade_fila, name='atividade_fila'),
 
     # Professor - Submissões
+    path('professor/submissoes/<int:pk>/', views.submissao_detalhe, name='submissao_detalhe'),
     path('professor/submissoes/<int:pk>/corrigir/', views.submissao_corrigir, name='submissao_corrigir'),
 
     # Professor - Alunos
     path('professor/alunos/', views.professor_alunos, name='professor_alunos'),
+    path('professor/notas/importar/', views.notas_importar, name='notas_importar'),
+    path('professor/boletins/', views.boletins, name='boletins'),
+    path('professor/boletins/<str:lote>/download/', views.boletins_download, name='boletins_download'),
 
     # Professor - IA
     path('api/gerar-atividade/', views.gerar_atividade_api, name='gerar_com_ia'),
+    path('professor/unidades/gerar/', views.unidade_gerar, name='unidade_gerar'),
+    path('professor/uso-ia/', views.professor_uso_ia, name='professor_uso_ia'),
+
+    # Professor - Estatísticas
+    path('professor/estatisticas/', views.professor_estatisticas, name='professor_estatisticas'),
+    path('professor/atividades/<int:pk>/estatisticas/', views.professor_estatisticas, name='atividade_estatisticas'),
+    path('professor/turmas/<int:turma_pk>/estatisticas/', views.professor_estatisticas, name='turma_estatisticas'),
 
     # Aluno - Atividades
     path('aluno/atividades/', views.aluno_atividades, name='aluno_atividades'),
     path('aluno/atividades/<int:pk>/', views.atividade_detail, name='atividade_detail'),
+    path('aluno/atividades/<int:pk>/rascunho/', views.rascunho_salvar, name='rascunho_salvar'),
     path('aluno/atividades/<int:pk>/resultado/', views.atividade_resultado, name='atividade_resultado'),
+
+    # Diagnóstico (staff)
+    path('staff/perfis/', views.perfis_list, name='perfis_list'),
+    path('staff/perfis/<str:nome>/', views.perfil_detail, name='perfil_detail'),
+    path('staff/perfis/<str:nome>/download/', views.perfil_download, name='perfil_download'),
+
+    # Métricas (Prometheus)
+    path('metrics', views.metricas, name='metricas'),
 ]
\ No newline at end of file